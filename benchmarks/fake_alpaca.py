@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import math
+import random
+import threading
+import time
+import zlib
+from src.datasets.alpaca_fetcher import PAGE_SIZE
+
+
+class FakeBarSet:
+    """The part of alpaca's BarSet that parse_bars reads: bar records by ticker."""
+
+    def __init__(self, data: dict[str, list]):
+        self.data = data
+
+
+class FakeStockHistoricalDataClient:
+    """
+    Local stand-in for alpaca's StockHistoricalDataClient. Returns one synthetic bar
+    per ticker and weekday after a simulated network latency per page, and raises on
+    a given fraction of calls so retries get exercised. Bars are the same in every
+    run. `pages` counts the HTTP requests alpaca-py would have made: pages of up to
+    PAGE_SIZE bars with a request limit, of Alpaca's default 1000 bars without.
+    """
+
+    def __init__(self, latency: float = 0.05, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.pages = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def get_stock_bars(self, request) -> FakeBarSet:
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+
+        if fail:
+            time.sleep(self.latency)
+            raise ConnectionError("fake transient failure")
+
+        tickers = request.symbol_or_symbols
+        days = [
+            request.start + timedelta(days=i)
+            for i in range((request.end - request.start).days + 1)
+        ]
+        days = [day for day in days if day.weekday() < 5]
+
+        data = {
+            ticker: [
+                SimpleNamespace(
+                    symbol=ticker,
+                    timestamp=datetime(
+                        day.year, day.month, day.day, 5, tzinfo=timezone.utc
+                    ),
+                    open=100.0,
+                    high=101.0,
+                    low=99.0,
+                    close=100.0 + zlib.crc32(f"{ticker}{day}".encode()) % 100 / 100,
+                    volume=1000.0,
+                    trade_count=10.0,
+                    vwap=100.0,
+                )
+                for day in days
+            ]
+            for ticker in tickers
+        }
+
+        bars = len(tickers) * len(days)
+        page_size = PAGE_SIZE if getattr(request, "limit", None) else 1000
+        pages = max(1, math.ceil(bars / page_size))
+        with self._lock:
+            self.pages += pages
+
+        time.sleep(self.latency * pages)
+        return FakeBarSet(data)
@@ -0,0 +1,23 @@
+from benchmarks.fake_alpaca import FakeStockHistoricalDataClient
+from src.datasets.alpaca_fetcher import AlpacaBarFetcher
+from qdatabase import Database
+from datetime import date
+
+# Fetch one year of daily bars for 1,000 tickers through the fake client
+tickers = [f"T{i:04d}" for i in range(1000)]
+start_date = date(2024, 1, 1)
+end_date = date(2024, 12, 31)
+
+db = Database()
+for max_workers in [1, 4, 8]:
+    client = FakeStockHistoricalDataClient(latency=0.2, failure_rate=0.05)
+    fetcher = AlpacaBarFetcher(
+        client, db, max_workers=max_workers, requests_per_minute=600, backoff=0.1
+    )
+    fetcher.fetch("BENCH_FETCH", tickers, start_date, end_date)
+    fetcher.clear("BENCH_FETCH", tickers, start_date, end_date)
+
+    print(
+        f"workers={max_workers} calls={client.calls} pages={client.pages} "
+        f"bars/s={fetcher.stats['bars_per_second']:.0f}"
+    )
@@ -0,0 +1,100 @@
+from benchmarks.synthetic import synthetic_panel
+from benchmarks.pipeline_benchmark import RssSampler, run_stage
+from qcomponents import row_key
+import argparse
+import json
+import polars as pl
+
+# How a panel gets its keys from tickers stored as UInt32 ids, like the core table
+ENCODINGS = {
+    "utf8": lambda ids, dtype: ids.with_columns(
+        pl.col("ticker").cast(dtype).cast(pl.Utf8)
+    ),
+    "enum": lambda ids, dtype: ids.with_columns(pl.col("ticker").cast(dtype)),
+    "row_key": lambda ids, dtype: ids.with_columns(
+        pl.col("ticker").cast(dtype)
+    ).with_columns(row_key().alias("_key")),
+}
+
+
+def benchmark(tickers: int, years: int, repeat: int, sampler: RssSampler) -> dict:
+    """
+    Join and group_by times of a daily panel with string tickers, Enum tickers
+    (the ids of AssetUniverse.ticker_dtype), and Enum tickers plus a packed
+    (date, ticker) key. The encode stage is reading the keys from stored ids.
+    """
+    data = synthetic_panel(tickers, years, "daily").select(["date", "ticker", "ret"])
+    dtype = pl.Enum(data["ticker"].unique().sort())
+
+    # A long/short book of a fifth of the universe on every date
+    weights = data.filter(pl.col("ret").abs() > pl.col("ret").abs().quantile(0.8))
+    weights = weights.select(["date", "ticker", pl.col("ret").sign().alias("weight")])
+
+    # Stored as the core table stores them
+    data, weights = [
+        frame.with_columns(pl.col("ticker").cast(dtype).to_physical())
+        for frame in (data, weights)
+    ]
+
+    runs = {}
+    for encoding, encode in ENCODINGS.items():
+        panel, stages = encode(data, dtype), {}
+        book = encode(weights, dtype)
+        if encoding == "row_key":
+            book, on = book.select(["_key", "weight"]), "_key"
+        else:
+            on = ["date", "ticker"]
+
+        _, stages["encode"] = run_stage(sampler, repeat, lambda: encode(data, dtype))
+        _, stages["join"] = run_stage(
+            sampler, repeat, lambda: panel.join(book, on=on, how="inner")
+        )
+        _, stages["group_by"] = run_stage(
+            sampler,
+            repeat,
+            lambda: panel.group_by("ticker").agg(pl.col("ret").sum()),
+        )
+        _, stages["rolling_over"] = run_stage(
+            sampler,
+            repeat,
+            lambda: panel.with_columns(
+                pl.col("ret").rolling_sum(21).over("ticker").alias("rolling")
+            ),
+        )
+        runs[encoding] = stages
+
+    return {"tickers": tickers, "years": years, "rows": len(data), "encodings": runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time joins and group_bys on string and encoded ticker keys."
+    )
+    parser.add_argument("--tickers", type=int, default=3000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Optional JSON file")
+    args = parser.parse_args()
+
+    with RssSampler() as sampler:
+        result = benchmark(args.tickers, args.years, args.repeat, sampler)
+
+    print(f"{args.tickers} tickers, {args.years}y daily ({result['rows']} rows)")
+    baseline = result["encodings"]["utf8"]
+    for encoding, stages in result["encodings"].items():
+        print(f"  {encoding}:")
+        for stage, stats in stages.items():
+            line = f"    {stage:<14} {stats['seconds']:>8.4f}s"
+            # Encoding is paid once per load, the rest is relative to string keys
+            if stage != "encode":
+                line += f" ({baseline[stage]['seconds'] / stats['seconds']:.2f}x)"
+            print(line)
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+from benchmarks.synthetic import synthetic_panel
+from qcomponents import ChunkedData, PanelData, PortfolioSet
+from qdatabase import Database
+from src.signals import momentum_signal
+from src.optimizers import decile_portfolio, decile_portfolios
+from src.backtester.backtester import compute_pnl
+from src.backtester import analyze
+from functools import partial
+from itertools import product
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import polars as pl
+
+WINDOWS = {"daily": 231, "monthly": 12}
+BENCH_TABLE = "BENCH_PIPELINE"
+
+
+class RssSampler:
+    """
+    Samples the resident set size on a background thread to catch each stage's peak.
+    Where /proc/self/statm doesn't exist (e.g. Windows) it is not `available` and
+    stages report no memory.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 0
+        self.available = self.rss() is not None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def rss(self) -> int | None:
+        if not self._page_size:
+            return None
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * self._page_size
+        except (OSError, ValueError):
+            return None
+
+    def reset(self) -> int:
+        self.peak = self.rss()
+        return self.peak
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def __enter__(self):
+        if self.available:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self.available:
+            self._thread.join()
+
+
+def run_stage(sampler: RssSampler, repeat: int, fn, setup=None):
+    """
+    Best wall time of `repeat` runs plus the RSS growth and peak over the stage,
+    None where the sampler can't read the RSS. setup runs untimed before every run.
+    """
+    timings, peaks = [], []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        if sampler.available:
+            start_rss = sampler.reset()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        if sampler.available:
+            peaks.append(max(sampler.peak, sampler.rss()) - start_rss)
+            end_rss = sampler.rss()
+
+    stats = {
+        "seconds": min(timings),
+        "seconds_median": sorted(timings)[len(timings) // 2],
+        "peak_mb": max(peaks) / 2**20 if peaks else None,
+        "retained_mb": (end_rss - start_rss) / 2**20 if peaks else None,
+    }
+    return result, stats
+
+
+def benchmark(
+    tickers: int, years: int, interval: str, repeat: int, sampler: RssSampler
+) -> dict:
+    data = synthetic_panel(tickers, years, interval)
+    window = WINDOWS[interval]
+    columns = ["date", "ticker", "ret"]
+    stages = {}
+
+    # Database, the first 90% of dates created and the rest inserted
+    db = Database()
+    dates = data["date"].unique().sort()
+    split = dates[int(len(dates) * 0.9)]
+    history = data.filter(pl.col("date") < split)
+    latest = data.filter(pl.col("date") >= split)
+
+    _, stages["db_create"] = run_stage(
+        sampler,
+        repeat,
+        lambda: db.create(BENCH_TABLE, history, overwrite=True, partition_on="date"),
+    )
+
+    _, stages["db_insert"] = run_stage(
+        sampler,
+        repeat,
+        lambda: db.insert(BENCH_TABLE, latest),
+        setup=lambda: db.create(
+            BENCH_TABLE, history, overwrite=True, partition_on="date"
+        ),
+    )
+
+    panel, stages["db_read"] = run_stage(
+        sampler, repeat, lambda: db.read(BENCH_TABLE, columns=columns)
+    )
+
+    # Same read from the memory-mapped Arrow copy
+    db.make_hot(BENCH_TABLE)
+    _, stages["db_read_hot"] = run_stage(
+        sampler, repeat, lambda: db.read(BENCH_TABLE, columns=columns)
+    )
+    db.delete(BENCH_TABLE)
+
+    # Pipeline stages on the panel read back. Chunks are built as they are
+    # iterated, so the stage is the constructor plus one pass over every window
+    def chunked_pass():
+        return sum(len(chunk) for chunk in ChunkedData(panel, window, columns))
+
+    _, stages["chunked_data"] = run_stage(sampler, repeat, chunked_pass)
+
+    def signal():
+        panel_data = PanelData(panel, window, columns)
+        panel_data.apply_signal_transform(
+            partial(momentum_signal, interval=interval, window=window - 1)
+        )
+        panel_data.remove_chunks()
+        return panel_data
+
+    panel_data, stages["signal_transform"] = run_stage(sampler, repeat, signal)
+    signals = panel_data.frame
+
+    _, stages["decile_portfolio"] = run_stage(
+        sampler,
+        repeat,
+        lambda: [decile_portfolio(chunk, signal="mom") for chunk in panel_data],
+    )
+    deciles, stages["decile_portfolios"] = run_stage(
+        sampler, repeat, lambda: decile_portfolios(signals, signal="mom")
+    )
+
+    portfolios = PortfolioSet(
+        deciles.filter(pl.col("bin").is_in([0, 9])).with_columns(
+            pl.when(pl.col("bin") == 0)
+            .then(-pl.col("weight"))
+            .otherwise(pl.col("weight"))
+        )
+    )
+    _, stages["backtest_pnl"] = run_stage(
+        sampler,
+        repeat,
+        lambda: analyze(
+            compute_pnl(panel, portfolios), portfolios.frame, interval
+        ).stats,
+    )
+
+    return {
+        "tickers": tickers,
+        "years": years,
+        "interval": interval,
+        "rows": len(data),
+        "rebalances": len(portfolios),
+        "stages": stages,
+    }
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Print the change in best wall time of every stage against a baseline run."""
+    key = lambda run: (run["tickers"], run["years"], run["interval"])
+    baseline_runs = {key(run): run for run in baseline["runs"]}
+
+    for run in current["runs"]:
+        if key(run) not in baseline_runs:
+            continue
+        print(f"{run['tickers']} tickers, {run['years']}y {run['interval']}:")
+        for stage, stats in run["stages"].items():
+            before = baseline_runs[key(run)]["stages"].get(stage)
+            if before is not None:
+                change = stats["seconds"] / before["seconds"] - 1
+                print(
+                    f"  {stage:<20} {before['seconds']:>9.4f}s -> "
+                    f"{stats['seconds']:>9.4f}s ({change:+.1%})"
+                )
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time and memory-profile the strategy to backtest pipeline "
+        "on synthetic panels."
+    )
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5])
+    parser.add_argument(
+        "--intervals", nargs="+", default=["monthly", "daily"], choices=list(WINDOWS)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--output", default=None, help="JSON file, bench_<commit>.json by default"
+    )
+    parser.add_argument(
+        "--compare", default=None, help="Baseline JSON to compare against"
+    )
+    args = parser.parse_args()
+
+    commit = _commit()
+    results = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "cpus": os.cpu_count(),
+        "runs": [],
+    }
+
+    with RssSampler() as sampler:
+        for tickers, years, interval in product(
+            args.tickers, args.years, args.intervals
+        ):
+            run = benchmark(tickers, years, interval, args.repeat, sampler)
+            results["runs"].append(run)
+
+            print(f"{tickers} tickers, {years}y {interval} ({run['rows']} rows)")
+            for stage, stats in run["stages"].items():
+                peak = stats["peak_mb"]
+                print(
+                    f"  {stage:<20} {stats['seconds']:>9.4f}s "
+                    + (f"peak {peak:>8.1f} MB" if peak is not None else "")
+                )
+
+    output = args.output or f"bench_{commit or 'local'}.json"
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Wrote {output}")
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
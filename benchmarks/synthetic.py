@@ -0,0 +1,94 @@
+from datetime import date
+import numpy as np
+import polars as pl
+
+PERIODS_PER_YEAR = {"daily": 252, "weekly": 52, "monthly": 12, "quarterly": 4}
+
+
+def synthetic_panel(
+    n_tickers: int = 1000,
+    years: int = 5,
+    interval: str = "daily",
+    seed: int = 0,
+    start_date: date = date(2000, 1, 3),
+) -> pl.DataFrame:
+    """
+    Reproducible core-table shaped panel (ticker, date, open, high, low, close,
+    volume, trade_count, vwap, ret, logret) without any Alpaca access. Dates are
+    business days or month starts, and tickers list and delist at random dates
+    so histories have different lengths like the real universe.
+    """
+    rng = np.random.default_rng(seed)
+    n_dates = PERIODS_PER_YEAR[interval] * years
+
+    match interval:
+        case "daily":
+            dates = np.busday_offset(
+                np.datetime64(start_date, "D"), np.arange(n_dates), roll="forward"
+            )
+        case "monthly":
+            dates = (np.datetime64(start_date, "M") + np.arange(n_dates)).astype(
+                "datetime64[D]"
+            )
+
+    # Listing window of every ticker, most of them covering the whole range
+    listed = np.where(
+        rng.random(n_tickers) < 0.8, 0, rng.integers(0, n_dates, n_tickers)
+    )
+    delisted = np.where(
+        rng.random(n_tickers) < 0.9, n_dates, rng.integers(0, n_dates, n_tickers) + 1
+    )
+    delisted = np.maximum(delisted, listed + 1)
+    lengths = delisted - listed
+
+    ticker_idx = np.repeat(np.arange(n_tickers), lengths)
+    date_idx = np.concatenate(
+        [np.arange(start, end) for start, end in zip(listed, delisted)]
+    )
+
+    # Fat tailed returns scaled to the interval
+    scale = 0.02 * np.sqrt(252 / PERIODS_PER_YEAR[interval])
+    ret = rng.standard_t(4, len(ticker_idx)) * scale / np.sqrt(2)
+
+    return (
+        pl.DataFrame(
+            {
+                "ticker": np.char.add("T", np.char.zfill(ticker_idx.astype(str), 5)),
+                "date": dates[date_idx],
+                "ret": ret,
+                "volume": rng.lognormal(13, 1, len(ticker_idx)),
+                "trade_count": rng.integers(100, 10_000, len(ticker_idx)),
+            }
+        )
+        .with_columns(
+            pl.col("date").cast(pl.Date),
+            pl.col("trade_count").cast(pl.Float64),
+            (pl.col("ret").log1p().cum_sum().exp() * 50).over("ticker").alias("close"),
+        )
+        .with_columns(
+            # First period of every ticker has no previous close
+            pl.when(pl.int_range(pl.len()).over("ticker") > 0).then(pl.col("ret")),
+            (pl.col("close") / (1 + pl.col("ret"))).alias("open"),
+        )
+        .with_columns(
+            pl.max_horizontal("open", "close").mul(1.01).alias("high"),
+            pl.min_horizontal("open", "close").mul(0.99).alias("low"),
+            ((pl.col("open") + pl.col("close")) / 2).alias("vwap"),
+            pl.col("ret").log1p().alias("logret"),
+        )
+        .select(
+            [
+                "ticker",
+                "date",
+                "open",
+                "high",
+                "low",
+                "close",
+                "volume",
+                "trade_count",
+                "vwap",
+                "ret",
+                "logret",
+            ]
+        )
+    )
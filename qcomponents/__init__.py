@@ -1 +1,5 @@
-from .chunked_data import ChunkedData
+from .keys import encode_keys, decode_keys, align_keys, row_key
+from .chunked_data import ChunkedData, lookback_start
+from .panel_data import PanelData
+from .portfolio_set import PortfolioSet
+from .streaming_data import StreamingData
@@ -1,43 +1,99 @@
 import polars as pl
-from typing import Self
+from datetime import date
+from qprofiler import trace, tracer
+from typing import Callable, Iterator, Self
 
 
 class ChunkedData:
+    """
+    Rolling windows of `window` consecutive dates over a ticker/date frame.
+    The data is sorted by date once and every chunk is a zero-copy slice
+    (start_offset, length) into that frame. Chunks are built lazily when iterated,
+    with any signal transforms and filters applied in the order they were added.
+    """
+
+    @trace("chunked_data.init")
     def __init__(self, data: pl.DataFrame, window: int, columns: list[str]):
+        tracer.current().add(rows=len(data))
         self.window = window
 
-        unique_dates = data.select("date").unique().sort(by="date")["date"].to_list()
-        chunks = []
+        # Sort once so every window is a contiguous block of rows
+        data = data.sort(by="date", maintain_order=True)
+        self._data = data.select(columns)
+        self._unique_dates = data["date"].unique(maintain_order=True)
 
-        for i in range(window, len(unique_dates) + 1):
+        # Window boundaries from a searchsorted date index
+        starts, ends = self._date_offsets(data["date"], self._unique_dates)
+        self._bounds: list[tuple[int, int]] = [
+            (starts[i - window], ends[i - 1] - starts[i - window])
+            for i in range(window, len(self._unique_dates) + 1)
+        ]
+        self._steps: list[tuple[str, Callable]] = []
 
-            start_date = unique_dates[i - window]
-            end_date = unique_dates[i - 1]
+    def apply_signal_transform(self, signal) -> Self:
+        self._steps.append(("transform", signal))
+        return self
 
-            chunk = data.filter(
-                (pl.col("date") >= start_date) & (pl.col("date") <= end_date)
-            ).select(columns)
+    def apply_portfolio_gen(self, portfolio_generator) -> list:
+        return [portfolio_generator(chunk) for chunk in self]
 
-            chunks.append(chunk)
+    def stream_portfolio_gen(self, portfolio_generator) -> Iterator:
+        """Lazy apply_portfolio_gen, building each portfolio as its chunk is reached."""
+        return (portfolio_generator(chunk) for chunk in self)
 
-        self._chunks: list[pl.DataFrame] = chunks
+    def remove_chunks(self):
+        """Remove chunks that do not have the full window of data."""
+        self._steps.append(("filter", lambda chunk: len(chunk.drop_nulls()) > 10))
 
-    def apply_signal_transform(self, signal) -> Self:
-        for i, chunk in enumerate(self.chunks):
-            self.chunks[i] = signal(chunk)
+    def __iter__(self) -> Iterator[pl.DataFrame]:
+        for offset, length in self._bounds:
+            chunk = self._build(offset, length)
+            if chunk is not None:
+                yield chunk
 
-        return self
+    def _build(self, offset: int, length: int) -> pl.DataFrame | None:
+        tracer.current().add(chunks=1)
+        chunk = self._data.slice(offset, length)
+        for kind, step in self._steps:
+            if kind == "transform":
+                chunk = step(chunk)
+            elif not step(chunk):
+                return None
+        return chunk
 
-    def apply_portfolio_gen(self, portfolio_generator) -> list[pl.DataFrame]:
-        portfolios = []
-        for chunk in self.chunks:
-            portfolios.append(portfolio_generator(chunk))
-        return portfolios
+    @staticmethod
+    def _date_offsets(
+        dates: pl.Series, unique_dates: pl.Series
+    ) -> tuple[list[int], list[int]]:
+        starts = dates.search_sorted(unique_dates, side="left").to_list()
+        ends = dates.search_sorted(unique_dates, side="right").to_list()
+        return starts, ends
 
-    def remove_chunks(self):
-        """Remove chunks that do not have the full window of data."""
-        self._chunks = [chunk for chunk in self._chunks if len(chunk.drop_nulls()) > 10]
+    @property
+    def bounds(self) -> list[tuple[int, int]]:
+        """(start_offset, length) of every window into the sorted data."""
+        return self._bounds
 
     @property
     def chunks(self) -> list[pl.DataFrame]:
-        return self._chunks
+        """Materializes every chunk. Prefer iterating over the ChunkedData directly."""
+        return list(self)
+
+
+def lookback_start(
+    data: pl.DataFrame | pl.LazyFrame, start_date: date, periods: int
+) -> date:
+    """
+    First date of data that windows ending on or after start_date need: the date
+    `periods` dates before start_date, or the earliest date there is.
+    """
+    first = (
+        data.lazy()
+        .select(pl.col("date").filter(pl.col("date") < start_date).unique())
+        .sort(by="date")
+        .tail(periods)
+        .select(pl.col("date").min())
+        .collect()
+        .item()
+    )
+    return start_date if first is None else first
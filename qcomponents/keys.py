@@ -0,0 +1,56 @@
+import polars as pl
+
+
+def encode_keys(
+    data: pl.DataFrame | pl.LazyFrame, dtype: pl.Enum
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    String tickers as the pl.Enum dtype, whose physical values are the ticker ids
+    (e.g. AssetUniverse.ticker_dtype). Tickers the Enum doesn't know become null.
+    Dates need nothing: a Date is already an Int32 day ordinal underneath.
+    """
+    if data.collect_schema().get("ticker") == pl.Utf8:
+        return data.with_columns(pl.col("ticker").cast(dtype, strict=False))
+    return data
+
+
+def decode_keys(data: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    """String tickers again, for output and for tables persisted to disk."""
+    if data.collect_schema().get("ticker") not in (None, pl.Utf8):
+        return data.with_columns(pl.col("ticker").cast(pl.Utf8))
+    return data
+
+
+def align_keys(
+    left: pl.DataFrame | pl.LazyFrame, right: pl.DataFrame | pl.LazyFrame
+) -> tuple[pl.DataFrame | pl.LazyFrame, pl.DataFrame | pl.LazyFrame]:
+    """
+    Both frames' tickers in one dtype, so they join. A string side is encoded to the
+    other side's Enum. Of two Enums the shorter is widened to the longer by its
+    physical ids, as ticker ids are only ever appended and one Enum extends the
+    other; anything else is joined as strings.
+    """
+    left_dtype = left.collect_schema()["ticker"]
+    right_dtype = right.collect_schema()["ticker"]
+
+    if left_dtype == right_dtype:
+        return left, right
+    if left_dtype == pl.Utf8 and isinstance(right_dtype, pl.Enum):
+        return encode_keys(left, right_dtype), right
+    if right_dtype == pl.Utf8 and isinstance(left_dtype, pl.Enum):
+        return left, encode_keys(right, left_dtype)
+    if isinstance(left_dtype, pl.Enum) and isinstance(right_dtype, pl.Enum):
+        wider = max(left_dtype, right_dtype, key=lambda dtype: len(dtype.categories))
+        widen = pl.col("ticker").to_physical().cast(wider)
+        return left.with_columns(widen), right.with_columns(widen)
+    return decode_keys(left), decode_keys(right)
+
+
+def row_key(date: str = "date", ticker: str = "ticker") -> pl.Expr:
+    """
+    One UInt64 per (date, ticker) of encoded keys, the day ordinal in the high and
+    the ticker id in the low 32 bits, so two-column joins become single-key joins.
+    """
+    day = (pl.col(date).to_physical().cast(pl.Int64) + 2**31).cast(pl.UInt64)
+    code = pl.col(ticker).to_physical().cast(pl.UInt64)
+    return day * pl.lit(2**32, dtype=pl.UInt64) + code
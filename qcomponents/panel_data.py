@@ -0,0 +1,45 @@
+import polars as pl
+from typing import Self
+from .chunked_data import ChunkedData
+from qprofiler import span, trace
+
+
+class PanelData(ChunkedData):
+    """
+    Panel mode of ChunkedData. Signal transforms run once over the whole ticker/date
+    panel and each chunk is the cross-section of a single rebalance date, i.e. the
+    last date of every `window` date chunk. Signals that only look back within the
+    window produce the same rows as the chunked path.
+    """
+
+    @trace("panel_data.init")
+    def __init__(self, data: pl.DataFrame, window: int, columns: list[str]):
+        super().__init__(data, window, columns)
+
+        self._rebalance_dates = self._unique_dates[window - 1 :]
+        self._bounds = self._cross_sections()
+
+    def apply_signal_transform(self, signal) -> Self:
+        with span("panel_data.signal", rows=len(self._data)):
+            self._data = signal(self._data)
+            self._bounds = self._cross_sections()
+        return self
+
+    def _cross_sections(self) -> list[tuple[int, int]]:
+        starts, ends = self._date_offsets(self._data["date"], self._rebalance_dates)
+        return [(start, end - start) for start, end in zip(starts, ends)]
+
+    def _build(self, offset: int, length: int) -> pl.DataFrame | None:
+        chunk = self._data.slice(offset, length)
+        for kind, step in self._steps:
+            if kind == "filter" and not step(chunk):
+                return None
+        return chunk
+
+    @property
+    def frame(self) -> pl.DataFrame:
+        """Every remaining cross-section stacked into one frame."""
+        cross_sections = list(self)
+        if not cross_sections:
+            return self._data.clear()
+        return pl.concat(cross_sections)
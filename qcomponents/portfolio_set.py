@@ -0,0 +1,104 @@
+import polars as pl
+from datetime import date
+from typing import Iterator, Self
+
+PORTFOLIO_SCHEMA = {"date": pl.Date, "ticker": pl.Utf8, "weight": pl.Float64}
+
+
+class PortfolioSet:
+    """
+    Portfolios of every rebalance date in one long (date, ticker, weight) table,
+    sorted by date, plus an offsets index into it. Tickers keep the dtype they come
+    with, e.g. the universe Enum of AlpacaStock data. A date's
+    holdings are a zero-copy slice found in O(1) by date or by position, and date
+    ranges slice out as a PortfolioSet sharing the same buffers.
+    """
+
+    def __init__(self, data: pl.DataFrame):
+        self._table = data.select(
+            pl.col("date"),
+            pl.col("ticker"),
+            pl.col("weight").cast(pl.Float64),
+        ).sort(by="date", maintain_order=True)
+
+        # Offsets of every date's block, plus the end of the table
+        dates = self._table["date"].unique(maintain_order=True)
+        self._dates = dates.to_list()
+        self._offsets = self._table["date"].search_sorted(dates).to_list()
+        self._offsets.append(len(self._table))
+        self._positions = {rebalance: i for i, rebalance in enumerate(self._dates)}
+
+    @classmethod
+    def from_frames(cls, portfolios: list[pl.DataFrame]) -> Self:
+        """Build from one (date, ticker, weight) frame per rebalance date."""
+        if not portfolios:
+            return cls(pl.DataFrame(schema=PORTFOLIO_SCHEMA))
+        return cls(pl.concat([p.select(list(PORTFOLIO_SCHEMA)) for p in portfolios]))
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __iter__(self) -> Iterator[pl.DataFrame]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, key: int | slice) -> pl.DataFrame | Self:
+        """Holdings of the i-th rebalance date, or a PortfolioSet of a slice of dates."""
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("PortfolioSet slices must be contiguous")
+            return self._slice(start, max(start, stop))
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("PortfolioSet index out of range")
+
+        offset = self._offsets[key]
+        holdings = self._table.slice(offset, self._offsets[key + 1] - offset)
+        return holdings.with_columns(pl.col("ticker").cast(pl.Utf8))
+
+    def at(self, rebalance_date: date) -> pl.DataFrame:
+        """Holdings on a rebalance date."""
+        if rebalance_date not in self._positions:
+            raise KeyError(f"No portfolio on {rebalance_date}")
+        return self[self._positions[rebalance_date]]
+
+    def between(self, start_date: date, end_date: date) -> Self:
+        """Portfolios rebalanced from start_date through end_date, inclusive."""
+        dates = pl.Series(self._dates, dtype=pl.Date)
+        start = dates.search_sorted(start_date, side="left")
+        stop = dates.search_sorted(end_date, side="right")
+        return self._slice(start, stop)
+
+    def _slice(self, start: int, stop: int) -> Self:
+        sliced = object.__new__(type(self))
+        offset = self._offsets[start]
+        sliced._table = self._table.slice(offset, self._offsets[stop] - offset)
+        sliced._dates = self._dates[start:stop]
+        sliced._offsets = [o - offset for o in self._offsets[start : stop + 1]]
+        sliced._positions = {rebalance: i for i, rebalance in enumerate(sliced._dates)}
+        return sliced
+
+    @property
+    def dates(self) -> list[date]:
+        return self._dates
+
+    @property
+    def table(self) -> pl.DataFrame:
+        """The underlying (date, ticker, weight) table, tickers as they came."""
+        return self._table
+
+    @property
+    def frame(self) -> pl.DataFrame:
+        """Every portfolio stacked with string tickers, ready to join on market data."""
+        return self._table.with_columns(pl.col("ticker").cast(pl.Utf8))
+
+    def __repr__(self) -> str:
+        if not self._dates:
+            return "PortfolioSet(0 portfolios)"
+        return (
+            f"PortfolioSet({len(self)} portfolios, {len(self._table)} positions, "
+            f"{self._dates[0]} to {self._dates[-1]})"
+        )
@@ -0,0 +1,75 @@
+import polars as pl
+from datetime import date
+from typing import Iterator
+from .chunked_data import ChunkedData
+from qprofiler import trace
+
+
+class StreamingData(ChunkedData):
+    """
+    Streaming mode of ChunkedData over a lazy source, e.g. Database.scan. Dates are
+    read `batch_size` at a time and only the last `window` dates stay in memory, so
+    memory depends on the window and not on the length of history. Chunks are the
+    same rolling windows ChunkedData gives, with the same steps applied, and are
+    yielded one rebalance date at a time. start_date skips windows ending before it
+    without reading the data behind them.
+    """
+
+    @trace("streaming_data.init")
+    def __init__(
+        self,
+        source: pl.LazyFrame,
+        window: int,
+        columns: list[str],
+        start_date: date | None = None,
+        batch_size: int | None = None,
+    ):
+        self.window = window
+        self.batch_size = batch_size or window
+        self._source = source.select(columns)
+        self._data = pl.DataFrame(schema=self._source.collect_schema())
+        self._unique_dates = (
+            source.select(pl.col("date").unique()).collect()["date"].sort()
+        )
+
+        # First window that ends on or after start_date
+        first = (
+            0 if start_date is None else self._unique_dates.search_sorted(start_date)
+        )
+        self._first = max(window - 1, first)
+        self._steps = []
+
+    def __iter__(self) -> Iterator[pl.DataFrame]:
+        dates = self._unique_dates
+        loaded = max(self._first - self.window + 1, 0)
+        self._data = self._data.clear()
+
+        for batch_start in range(self._first, len(dates), self.batch_size):
+            batch_end = min(batch_start + self.batch_size, len(dates)) - 1
+
+            # Append the dates the buffer is missing
+            batch = (
+                self._source.filter(
+                    pl.col("date").is_between(dates[loaded], dates[batch_end])
+                )
+                .collect()
+                .sort(by="date", maintain_order=True)
+            )
+            # Rechunk so the sliced-off dates of earlier batches are freed
+            self._data = pl.concat([self._data, batch], rechunk=True)
+            loaded = batch_end + 1
+
+            # The buffer holds window - 1 dates before the batch plus the batch
+            buffer_dates = dates[batch_start - self.window + 1 : batch_end + 1]
+            starts, ends = self._date_offsets(self._data["date"], buffer_dates)
+            for i in range(self.window - 1, len(buffer_dates)):
+                offset = starts[i - self.window + 1]
+                chunk = self._build(offset, ends[i] - offset)
+                if chunk is not None:
+                    yield chunk
+
+            # Keep only the dates the next windows still need
+            keep = len(buffer_dates) - self.window + 1
+            self._data = self._data.slice(
+                starts[keep] if keep < len(starts) else len(self._data)
+            )
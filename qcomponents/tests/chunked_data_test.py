@@ -0,0 +1,40 @@
+from qcomponents import ChunkedData
+import polars as pl
+from datetime import date, timedelta
+
+data = pl.DataFrame(
+    [
+        {"ticker": ticker, "date": date(2024, 1, 1) + timedelta(days=day), "ret": 0.01}
+        for ticker in ["A", "B", "C"]
+        for day in range(6)
+        if not (ticker == "C" and day == 2)
+    ]
+)
+
+
+def test_windows():
+    chunked_data = ChunkedData(data, window=3, columns=["date", "ticker", "ret"])
+    chunks = chunked_data.chunks
+
+    assert len(chunks) == 4
+    for i, chunk in enumerate(chunks):
+        start_date = date(2024, 1, 1) + timedelta(days=i)
+        end_date = start_date + timedelta(days=2)
+        expected = data.filter(
+            (pl.col("date") >= start_date) & (pl.col("date") <= end_date)
+        )
+        assert chunk["date"].is_sorted()
+        assert len(chunk) == len(expected)
+        assert chunk["date"].min() == start_date
+        assert chunk["date"].max() == end_date
+
+
+def test_lazy_steps():
+    chunked_data = ChunkedData(data, window=3, columns=["date", "ticker", "ret"])
+    chunked_data.apply_signal_transform(
+        lambda chunk: chunk.filter(pl.col("ticker") != "C")
+    )
+    chunked_data.remove_chunks()
+
+    assert len(chunked_data.chunks) == 0
+    assert len(chunked_data.bounds) == 4
@@ -0,0 +1,52 @@
+from qcomponents import encode_keys, decode_keys, align_keys, row_key
+import polars as pl
+from datetime import date
+
+data = pl.DataFrame(
+    {
+        "date": [date(1969, 12, 31), date(2024, 1, 2), date(2024, 1, 2)],
+        "ticker": ["A", "B", "A"],
+        "ret": [0.1, 0.2, 0.3],
+    }
+)
+universe = pl.Enum(["B", "A"])
+
+
+def test_round_trip():
+    encoded = encode_keys(data, universe)
+    assert encoded.schema["ticker"] == universe
+    assert encoded["ticker"].to_physical().to_list() == [1, 0, 1]
+    assert decode_keys(encoded).equals(data)
+
+
+def test_unknown_tickers_are_null():
+    encoded = encode_keys(pl.DataFrame({"ticker": ["A", "Z"]}), universe)
+    assert encoded["ticker"].to_list() == ["A", None]
+
+
+def test_align_string_and_enum():
+    left = encode_keys(data, universe)
+    right = pl.DataFrame({"ticker": ["A"], "weight": [1.0]})
+    left, right = align_keys(left, right)
+    assert right.schema["ticker"] == universe
+    assert left.join(right, on="ticker")["ret"].to_list() == [0.1, 0.3]
+
+
+def test_align_widens_older_universe():
+    # Ids are only ever appended, so a newer universe extends an older one
+    newer = pl.Enum(["B", "A", "C"])
+    left = encode_keys(data, universe)
+    right = encode_keys(
+        pl.DataFrame({"ticker": ["A", "C"], "weight": [1.0, 2.0]}), newer
+    )
+    left, right = align_keys(left, right)
+    assert left.schema["ticker"] == right.schema["ticker"] == newer
+    assert left["ticker"].to_list() == data["ticker"].to_list()
+    assert left.join(right, on="ticker")["ret"].to_list() == [0.1, 0.3]
+
+
+def test_row_key():
+    keys = encode_keys(data, universe).select(row_key()).to_series()
+    assert keys.dtype == pl.UInt64
+    assert keys.n_unique() == 3
+    assert keys[0] < keys[1]
@@ -0,0 +1,58 @@
+from qcomponents import ChunkedData, PanelData
+from src.signals import reversal_signal
+from src.optimizers import decile_portfolio, decile_portfolios
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+from datetime import date, timedelta
+from functools import partial
+
+rng = np.random.default_rng(0)
+data = (
+    pl.DataFrame(
+        [
+            {
+                "ticker": f"T{ticker}",
+                "date": date(2024, 1, 1) + timedelta(days=day),
+                "close": rng.uniform(10, 20),
+            }
+            for ticker in range(30)
+            for day in range(60)
+            if rng.random() > 0.03
+        ]
+    )
+    .sort(by=["ticker", "date"])
+    .with_columns(pl.col("close").pct_change().over("ticker").alias("ret"))
+)
+
+
+def run(chunked_data: ChunkedData) -> list[list[pl.DataFrame]]:
+    chunked_data.apply_signal_transform(reversal_signal)
+    chunked_data.remove_chunks()
+    return chunked_data.apply_portfolio_gen(partial(decile_portfolio, signal="rev"))
+
+
+def test_panel_matches_chunked():
+    chunked = run(ChunkedData(data, 23, ["date", "ticker", "ret"]))
+    panel = run(PanelData(data, 23, ["date", "ticker", "ret"]))
+
+    assert len(chunked) == len(panel) > 0
+    for chunked_portfolios, panel_portfolios in zip(chunked, panel):
+        for chunked_portfolio, panel_portfolio in zip(
+            chunked_portfolios, panel_portfolios
+        ):
+            assert_frame_equal(chunked_portfolio, panel_portfolio)
+
+
+def test_batched_deciles_match_per_date():
+    panel_data = PanelData(data, 23, ["date", "ticker", "ret"])
+    chunked = run(panel_data)
+    batched = decile_portfolios(panel_data.frame, signal="rev")
+
+    expected = pl.concat(
+        [
+            pl.concat(portfolios).select(["date", "ticker", "bin", "weight"])
+            for portfolios in chunked
+        ]
+    )
+    assert_frame_equal(batched, expected)
@@ -0,0 +1,35 @@
+from qcomponents import PortfolioSet
+import polars as pl
+from datetime import date, timedelta
+
+frames = [
+    pl.DataFrame(
+        {
+            "date": date(2024, 1, 1) + timedelta(days=day),
+            "ticker": ["A", "B", "C"][: day % 3 + 1],
+            "weight": 1 / (day % 3 + 1),
+        }
+    )
+    for day in range(6)
+]
+
+
+def test_access():
+    portfolios = PortfolioSet.from_frames(frames)
+
+    assert len(portfolios) == 6
+    assert portfolios[-1].equals(frames[-1])
+    assert portfolios.at(date(2024, 1, 3)).equals(frames[2])
+    assert all(a.equals(b) for a, b in zip(portfolios, frames))
+    assert portfolios.frame.equals(pl.concat(frames))
+
+
+def test_slices():
+    portfolios = PortfolioSet(pl.concat(frames[::-1]))
+
+    sliced = portfolios.between(date(2024, 1, 2), date(2024, 1, 4))
+    assert sliced.dates == [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)]
+    assert sliced[0].equals(frames[1])
+    assert sliced.at(date(2024, 1, 4)).equals(frames[3])
+    assert portfolios[4:][1].equals(frames[5])
+    assert len(portfolios.between(date(2025, 1, 1), date(2025, 2, 1))) == 0
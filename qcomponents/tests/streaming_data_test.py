@@ -0,0 +1,45 @@
+from qcomponents import ChunkedData, StreamingData
+import polars as pl
+from datetime import date, timedelta
+
+data = pl.DataFrame(
+    [
+        {"ticker": ticker, "date": date(2024, 1, 1) + timedelta(days=day), "ret": day}
+        for day in range(20)
+        for ticker in ["A", "B", "C"]
+        if not (ticker == "C" and day % 4 == 2)
+    ]
+)
+
+
+def test_windows():
+    chunked_data = ChunkedData(data, window=5, columns=["date", "ticker", "ret"])
+
+    for batch_size in [1, 3, 5, 50]:
+        streaming_data = StreamingData(
+            data.lazy(),
+            window=5,
+            columns=["date", "ticker", "ret"],
+            batch_size=batch_size,
+        )
+        chunks = list(streaming_data)
+
+        assert len(chunks) == len(chunked_data.chunks)
+        assert all(a.equals(b) for a, b in zip(chunks, chunked_data.chunks))
+
+
+def test_start_date():
+    streaming_data = StreamingData(
+        data.lazy(),
+        window=5,
+        columns=["date", "ticker", "ret"],
+        start_date=date(2024, 1, 15),
+        batch_size=2,
+    )
+    streaming_data.apply_signal_transform(lambda chunk: chunk.filter(pl.col("ret") > 0))
+    chunks = list(streaming_data)
+
+    assert len(chunks) == 6
+    assert chunks[0]["date"].min() == date(2024, 1, 11)
+    assert chunks[0]["date"].max() == date(2024, 1, 15)
+    assert len(streaming_data._data) <= 5 * 3
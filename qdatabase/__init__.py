@@ -1,3 +1,5 @@
 from .database import Database
+from .coverage_index import CoverageIndex
+from .dataset_cache import DatasetCache, dataset_cache
 
-__all__ = ["Database"]
+__all__ = ["Database", "CoverageIndex", "DatasetCache", "dataset_cache"]
@@ -0,0 +1,121 @@
+import polars as pl
+from datetime import date, timedelta
+from .database import Database
+
+
+class CoverageIndex:
+    """
+    Tracks which date ranges of a table are already stored for every ticker.
+    The ranges live in a small (ticker, start_date, end_date) table named
+    `<table_name>_COVERAGE`, so downloads only have to request the gaps.
+    """
+
+    def __init__(self, db: Database, table_name: str):
+        self.db = db
+        self.table_name = f"{table_name}_COVERAGE"
+
+        if not self.db.exists(self.table_name):
+            self.db.create(self.table_name, self._bootstrap(table_name))
+
+    def load(self) -> pl.DataFrame:
+        return self.db.read(self.table_name)
+
+    def gaps(
+        self, tickers: list[str], start_date: date, end_date: date
+    ) -> pl.DataFrame:
+        """(ticker, start_date, end_date) ranges inside the request that are not covered yet."""
+        ranges = self._ranges(tickers)
+
+        gaps = [
+            {"ticker": ticker, "start_date": start, "end_date": end}
+            for ticker in tickers
+            for start, end in missing_ranges(
+                ranges.get(ticker, []), start_date, end_date
+            )
+        ]
+        return pl.DataFrame(gaps, schema=self._schema())
+
+    def add(self, tickers: list[str], start_date: date, end_date: date) -> None:
+        """Mark [start_date, end_date] as covered for every ticker."""
+        ranges = self._ranges()
+        for ticker in tickers:
+            ranges[ticker] = merge_ranges(
+                ranges.get(ticker, []) + [(start_date, end_date)]
+            )
+
+        coverage = pl.DataFrame(
+            [
+                {"ticker": ticker, "start_date": start, "end_date": end}
+                for ticker, ticker_ranges in ranges.items()
+                for start, end in ticker_ranges
+            ],
+            schema=self._schema(),
+        )
+        self.db.create(self.table_name, coverage.sort(by="ticker"), overwrite=True)
+
+    def _ranges(
+        self, tickers: list[str] | None = None
+    ) -> dict[str, list[tuple[date, date]]]:
+        coverage = self.load()
+        if tickers is not None:
+            coverage = coverage.filter(pl.col("ticker").is_in(tickers))
+
+        ranges: dict[str, list[tuple[date, date]]] = {}
+        for ticker, start, end in coverage.iter_rows():
+            ranges.setdefault(ticker, []).append((start, end))
+        return ranges
+
+    def _bootstrap(self, table_name: str) -> pl.DataFrame:
+        """Seed the index from the first and last date already stored for each ticker."""
+        if not self.db.exists(table_name):
+            return pl.DataFrame(schema=self._schema())
+
+        return (
+            self.db.scan(table_name, columns=["ticker", "date"])
+            .group_by("ticker")
+            .agg(
+                start_date=pl.col("date").min(),
+                end_date=pl.col("date").max(),
+            )
+            .sort(by="ticker")
+            .collect()
+        )
+
+    @staticmethod
+    def _schema() -> dict:
+        return {"ticker": pl.Utf8, "start_date": pl.Date, "end_date": pl.Date}
+
+
+def missing_ranges(
+    ranges: list[tuple[date, date]], start_date: date, end_date: date
+) -> list[tuple[date, date]]:
+    """Sub-ranges of [start_date, end_date] not covered by any of the inclusive ranges."""
+    missing = []
+    cursor = start_date
+
+    for start, end in sorted(ranges):
+        if end < cursor:
+            continue
+        if start > end_date:
+            break
+        if start > cursor:
+            missing.append((cursor, start - timedelta(days=1)))
+        cursor = max(cursor, end + timedelta(days=1))
+
+    if cursor <= end_date:
+        missing.append((cursor, end_date))
+
+    return missing
+
+
+def merge_ranges(ranges: list[tuple[date, date]]) -> list[tuple[date, date]]:
+    """Merge overlapping or adjacent inclusive date ranges."""
+    merged: list[tuple[date, date]] = []
+
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
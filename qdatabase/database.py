@@ -1,58 +1,526 @@
 import polars as pl
+from datetime import date
+from itertools import groupby
+import json
 import os
 import shutil
+import uuid
+import pyarrow.parquet as pq
+from qprofiler import tracer, trace
 
 
 class Database:
     def __init__(self):
         self._tables_dir = "qdatabase/.tables/"
         self._archive_dir = "qdatabase/.archive/"
+        self._hot_dir = "qdatabase/.hot/"
 
         os.makedirs(self._tables_dir, exist_ok=True)
         os.makedirs(self._archive_dir, exist_ok=True)
+        os.makedirs(self._hot_dir, exist_ok=True)
 
+    @trace("db.create")
     def create(
-        self, table_name: str, data: pl.DataFrame, overwrite: bool = False
+        self,
+        table_name: str,
+        data: pl.DataFrame,
+        overwrite: bool = False,
+        partition_on: str | None = None,
     ) -> None:
         """
         Method for creating a table in the database. If no data is given, an empty table is created.
         All tables are stored locally as parquet files using polars.
-        """
-        table_path = self.get_table_path(table_name)
 
+        If partition_on is given the table is stored as a directory of parquet fragments,
+        partitioned hive-style by the year and month of that date column, and inserts
+        append new fragments instead of rewriting the table.
+        """
         # Overwrite check
         if self.exists(table_name) and not overwrite:
             return
 
+        if self.is_partitioned(table_name) or (
+            partition_on is not None and self.exists(table_name)
+        ):
+            self.delete(table_name)
+
+        if partition_on is not None:
+            self._create_partitioned(table_name, data, partition_on)
+            return
+
+        table_path = self.get_table_path(table_name)
+
         # Write non-empty or schema-defined DataFrame
         if data is not None or data.schema:
-            data.write_parquet(table_path)
+            data.write_parquet(f"{table_path}.tmp")
 
         # Write empty dataframe
         else:
-            pl.DataFrame().write_parquet(table_path)
+            pl.DataFrame().write_parquet(f"{table_path}.tmp")
 
-    def read(self, table_name: str) -> pl.DataFrame:
-        table_path = self.get_table_path(table_name)
-        return pl.read_parquet(table_path)
+        # Replace atomically so a table is never seen half written
+        os.replace(f"{table_path}.tmp", table_path)
+
+        if tracer.enabled:
+            tracer.current().add(
+                rows=len(data), bytes_written=os.path.getsize(table_path)
+            )
+
+    @trace("db.read")
+    def read(
+        self,
+        table_name: str,
+        columns: list[str] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> pl.DataFrame:
+        # Hot tables map their Arrow copy, whole-column reads share its pages
+        if self.is_hot(table_name) and start_date is None and end_date is None:
+            hot_path = self._hot_path(table_name)
+            self._count_mapped(hot_path)
+            return pl.read_ipc(hot_path, columns=columns, memory_map=True)
+
+        if (
+            not self.is_partitioned(table_name)
+            and columns is None
+            and start_date is None
+            and end_date is None
+        ):
+            table_path = self.get_table_path(table_name)
+            self._count_read([table_path], None)
+            return pl.read_parquet(table_path)
+
+        return self.scan(table_name, columns, start_date, end_date).collect()
+
+    @trace("db.scan")
+    def scan(
+        self,
+        table_name: str,
+        columns: list[str] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        date_column: str = "date",
+        tickers: list[str] | None = None,
+    ) -> pl.LazyFrame:
+        """
+        Lazily scan a table. The column list and date range are pushed down into the
+        parquet reader, so columns and row groups outside of them are never decoded.
+        Partitioned tables also skip every fragment whose manifest stats fall outside
+        the date range or tickers, and full scans of hot tables view their
+        memory-mapped Arrow copy. Rows of partitioned tables come partition by
+        partition, sorted by ticker and date within each.
+
+        While tracing, the db.scan span counts the parquet bytes the scan will read
+        once collected (files_read, bytes_read) or the size of the mapped copy
+        (bytes_mapped); the read itself is timed by the span that collects it.
+        """
+        tracer.current().set(table=table_name)
+
+        # Columns the reader decodes: the selection and the filtered columns
+        needed = None
+        if columns is not None:
+            needed = {*columns, date_column} if start_date or end_date else {*columns}
+            if tickers is not None:
+                needed.add("ticker")
+
+        # Only full scans view the mapped copy of a hot table (scan_ipc would copy
+        # it). Filtered scans go to parquet, where the manifest prunes fragments, so
+        # a narrow scan right after a write doesn't rewrite the whole copy
+        full = start_date is None and end_date is None and tickers is None
+        if full and self.is_hot(table_name):
+            hot_path = self._hot_path(table_name)
+            self._count_mapped(hot_path)
+            table = pl.read_ipc(hot_path, memory_map=True).lazy()
+        elif self.is_partitioned(table_name):
+            table = self._scan_partitioned(
+                table_name, start_date, end_date, tickers, needed
+            )
+        else:
+            table_path = self.get_table_path(table_name)
+            self._count_read([table_path], needed)
+            table = pl.scan_parquet(table_path)
+
+        if start_date is not None:
+            table = table.filter(pl.col(date_column) >= start_date)
+
+        if end_date is not None:
+            table = table.filter(pl.col(date_column) <= end_date)
+
+        if tickers is not None:
+            table = table.filter(pl.col("ticker").is_in(tickers))
+
+        if columns is not None:
+            table = table.select(columns)
+
+        return table
 
+    @trace("db.insert")
     def insert(self, table_name: str, rows: pl.DataFrame) -> None:
-        table = self.read(table_name)
+        if self.is_partitioned(table_name):
+            manifest = self._read_manifest(table_name)
+            fragments = self._write_fragments(
+                table_name, rows, manifest["partition_on"]
+            )
+            manifest["fragments"] += fragments
+            self._write_manifest(table_name, manifest)
+            return
+
+        table = pl.read_parquet(self.get_table_path(table_name))
         table = pl.concat([table, rows])
         self.create(table_name, table, overwrite=True)
 
+    @trace("db.upsert")
+    def upsert(self, table_name: str, rows: pl.DataFrame, on: list[str]) -> None:
+        """
+        Insert rows, replacing any existing rows with the same `on` keys. For partitioned
+        tables only the partitions that already hold one of the keys are rewritten, every
+        other partition just gets a new fragment.
+        """
+        if not self.is_partitioned(table_name):
+            table = pl.read_parquet(self.get_table_path(table_name))
+            table = table.join(rows.select(on), on=on, how="anti")
+            table = pl.concat([table, rows.select(table.columns)])
+            self.create(table_name, table, overwrite=True)
+            return
+
+        manifest = self._read_manifest(table_name)
+        table_dir = self.get_table_path(table_name)
+        partition_on = manifest["partition_on"]
+
+        fragments = []
+        stale_paths = []
+        partitions = self._partitions(rows, partition_on)
+        for (year, month), partition_rows in partitions.items():
+            partition_dir = f"year={year}/month={month:02d}"
+            paths = [
+                fragment["path"]
+                for fragment in manifest["fragments"]
+                if os.path.dirname(fragment["path"]) == partition_dir
+            ]
+            full_paths = [os.path.join(table_dir, path) for path in paths]
+
+            # Only read whole fragments back when a key actually collides
+            collisions = (
+                pl.scan_parquet(full_paths)
+                .select(on)
+                .join(partition_rows.lazy().select(on), on=on, how="semi")
+                .collect()
+                if paths
+                else pl.DataFrame()
+            )
+
+            if collisions.is_empty():
+                fragments += self._write_fragments(
+                    table_name, partition_rows, partition_on
+                )
+                continue
+
+            kept = pl.read_parquet(full_paths).join(
+                partition_rows.select(on), on=on, how="anti"
+            )
+            data = pl.concat([kept, partition_rows.select(kept.columns)])
+            fragments += self._write_fragments(table_name, data, partition_on)
+            stale_paths += paths
+
+        manifest["fragments"] = [
+            fragment
+            for fragment in manifest["fragments"]
+            if fragment["path"] not in stale_paths
+        ] + fragments
+        self._write_manifest(table_name, manifest)
+
+        for path in stale_paths:
+            os.remove(os.path.join(table_dir, path))
+
+    @trace("db.compact")
+    def compact(self, table_name: str) -> None:
+        """
+        Merge the fragments of every partition of a partitioned table into a single
+        fragment sorted by ticker and date. Single-file tables are left as they are.
+        """
+        if not self.is_partitioned(table_name):
+            return
+
+        manifest = self._read_manifest(table_name)
+        table_dir = self.get_table_path(table_name)
+        partition_on = manifest["partition_on"]
+
+        partitions: dict[str, list[dict]] = {}
+        for fragment in manifest["fragments"]:
+            partition = os.path.dirname(fragment["path"])
+            partitions.setdefault(partition, []).append(fragment)
+
+        fragments = []
+        stale_paths = []
+        for partition, partition_fragments in partitions.items():
+            if len(partition_fragments) == 1:
+                fragments += partition_fragments
+                continue
+
+            data = pl.read_parquet(
+                [os.path.join(table_dir, f["path"]) for f in partition_fragments]
+            )
+            fragments += self._write_fragments(table_name, data, partition_on)
+            stale_paths += [f["path"] for f in partition_fragments]
+
+        # Swap the manifest before removing old fragments so readers never miss data
+        manifest["fragments"] = fragments
+        self._write_manifest(table_name, manifest)
+
+        for path in stale_paths:
+            os.remove(os.path.join(table_dir, path))
+
+    def make_hot(self, table_name: str) -> None:
+        """
+        Keep an uncompressed Arrow IPC copy of the table next to its parquet source.
+        Reads memory-map the copy instead of decoding parquet, so every process reading
+        the table shares the same pages through the OS page cache. The copy is tagged
+        with the source version and written on the first full read of every version,
+        writes and filtered reads never touch it.
+        """
+        os.makedirs(os.path.join(self._hot_dir, table_name), exist_ok=True)
+
+    def make_cold(self, table_name: str) -> None:
+        """Drop the Arrow copy of a hot table, reads go back to parquet."""
+        shutil.rmtree(os.path.join(self._hot_dir, table_name), ignore_errors=True)
+
+    def is_hot(self, table_name: str) -> bool:
+        return os.path.isdir(os.path.join(self._hot_dir, table_name))
+
     def archive(self, table_name: str) -> None:
+        self.make_cold(table_name)
         src_table_path = self.get_table_path(table_name)
-        dst_table_path = os.path.join(self._archive_dir, f"{table_name}.parquet")
+        dst_table_path = os.path.join(
+            self._archive_dir, os.path.basename(os.path.normpath(src_table_path))
+        )
         shutil.move(src_table_path, dst_table_path)
 
     def delete(self, table_name: str) -> None:
+        self.make_cold(table_name)
         table_path = self.get_table_path(table_name)
-        os.remove(table_path)
+        if os.path.isdir(table_path):
+            shutil.rmtree(table_path)
+        else:
+            os.remove(table_path)
 
     def get_table_path(self, table_name: str) -> str:
+        table_dir = os.path.join(self._tables_dir, table_name)
+        if os.path.isdir(table_dir):
+            return table_dir
         return os.path.join(self._tables_dir, f"{table_name}.parquet")
 
     def exists(self, table_name: str) -> bool:
         table_path = self.get_table_path(table_name)
         return os.path.exists(table_path)
+
+    def is_partitioned(self, table_name: str) -> bool:
+        return os.path.isdir(os.path.join(self._tables_dir, table_name))
+
+    def version(self, table_name: str) -> int:
+        """Changes whenever the table does: manifest version or file inode and mtime."""
+        if self.is_partitioned(table_name):
+            return self._read_manifest(table_name)["version"]
+
+        # Every write replaces the file, so the inode changes even within one mtime tick
+        stat = os.stat(self.get_table_path(table_name))
+        return stat.st_ino << 64 | stat.st_mtime_ns
+
+    def fragments(self, table_name: str) -> list[dict]:
+        """
+        Manifest entries (path, rows, stats) of a partitioned table. Every write adds
+        fragments under new paths, so comparing paths tells which rows are new.
+        """
+        return self._read_manifest(table_name)["fragments"]
+
+    def _hot_path(self, table_name: str) -> str:
+        """Path of the Arrow copy of the current table version, written if missing."""
+        hot_dir = os.path.join(self._hot_dir, table_name)
+        version = self.version(table_name)
+        hot_path = os.path.join(hot_dir, f"{version}.arrow")
+
+        if not os.path.exists(hot_path):
+            self._write_hot(table_name, hot_path)
+
+            # Processes still mapping an old copy keep it until they unmap it
+            for name in os.listdir(hot_dir):
+                if name.endswith(".arrow") and name != os.path.basename(hot_path):
+                    try:
+                        os.remove(os.path.join(hot_dir, name))
+                    except FileNotFoundError:
+                        pass
+
+        return hot_path
+
+    @trace("db.hot")
+    def _write_hot(self, table_name: str, hot_path: str) -> None:
+        if self.is_partitioned(table_name):
+            data = self._scan_partitioned(table_name, None, None, None).collect()
+        else:
+            table_path = self.get_table_path(table_name)
+            self._count_read([table_path], None)
+            data = pl.read_parquet(table_path)
+
+        # Unique temporary name so concurrent writers never share a file
+        tmp_path = f"{hot_path}.{uuid.uuid4().hex}.tmp"
+        data.write_ipc(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, hot_path)
+
+        if tracer.enabled:
+            tracer.current().add(
+                rows=len(data), bytes_written=os.path.getsize(hot_path)
+            )
+
+    def _create_partitioned(
+        self, table_name: str, data: pl.DataFrame, partition_on: str
+    ) -> None:
+        table_dir = os.path.join(self._tables_dir, table_name)
+        os.makedirs(table_dir)
+
+        # Keep the schema around so empty tables can still be scanned
+        data.clear().write_parquet(os.path.join(table_dir, "_schema.parquet"))
+
+        manifest = {"version": 0, "partition_on": partition_on, "fragments": []}
+        manifest["fragments"] = self._write_fragments(table_name, data, partition_on)
+        self._write_manifest(table_name, manifest)
+
+    def _scan_partitioned(
+        self,
+        table_name: str,
+        start_date: date | None,
+        end_date: date | None,
+        tickers: list[str] | None,
+        columns: set[str] | None = None,
+    ) -> pl.LazyFrame:
+        table_dir = self.get_table_path(table_name)
+        manifest = self._read_manifest(table_name)
+
+        # Prune fragments with the manifest stats
+        paths = []
+        for fragment in manifest["fragments"]:
+            stats = fragment["stats"]
+            min_date, max_date = stats[manifest["partition_on"]]
+            if start_date is not None and date.fromisoformat(max_date) < start_date:
+                continue
+            if end_date is not None and date.fromisoformat(min_date) > end_date:
+                continue
+            if tickers is not None and "ticker" in stats:
+                min_ticker, max_ticker = stats["ticker"]
+                if not any(min_ticker <= ticker <= max_ticker for ticker in tickers):
+                    continue
+            paths.append(os.path.join(table_dir, fragment["path"]))
+
+        if not paths:
+            return pl.scan_parquet(os.path.join(table_dir, "_schema.parquet"))
+
+        tracer.current().set(fragments=len(paths))
+        self._count_read(paths, columns)
+
+        # The manifest lists fragments in partition order and every fragment is
+        # sorted, so only partitions written by several inserts need a sort (until
+        # compacted). Runs of single-fragment partitions are scanned together
+        sort_by = [col for col in ["ticker", manifest["partition_on"]] if col in stats]
+        scans, run = [], []
+        for partition, partition_paths in groupby(paths, key=os.path.dirname):
+            partition_paths = list(partition_paths)
+            if len(partition_paths) == 1:
+                run += partition_paths
+                continue
+            if run:
+                scans.append(pl.scan_parquet(run))
+                run = []
+            scans.append(pl.scan_parquet(partition_paths).sort(by=sort_by))
+        if run:
+            scans.append(pl.scan_parquet(run))
+
+        return scans[0] if len(scans) == 1 else pl.concat(scans)
+
+    @staticmethod
+    def _count_read(paths: list[str], columns: set[str] | None) -> None:
+        """
+        Add the bytes a read of the parquet files fetches to the current span: the
+        compressed column chunks of the columns it decodes, from the file footers.
+        Row groups the reader skips by their statistics are still counted.
+        """
+        if not tracer.enabled:
+            return
+
+        bytes_read = 0
+        for path in paths:
+            metadata = pq.read_metadata(path)
+            for i in range(metadata.num_row_groups):
+                row_group = metadata.row_group(i)
+                for j in range(row_group.num_columns):
+                    chunk = row_group.column(j)
+                    # Nested columns list their leaves, e.g. "logrets.list.element"
+                    if columns is None or chunk.path_in_schema.split(".")[0] in columns:
+                        bytes_read += chunk.total_compressed_size
+
+        tracer.current().add(files_read=len(paths), bytes_read=bytes_read)
+
+    @staticmethod
+    def _count_mapped(hot_path: str) -> None:
+        """Mapped pages are only read when touched, so count them apart from reads."""
+        if tracer.enabled:
+            tracer.current().add(bytes_mapped=os.path.getsize(hot_path))
+
+    def _write_fragments(
+        self, table_name: str, data: pl.DataFrame, partition_on: str
+    ) -> list[dict]:
+        """Write one new fragment per year/month partition of data and return their stats."""
+        table_dir = self.get_table_path(table_name)
+        sort_by = [col for col in ["ticker", partition_on] if col in data.columns]
+
+        fragments = []
+        for (year, month), partition in self._partitions(data, partition_on).items():
+            partition_dir = f"year={year}/month={month:02d}"
+            os.makedirs(os.path.join(table_dir, partition_dir), exist_ok=True)
+
+            path = os.path.join(partition_dir, f"part-{uuid.uuid4().hex}.parquet")
+            full_path = os.path.join(table_dir, path)
+
+            # Write to a temporary file first so a fragment only appears once complete
+            partition.sort(by=sort_by).write_parquet(f"{full_path}.tmp")
+            os.replace(f"{full_path}.tmp", full_path)
+
+            if tracer.enabled:
+                tracer.current().add(
+                    rows=len(partition), bytes_written=os.path.getsize(full_path)
+                )
+
+            stats = {
+                col: [str(partition[col].min()), str(partition[col].max())]
+                for col in [partition_on, "ticker"]
+                if col in partition.columns
+            }
+            fragments.append({"path": path, "rows": len(partition), "stats": stats})
+
+        return fragments
+
+    @staticmethod
+    def _partitions(
+        data: pl.DataFrame, partition_on: str
+    ) -> dict[tuple[int, int], pl.DataFrame]:
+        keys = data.select(
+            pl.col(partition_on).dt.year().alias("_year"),
+            pl.col(partition_on).dt.month().alias("_month"),
+        )
+        groups = pl.concat([data, keys], how="horizontal").partition_by(
+            ["_year", "_month"], as_dict=True, include_key=False
+        )
+        return {(year, month): group for (year, month), group in groups.items()}
+
+    def _read_manifest(self, table_name: str) -> dict:
+        manifest_path = os.path.join(self.get_table_path(table_name), "_manifest.json")
+        with open(manifest_path) as file:
+            return json.load(file)
+
+    def _write_manifest(self, table_name: str, manifest: dict) -> None:
+        manifest_path = os.path.join(self.get_table_path(table_name), "_manifest.json")
+        manifest["version"] += 1
+
+        # Paths start with their partition, so this keeps fragments in partition order
+        manifest["fragments"].sort(key=lambda fragment: fragment["path"])
+
+        with open(f"{manifest_path}.tmp", "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
@@ -0,0 +1,120 @@
+import polars as pl
+from collections import OrderedDict
+from datetime import date
+import threading
+from .database import Database
+
+
+class DatasetCache:
+    """
+    In-process LRU cache of table reads keyed by (table, date range, columns).
+    A read is served from any cached entry of the same table whose date range and
+    columns contain the request, so sub-ranges never touch disk again. Entries are
+    dropped once the table's version changes, and the least recently used entries
+    are evicted to keep the cache under max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024**3):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, pl.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def read(
+        self,
+        db: Database,
+        table_name: str,
+        columns: list[str] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> pl.DataFrame:
+        table_path = db.get_table_path(table_name)
+        version = db.version(table_name)
+
+        with self._lock:
+            for key in list(self._entries):
+                cached_path, cached_version, *cached = key
+                if cached_path != table_path:
+                    continue
+
+                # Stale entries are dropped as soon as they are seen
+                if cached_version != version:
+                    del self._entries[key]
+                    continue
+
+                if self._covers(cached, (columns, start_date, end_date)):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._slice(
+                        self._entries[key], cached, columns, start_date, end_date
+                    )
+
+        self.misses += 1
+
+        # Mapping whole columns of a hot table is free, so keep those and slice ranges
+        read_start, read_end = start_date, end_date
+        if db.is_hot(table_name) and (columns is None or "date" in columns):
+            read_start, read_end = None, None
+        data = db.read(table_name, columns, read_start, read_end)
+
+        cached = (tuple(columns) if columns is not None else None, read_start, read_end)
+        with self._lock:
+            self._entries[(table_path, version, *cached)] = data
+            self._evict()
+
+        return self._slice(data, cached, columns, start_date, end_date)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(data.estimated_size() for data in self._entries.values())
+
+    def _evict(self) -> None:
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _covers(cached: tuple, requested: tuple) -> bool:
+        cached_columns, cached_start, cached_end = cached
+        columns, start_date, end_date = requested
+
+        if cached_columns is not None and (
+            columns is None or not set(columns) <= set(cached_columns)
+        ):
+            return False
+        if cached_start is not None and (
+            start_date is None or start_date < cached_start
+        ):
+            return False
+        if cached_end is not None and (end_date is None or end_date > cached_end):
+            return False
+
+        # Narrowing the date range needs the date column
+        narrower = start_date != cached_start or end_date != cached_end
+        return not narrower or cached_columns is None or "date" in cached_columns
+
+    @staticmethod
+    def _slice(
+        data: pl.DataFrame,
+        cached: tuple,
+        columns: list[str] | None,
+        start_date: date | None,
+        end_date: date | None,
+    ) -> pl.DataFrame:
+        cached_columns, cached_start, cached_end = cached
+
+        if start_date != cached_start:
+            data = data.filter(pl.col("date") >= start_date)
+        if end_date != cached_end:
+            data = data.filter(pl.col("date") <= end_date)
+        if columns is not None and tuple(columns) != cached_columns:
+            data = data.select(columns)
+        return data
+
+
+# Shared by every dataset in the process
+dataset_cache = DatasetCache()
@@ -0,0 +1,46 @@
+from qdatabase import Database, CoverageIndex
+import polars as pl
+from datetime import date
+
+db = Database()
+
+
+def test_bootstrap():
+    data = pl.DataFrame(
+        [
+            {"ticker": "A", "date": date(2024, 1, 2)},
+            {"ticker": "A", "date": date(2024, 1, 31)},
+        ]
+    )
+    db.create("test_coverage", data, overwrite=True)
+    if db.exists("test_coverage_COVERAGE"):
+        db.delete("test_coverage_COVERAGE")
+
+    coverage = CoverageIndex(db, "test_coverage")
+    assert coverage.load().rows() == [("A", date(2024, 1, 2), date(2024, 1, 31))]
+
+
+def test_gaps():
+    coverage = CoverageIndex(db, "test_coverage")
+    gaps = coverage.gaps(["A", "B"], date(2024, 1, 1), date(2024, 2, 5))
+    assert gaps.rows() == [
+        ("A", date(2024, 1, 1), date(2024, 1, 1)),
+        ("A", date(2024, 2, 1), date(2024, 2, 5)),
+        ("B", date(2024, 1, 1), date(2024, 2, 5)),
+    ]
+
+
+def test_add():
+    coverage = CoverageIndex(db, "test_coverage")
+    coverage.add(["A", "B"], date(2024, 2, 1), date(2024, 2, 5))
+    assert coverage.load().rows() == [
+        ("A", date(2024, 1, 2), date(2024, 2, 5)),
+        ("B", date(2024, 2, 1), date(2024, 2, 5)),
+    ]
+    assert coverage.gaps(["A"], date(2024, 1, 2), date(2024, 2, 5)).is_empty()
+
+
+def test_delete():
+    db.delete("test_coverage")
+    db.delete("test_coverage_COVERAGE")
+    assert not db.exists("test_coverage_COVERAGE")
@@ -16,7 +16,7 @@ db = Database()
 
 def test_create():
     db.create("test", data)
-    assert os.path.exists("database/.tables/test.parquet")
+    assert os.path.exists("qdatabase/.tables/test.parquet")
 
 
 def test_read():
@@ -24,6 +24,14 @@ def test_read():
     assert_frame_equal(test_data, data)
 
 
+def test_scan():
+    test_data = db.scan("test", columns=["a", "c"]).collect()
+    assert_frame_equal(test_data, data.select(["a", "c"]))
+
+    test_data = db.scan("test").filter(pl.col("b") > 2).collect()
+    assert_frame_equal(test_data, data.filter(pl.col("b") > 2))
+
+
 def test_delete():
     db.delete("test")
-    assert not os.path.exists("database/.tables/test.parquet")
+    assert not os.path.exists("qdatabase/.tables/test.parquet")
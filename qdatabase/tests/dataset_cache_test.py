@@ -0,0 +1,69 @@
+from qdatabase import Database, DatasetCache
+import polars as pl
+from polars.testing import assert_frame_equal
+from datetime import date
+
+data = pl.DataFrame(
+    [
+        {"ticker": "A", "date": date(2024, 1, 2), "close": 1.0},
+        {"ticker": "A", "date": date(2024, 2, 1), "close": 2.0},
+        {"ticker": "A", "date": date(2024, 3, 1), "close": 3.0},
+    ]
+)
+
+db = Database()
+cache = DatasetCache()
+
+
+def test_sub_range_hit():
+    db.create("test_cache", data, overwrite=True, partition_on="date")
+    cache.read(
+        db, "test_cache", start_date=date(2024, 1, 1), end_date=date(2024, 3, 31)
+    )
+
+    test_data = cache.read(
+        db,
+        "test_cache",
+        columns=["date", "close"],
+        start_date=date(2024, 2, 1),
+        end_date=date(2024, 2, 29),
+    )
+    assert_frame_equal(
+        test_data, pl.DataFrame({"date": [date(2024, 2, 1)], "close": [2.0]})
+    )
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidation():
+    db.insert("test_cache", data.with_columns(pl.lit("B").alias("ticker")))
+    test_data = cache.read(
+        db, "test_cache", start_date=date(2024, 2, 1), end_date=date(2024, 2, 29)
+    )
+    assert len(test_data) == 2
+    assert cache.misses == 2
+
+
+def test_eviction():
+    small_cache = DatasetCache(max_bytes=1)
+    small_cache.read(db, "test_cache", columns=["close"])
+    small_cache.read(db, "test_cache", columns=["date"])
+    small_cache.read(db, "test_cache", columns=["close"])
+    assert small_cache.misses == 3
+
+
+def test_hot_table_cached_whole():
+    db.make_hot("test_cache")
+    hot_cache = DatasetCache()
+    hot_cache.read(
+        db, "test_cache", start_date=date(2024, 1, 1), end_date=date(2024, 1, 31)
+    )
+    test_data = hot_cache.read(
+        db, "test_cache", start_date=date(2024, 3, 1), end_date=date(2024, 3, 31)
+    )
+    assert test_data["date"].unique().to_list() == [date(2024, 3, 1)]
+    assert (hot_cache.hits, hot_cache.misses) == (1, 1)
+
+
+def test_delete():
+    db.delete("test_cache")
+    assert not db.exists("test_cache")
@@ -0,0 +1,78 @@
+from qdatabase import Database
+import polars as pl
+from polars.testing import assert_frame_equal
+from datetime import date
+import os
+
+data = pl.DataFrame(
+    [
+        {"ticker": "A", "date": date(2024, 1, 2), "close": 1.0},
+        {"ticker": "A", "date": date(2024, 2, 1), "close": 2.0},
+        {"ticker": "B", "date": date(2024, 2, 1), "close": 3.0},
+    ]
+)
+
+db = Database()
+
+
+def test_make_hot():
+    db.create("test_hot", data, overwrite=True, partition_on="date")
+    db.make_hot("test_hot")
+
+    # The copy is written by the first full read
+    assert db.is_hot("test_hot")
+    assert os.listdir("qdatabase/.hot/test_hot") == []
+    assert_frame_equal(db.read("test_hot"), data, check_row_order=False)
+    assert os.listdir("qdatabase/.hot/test_hot") == [f"{db.version('test_hot')}.arrow"]
+
+
+def test_read_hot():
+    test_data = db.read(
+        "test_hot",
+        columns=["ticker", "close"],
+        start_date=date(2024, 2, 1),
+        end_date=date(2024, 2, 29),
+    )
+    assert_frame_equal(
+        test_data,
+        pl.DataFrame({"ticker": ["A", "B"], "close": [2.0, 3.0]}),
+        check_row_order=False,
+    )
+
+
+def test_refresh_on_change():
+    rows = pl.DataFrame([{"ticker": "A", "date": date(2024, 3, 1), "close": 4.0}])
+    db.insert("test_hot", rows)
+
+    assert len(db.read("test_hot")) == 4
+    assert os.listdir("qdatabase/.hot/test_hot") == [f"{db.version('test_hot')}.arrow"]
+
+
+def test_writes_and_filtered_scans_skip_copy():
+    copies = os.listdir("qdatabase/.hot/test_hot")
+    rows = pl.DataFrame([{"ticker": "B", "date": date(2024, 3, 1), "close": 5.0}])
+    db.upsert("test_hot", rows, on=["ticker", "date"])
+
+    test_data = db.scan("test_hot", start_date=date(2024, 3, 1), tickers=["B"])
+    assert test_data.collect()["close"].to_list() == [5.0]
+    assert os.listdir("qdatabase/.hot/test_hot") == copies
+
+    assert len(db.scan("test_hot").collect()) == 5
+    assert os.listdir("qdatabase/.hot/test_hot") == [f"{db.version('test_hot')}.arrow"]
+
+
+def test_single_file_table():
+    db.create("test_hot_file", data, overwrite=True)
+    db.make_hot("test_hot_file")
+    db.create("test_hot_file", data.head(1), overwrite=True)
+
+    assert_frame_equal(
+        db.read("test_hot_file", columns=["close"]), data.head(1).select("close")
+    )
+
+
+def test_delete():
+    db.delete("test_hot")
+    db.delete("test_hot_file")
+    assert not db.is_hot("test_hot")
+    assert not db.is_hot("test_hot_file")
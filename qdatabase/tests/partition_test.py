@@ -0,0 +1,128 @@
+from qdatabase import Database
+from qprofiler import tracer
+import polars as pl
+from polars.testing import assert_frame_equal
+from datetime import date
+import os
+
+data = pl.DataFrame(
+    [
+        {"ticker": "A", "date": date(2024, 1, 2), "close": 1.0},
+        {"ticker": "B", "date": date(2024, 1, 2), "close": 2.0},
+        {"ticker": "A", "date": date(2024, 2, 1), "close": 3.0},
+    ]
+)
+
+rows = pl.DataFrame(
+    [
+        {"ticker": "C", "date": date(2024, 2, 2), "close": 4.0},
+        {"ticker": "A", "date": date(2024, 3, 1), "close": 5.0},
+    ]
+)
+
+db = Database()
+
+
+def test_create():
+    db.create("test_partitioned", data, overwrite=True, partition_on="date")
+    assert db.is_partitioned("test_partitioned")
+    assert os.path.exists("qdatabase/.tables/test_partitioned/year=2024/month=01")
+    assert_frame_equal(db.read("test_partitioned"), data, check_row_order=False)
+
+
+def test_insert():
+    db.insert("test_partitioned", rows)
+    expected = pl.concat([data, rows])
+    assert_frame_equal(db.read("test_partitioned"), expected, check_row_order=False)
+    assert len(os.listdir("qdatabase/.tables/test_partitioned/year=2024/month=02")) == 2
+
+
+def test_pruned_scan():
+    test_data = db.read(
+        "test_partitioned", start_date=date(2024, 2, 1), end_date=date(2024, 2, 29)
+    )
+    assert sorted(test_data["close"].to_list()) == [3.0, 4.0]
+
+    test_data = db.scan("test_partitioned", tickers=["C"]).collect()
+    assert test_data["close"].to_list() == [4.0]
+
+
+def test_scan_counts_bytes_read():
+    tracer.enable()
+    try:
+        db.read("test_partitioned")
+        db.read("test_partitioned", columns=["close"], start_date=date(2024, 3, 1))
+        full, pruned = [r for r in tracer.records() if r["name"] == "db.scan"]
+    finally:
+        tracer.disable()
+        tracer.clear()
+
+    # Only March's fragment, and only the close and date columns of it
+    assert full["table"] == "test_partitioned" and full["fragments"] == 4
+    assert pruned["fragments"] == 1 and pruned["files_read"] == 1
+    assert 0 < pruned["bytes_read"] < full["bytes_read"] / 3
+
+
+def test_compact():
+    db.compact("test_partitioned")
+    expected = pl.concat([data, rows])
+    assert_frame_equal(db.read("test_partitioned"), expected, check_row_order=False)
+    assert len(os.listdir("qdatabase/.tables/test_partitioned/year=2024/month=02")) == 1
+
+
+def test_upsert():
+    updates = pl.DataFrame(
+        [
+            {"ticker": "A", "date": date(2024, 2, 1), "close": 30.0},
+            {"ticker": "D", "date": date(2024, 4, 1), "close": 6.0},
+        ]
+    )
+    db.upsert("test_partitioned", updates, on=["ticker", "date"])
+
+    expected = pl.concat([data, rows]).update(
+        updates, on=["ticker", "date"], how="full"
+    )
+    assert_frame_equal(db.read("test_partitioned"), expected, check_row_order=False)
+
+
+def test_fragments():
+    before = {f["path"] for f in db.fragments("test_partitioned")}
+    db.insert("test_partitioned", rows.with_columns(pl.lit("E").alias("ticker")))
+
+    new = [f for f in db.fragments("test_partitioned") if f["path"] not in before]
+    assert sorted(f["stats"]["date"][0] for f in new) == ["2024-02-02", "2024-03-01"]
+    assert all(f["rows"] == 1 for f in new)
+
+
+def test_row_order():
+    db.create("test_partitioned", rows, overwrite=True, partition_on="date")
+
+    # Inserted later but into earlier partitions, and before rows already there
+    db.insert("test_partitioned", data)
+    db.insert(
+        "test_partitioned",
+        pl.DataFrame([{"ticker": "A", "date": date(2024, 2, 1), "close": 0.0}]),
+    )
+    expected = [
+        ("A", date(2024, 1, 2)),
+        ("B", date(2024, 1, 2)),
+        ("A", date(2024, 2, 1)),
+        ("A", date(2024, 2, 1)),
+        ("C", date(2024, 2, 2)),
+        ("A", date(2024, 3, 1)),
+    ]
+    assert db.read("test_partitioned").select(["ticker", "date"]).rows() == expected
+
+    # Compacting leaves the order as it is
+    db.compact("test_partitioned")
+    assert db.read("test_partitioned").select(["ticker", "date"]).rows() == expected
+
+
+def test_empty():
+    db.create("test_partitioned", data.clear(), overwrite=True, partition_on="date")
+    assert_frame_equal(db.read("test_partitioned"), data.clear())
+
+
+def test_delete():
+    db.delete("test_partitioned")
+    assert not db.exists("test_partitioned")
@@ -0,0 +1,88 @@
+from qprofiler import Tracer, Span
+import polars as pl
+import pytest
+import importlib
+import json
+import sys
+
+# The module, which the package's shared `tracer` instance shadows
+tracer_module = importlib.import_module("qprofiler.tracer")
+
+tracer = Tracer()
+
+
+@tracer.trace("frame")
+def frame(rows: int) -> pl.DataFrame:
+    return pl.DataFrame({"a": range(rows)})
+
+
+def test_disabled():
+    with tracer.span("outer") as span:
+        span.add(rows=10)
+    frame(5)
+
+    assert tracer.records() == []
+
+
+def test_spans(tmp_path):
+    tracer.enable()
+    with tracer.span("outer", table="test") as span:
+        span.add(rows=10)
+        tracer.current().add(rows=5, bytes_written=100)
+        frame(3)
+    tracer.disable()
+
+    inner, outer = tracer.records()
+    assert inner["name"] == "frame" and inner["parent"] == "outer"
+    assert inner["rows"] == 3 and inner["bytes"] > 0
+    assert outer["table"] == "test" and outer["depth"] == 0
+    assert outer["rows"] == 15 and outer["bytes_written"] == 100
+    assert outer["seconds"] >= inner["seconds"] and outer["process_peak_rss_mb"] > 0
+    assert (outer["rss_delta_mb"] is None) == (sys.platform != "linux")
+
+    summary = tracer.summary()
+    assert set(summary["name"]) == {"outer", "frame"}
+
+    tracer.write_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert [event["ph"] for event in events] == ["X", "X"]
+    assert events[1]["args"]["table"] == "test"
+
+    tracer.write_jsonl(tmp_path / "spans.jsonl")
+    assert len((tmp_path / "spans.jsonl").read_text().splitlines()) == 2
+    tracer.clear()
+
+
+def test_disabled_creates_no_spans(monkeypatch):
+    def fail(*args):
+        raise AssertionError("span created while tracing is off")
+
+    # Every disabled span is the one shared no-op, and traced functions call through
+    monkeypatch.setattr(Span, "__init__", fail)
+    assert tracer.span("noop") is tracer.span("other", table="test")
+    assert tracer.current() is tracer.span("noop")
+    with tracer.span("noop") as span:
+        span.add(rows=1)
+    assert len(frame(3)) == 3
+    assert tracer.records() == []
+
+    tracer.enable()
+    with pytest.raises(AssertionError):
+        tracer.span("noop")
+    tracer.disable()
+
+
+def test_memory_unavailable(monkeypatch):
+    # As on Windows, without the resource module or /proc
+    monkeypatch.setattr(tracer_module, "resource", None)
+    monkeypatch.setattr(tracer_module, "_rss", lambda: None)
+
+    tracer.enable()
+    with tracer.span("outer"):
+        pass
+    tracer.disable()
+
+    (record,) = tracer.records()
+    assert record["rss_delta_mb"] is None and record["process_peak_rss_mb"] is None
+    assert tracer.summary()["process_peak_rss_mb"].to_list() == [None]
+    tracer.clear()
@@ -0,0 +1,269 @@
+from functools import wraps
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import polars as pl
+
+try:
+    import resource
+except ImportError:  # Not on Windows
+    resource = None
+
+logger = logging.getLogger("qprofiler")
+
+
+class Span:
+    """
+    One timed stage. Attributes describe it (table, tickers, ...) and counters add
+    up what it processed (rows, bytes_read, bytes_written, ...).
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "attributes",
+        "counters",
+        "parent",
+        "depth",
+        "_start",
+        "_rss",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.counters: dict[str, int] = {}
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, **counters) -> None:
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def __enter__(self) -> "Span":
+        stack = self.tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+        self._rss = _rss()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        seconds = time.perf_counter() - self._start
+        self.tracer._stack().pop()
+        self.tracer._record(self, seconds)
+
+
+class _NoopSpan:
+    """Returned while tracing is off so instrumented code pays for one check only."""
+
+    __slots__ = ()
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def add(self, **counters) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Collects spans of wall time, counters and memory, from any thread. rss_delta_mb
+    is how much the resident set grew during a span (Linux only, None elsewhere)
+    and process_peak_rss_mb the high-water mark of the whole process when it ended,
+    not of the span (Unix only, None elsewhere). Off by default, in which case
+    span() returns a shared no-op and traced functions are called straight through.
+    Spans export as records, a polars frame, JSON lines or a Chrome trace
+    (chrome://tracing, Perfetto), and can be logged as they end.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.log = False
+        self._records: list[dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    def enable(self, log: bool = False) -> None:
+        self.enabled = True
+        self.log = log
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records = []
+
+    def span(self, name: str, **attributes) -> Span | _NoopSpan:
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def current(self) -> Span | _NoopSpan:
+        """Innermost open span of this thread, to add counters from deeper code."""
+        if not self.enabled:
+            return NOOP_SPAN
+        stack = self._stack()
+        return stack[-1] if stack else NOOP_SPAN
+
+    def trace(self, name: str | None = None):
+        """
+        Decorator that runs the function in a span. DataFrame results count their
+        rows and in-memory bytes.
+        """
+
+        def decorator(fn):
+            span_name = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+
+                with self.span(span_name) as span:
+                    result = fn(*args, **kwargs)
+                    if isinstance(result, pl.DataFrame):
+                        span.add(rows=len(result), bytes=result.estimated_size())
+                    return result
+
+            return wrapper
+
+        return decorator
+
+    def records(self) -> list[dict]:
+        with self._lock:
+            return list(self._records)
+
+    def to_frame(self) -> pl.DataFrame:
+        return pl.DataFrame(self.records(), infer_schema_length=None)
+
+    def summary(self) -> pl.DataFrame:
+        """Calls, total and max seconds and summed counters of every span name."""
+        spans = self.to_frame()
+        if spans.is_empty():
+            return spans
+
+        counters = [
+            col
+            for col in [
+                "rows",
+                "bytes",
+                "files_read",
+                "bytes_read",
+                "bytes_mapped",
+                "bytes_written",
+            ]
+            if col in spans.columns
+        ]
+        return (
+            spans.group_by("name")
+            .agg(
+                pl.len().alias("calls"),
+                pl.col("seconds").sum().alias("total_seconds"),
+                pl.col("seconds").max().alias("max_seconds"),
+                *[pl.col(col).sum() for col in counters],
+                pl.col("rss_delta_mb").max(),
+                pl.col("process_peak_rss_mb").max(),
+            )
+            .sort(by="total_seconds", descending=True)
+        )
+
+    def write_jsonl(self, path: str) -> None:
+        with open(path, "w") as file:
+            for record in self.records():
+                file.write(json.dumps(record, default=str) + "\n")
+
+    def write_chrome_trace(self, path: str) -> None:
+        """Complete ("X") events with microsecond timestamps, one row per thread."""
+        events = [
+            {
+                "name": record["name"],
+                "ph": "X",
+                "ts": record["start"] * 1e6,
+                "dur": record["seconds"] * 1e6,
+                "pid": os.getpid(),
+                "tid": record["thread"],
+                "args": {
+                    key: value
+                    for key, value in record.items()
+                    if key not in ("name", "start", "seconds", "thread")
+                },
+            }
+            for record in self.records()
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events}, file, default=str)
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span: Span, seconds: float) -> None:
+        rss, peak = _rss(), _peak_rss()
+        record = {
+            "name": span.name,
+            "start": span._start - self._origin,
+            "seconds": seconds,
+            "thread": threading.get_ident(),
+            "parent": span.parent,
+            "depth": span.depth,
+            **span.attributes,
+            **span.counters,
+            "rss_delta_mb": (
+                None if rss is None or span._rss is None else (rss - span._rss) / 2**20
+            ),
+            "process_peak_rss_mb": None if peak is None else peak / 2**20,
+        }
+        with self._lock:
+            self._records.append(record)
+
+        if self.log:
+            logger.info(json.dumps(record, default=str))
+
+
+def _rss() -> int | None:
+    """Current resident set size in bytes, where the platform exposes it."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _peak_rss() -> int | None:
+    """High-water mark of the process resident set size in bytes, where available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Shared tracer of the process
+tracer = Tracer()
+span = tracer.span
+trace = tracer.trace
+
+# QPROFILER=<path> traces the whole run and writes a Chrome trace on exit
+if os.environ.get("QPROFILER"):
+    tracer.enable()
+    atexit.register(tracer.write_chrome_trace, os.environ["QPROFILER"])
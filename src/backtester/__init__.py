@@ -1,3 +1,21 @@
 from .backtester import Backtester
+from .analytics import BacktestResult, analyze
+from .costs import CommissionModel, SpreadModel, ImpactModel, trading_costs
+from .sweep import sweep
+from .walk_forward import WalkForward
+from .multi_strategy import MultiStrategy, StrategySignal, register_signal
 
-__all__ = ["Backtester"]
+__all__ = [
+    "Backtester",
+    "BacktestResult",
+    "analyze",
+    "CommissionModel",
+    "SpreadModel",
+    "ImpactModel",
+    "trading_costs",
+    "sweep",
+    "WalkForward",
+    "MultiStrategy",
+    "StrategySignal",
+    "register_signal",
+]
@@ -0,0 +1,184 @@
+import polars as pl
+from qcomponents import align_keys, decode_keys
+from qprofiler import trace
+
+PERIODS_PER_YEAR = {"daily": 252, "weekly": 52, "monthly": 12, "quarterly": 4}
+
+
+class BacktestResult:
+    """
+    Output of a backtest: the per-date P&L with drawdown and rolling volatility,
+    the weights that were held, and the summary stats. Plotting is opt-in.
+    """
+
+    def __init__(
+        self,
+        pnl: pl.DataFrame,
+        weights: pl.DataFrame | None,
+        stats: dict,
+        decile_returns: pl.DataFrame | None = None,
+    ):
+        self.pnl = pnl
+        self.weights = weights
+        self.stats = stats
+        self.decile_returns = decile_returns
+
+    def plot(self):
+        # Imported here so headless runs never load matplotlib
+        import seaborn as sns
+        import matplotlib.pyplot as plt
+
+        # Cumulative product plot
+        sns.lineplot(data=self.pnl, x="date", y="cumprod")
+        plt.ylabel("Cummulative returns (product)")
+        plt.xlabel("Date")
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        plt.show()
+
+    def __repr__(self) -> str:
+        stats = ", ".join(
+            f"{name}={value:.4g}" if isinstance(value, float) else f"{name}={value}"
+            for name, value in self.stats.items()
+        )
+        return f"BacktestResult({stats})"
+
+
+@trace("backtest.analyze")
+def analyze(
+    pnl: pl.DataFrame,
+    weights: pl.DataFrame | None,
+    interval: str = "daily",
+    rolling_window: int | None = None,
+    data: pl.DataFrame | None = None,
+    deciles: pl.DataFrame | None = None,
+) -> BacktestResult:
+    """
+    Performance analytics of a P&L series (date, portfolio_ret) and the weights
+    (date, ticker, weight) behind it: Sharpe, Sortino, max drawdown and its duration,
+    turnover, hit rate and rolling volatility, all built as lazy queries and
+    collected together in one pass. Passing data (date, ticker, ret) and deciles
+    (date, ticker, bin) also gives the equal weighted return of every decile and the
+    top minus bottom spread. Without weights, turnover is the mean of a per-date
+    turnover column of pnl, as stream_pnl reports it.
+    """
+    periods = PERIODS_PER_YEAR[interval]
+    rolling_window = (
+        rolling_window
+        or {"daily": 63, "weekly": 13, "monthly": 12, "quarterly": 4}[interval]
+    )
+    ret = pl.col("portfolio_ret")
+
+    # Drawdowns and rolling volatility per date
+    timeseries = (
+        pnl.lazy()
+        .sort(by="date")
+        .with_columns(
+            ((ret + 1).cum_prod() - 1).alias("cumprod"),
+            ret.log1p().cum_sum().alias("cumsum"),
+            (ret.rolling_std(window_size=rolling_window) * periods**0.5).alias(
+                "rolling_vol"
+            ),
+        )
+        .with_columns(
+            ((pl.col("cumprod") + 1) / (pl.col("cumprod") + 1).cum_max() - 1).alias(
+                "drawdown"
+            )
+        )
+    )
+
+    # Longest stretch spent below a previous peak
+    underwater = pl.col("drawdown") < 0
+    drawdown_duration = (
+        timeseries.with_columns((~underwater).cum_sum().alias("_episode"))
+        .filter(underwater)
+        .group_by("_episode")
+        .agg(pl.len().alias("duration"))
+        .select(pl.col("duration").max().fill_null(0).alias("max_drawdown_duration"))
+    )
+
+    downside = pl.when(ret < 0).then(ret).otherwise(0.0)
+    summary = timeseries.select(
+        pl.len().alias("periods"),
+        (ret.mean() * periods).alias("mean_ret"),
+        (ret.std() * periods**0.5).alias("volatility"),
+        (ret.mean() / ret.std() * periods**0.5).alias("sharpe"),
+        (ret.mean() / downside.pow(2).mean().sqrt() * periods**0.5).alias("sortino"),
+        ((ret + 1).product() - 1).alias("total_return"),
+        pl.col("drawdown").min().alias("max_drawdown"),
+        (ret > 0).mean().alias("hit_rate"),
+    )
+
+    if weights is None:
+        turnover = pnl.lazy().select(pl.col("turnover").mean())
+    else:
+        turnover = (
+            weight_changes(weights.lazy())
+            .group_by("date")
+            .agg(pl.col("trade").abs().sum())
+            .select(pl.col("trade").mean().alias("turnover"))
+        )
+
+    queries = [timeseries, summary, drawdown_duration, turnover]
+    if data is not None and deciles is not None:
+        queries.append(decile_returns(*align_keys(data.lazy(), deciles.lazy())))
+
+    timeseries, summary, drawdown_duration, turnover, *spreads = pl.collect_all(queries)
+
+    stats = summary.to_dicts()[0] | drawdown_duration.to_dicts()[0]
+    stats |= turnover.to_dicts()[0]
+
+    return BacktestResult(
+        pnl=timeseries,
+        weights=None if weights is None else decode_keys(weights),
+        stats=stats,
+        decile_returns=spreads[0] if spreads else None,
+    )
+
+
+def weight_changes(weights: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Trades (date, ticker, weight, prev_weight, trade) between every portfolio and the
+    one before it, including positions that were closed. Built with one self join on
+    the rebalance index, not a loop over dates.
+    """
+    rebalance_dates = (
+        weights.select("date")
+        .unique()
+        .sort(by="date")
+        .with_row_index("_rebalance")
+        .with_columns(pl.col("_rebalance").cast(pl.Int64))
+    )
+    indexed = weights.join(rebalance_dates, on="date").select(
+        ["_rebalance", "ticker", "weight"]
+    )
+    previous = indexed.select(
+        pl.col("_rebalance") + 1, "ticker", pl.col("weight").alias("prev_weight")
+    )
+
+    return (
+        indexed.join(previous, on=["_rebalance", "ticker"], how="full", coalesce=True)
+        .join(rebalance_dates, on="_rebalance")
+        .with_columns(pl.col("weight", "prev_weight").fill_null(0.0))
+        .with_columns((pl.col("weight") - pl.col("prev_weight")).alias("trade"))
+        .select(["date", "ticker", "weight", "prev_weight", "trade"])
+        .sort(by=["date", "ticker"])
+    )
+
+
+def decile_returns(data: pl.LazyFrame, deciles: pl.LazyFrame) -> pl.LazyFrame:
+    """Equal weighted return of every decile per date plus the top minus bottom spread."""
+    return (
+        deciles.join(data, on=["date", "ticker"])
+        .group_by(["date", "bin"])
+        .agg(pl.col("ret").mean())
+        .sort(by=["date", "bin"])
+        .with_columns(
+            (
+                pl.col("ret").filter(pl.col("bin") == pl.col("bin").max()).first()
+                - pl.col("ret").filter(pl.col("bin") == pl.col("bin").min()).first()
+            )
+            .over("date")
+            .alias("spread")
+        )
+    )
@@ -1,60 +1,222 @@
+from src.backtester.analytics import BacktestResult, analyze, weight_changes
+from src.backtester.costs import trading_costs
 from src.datasets import AlpacaStock
-from datetime import date
+from qcomponents import PortfolioSet, align_keys, row_key
+from datetime import date, timedelta
+from typing import Iterable
+import math
 import polars as pl
-import seaborn as sns
-import matplotlib.pyplot as plt
+from qprofiler import span, trace
 
 
 class Backtester:
 
-    def __init__(self, start_date: date, end_date: date, interval: str, strategy):
+    def __init__(
+        self,
+        start_date: date,
+        end_date: date,
+        interval: str,
+        strategy,
+        cost_models: list | None = None,
+    ):
         self.start_date = start_date
         self.end_date = end_date
         self.interval = interval
         self.strategy = strategy
+        self.cost_models = cost_models or []
 
-    def run(self):
-        data = (
-            AlpacaStock(
+    @trace("backtest.run")
+    def run(
+        self,
+        plot: bool = False,
+        data: pl.DataFrame | None = None,
+        deciles: pl.DataFrame | None = None,
+    ) -> BacktestResult:
+        """
+        Backtest the strategy, which is called with the backtest's start_date and
+        end_date and loads its own lookback before them. A PortfolioSet is joined
+        against the whole date range at once; a stream of portfolios (e.g.
+        momentum_stream) is consumed one rebalance date at a time with returns read a
+        month at a time, so memory stays bounded and the weights aren't kept on the
+        result. data (ticker, date, ret and any cost model columns) replaces loading
+        the Alpaca panel, for a strategy given the same data. deciles (date, ticker,
+        bin) adds the return of every decile and their spread over the same returns.
+        """
+        # Market columns the cost models price trades with
+        cost_columns = sorted({c for model in self.cost_models for c in model.columns})
+        columns = ["ticker", "date", "ret", *cost_columns]
+
+        if data is None:
+            dataset = AlpacaStock(
                 start_date=self.start_date,
                 end_date=self.end_date,
                 interval=self.interval,
             )
-            .load()
-            .select("ticker", "date", "ret")
+            load, scan = dataset.load, dataset.scan
+        else:
+            market = data.lazy().filter(
+                pl.col("date").is_between(self.start_date, self.end_date)
+            )
+            load = lambda columns: market.select(columns).collect()
+            scan = lambda columns: market.select(columns)
+
+        # Pin the strategy to the backtest range so it only computes what is used
+        with span("backtest.strategy"):
+            portfolios = self.strategy(
+                start_date=self.start_date, end_date=self.end_date
+            )
+
+        if isinstance(portfolios, PortfolioSet):
+            market = load(columns=columns)
+            pnl = compute_pnl(market, portfolios, self.cost_models)
+            weights = portfolios.frame
+        else:
+            market = scan(columns=columns)
+            pnl = stream_pnl(market, portfolios, self.cost_models)
+            weights = None
+
+        result = analyze(
+            pnl,
+            weights,
+            self.interval,
+            data=None if deciles is None else market.select(["ticker", "date", "ret"]),
+            deciles=deciles,
         )
 
-        portfolios = self.strategy()
+        if plot:
+            result.plot()
 
-        portfolios = pl.concat(portfolios)
+        return result
 
-        merged = data.join(portfolios, how="inner", on=["date", "ticker"])
 
-        merged = merged.with_columns(
-            (pl.col("weight") * pl.col("ret")).alias("weighted_ret")
+@trace("backtest.pnl")
+def compute_pnl(
+    data: pl.DataFrame, portfolios: PortfolioSet, cost_models: list | None = None
+) -> pl.DataFrame:
+    """
+    Per-date returns of the portfolios held against data (ticker, date, ret). The
+    gross_ret, the trading cost of rebalancing into each portfolio and the net
+    portfolio_ret come out side by side; cost models that need market columns such
+    as volume and vwap read them from data.
+
+    Tickers encoded as the universe Enum are joined on one packed (date, ticker)
+    key, see qcomponents.keys.
+    """
+    data, portfolios = align_keys(data.lazy(), portfolios.table.lazy())
+
+    if isinstance(portfolios.collect_schema()["ticker"], pl.Enum):
+        merged = data.with_columns(row_key().alias("_key")).join(
+            portfolios.select(row_key().alias("_key"), "weight"), on="_key", how="inner"
         )
+    else:
+        merged = data.join(portfolios, how="inner", on=["date", "ticker"])
+
+    merged = merged.with_columns(
+        (pl.col("weight") * pl.col("ret")).alias("weighted_ret")
+    )
+
+    pnl = merged.group_by("date").agg(gross_ret=pl.col("weighted_ret").sum())
 
-        pnl = (
-            merged.group_by("date")
-            .agg(weighted_ret_mean=pl.col("weighted_ret").sum())
-            .sort(by=["date"])
+    # Costs are charged on the date the portfolio is traded into
+    costs = trading_costs(portfolios, data, cost_models or [])
+    pnl = (
+        pnl.join(costs, on="date", how="left")
+        .with_columns(pl.col("cost").fill_null(0.0))
+        .sort(by=["date"])
+    )
+
+    pnl = (
+        pnl.with_columns((pl.col("gross_ret") - pl.col("cost")).alias("portfolio_ret"))
+        .with_columns(pl.col("portfolio_ret").log1p().alias("portfolio_logret"))
+        .with_columns(
+            ((pl.col("portfolio_ret") + 1).cum_prod() - 1).alias("cumprod"),
+            pl.col("portfolio_logret").cum_sum().alias("cumsum"),
         )
+    )
+
+    return pnl.collect()
+
 
-        pnl = (
-            pnl.with_columns(pl.col("weighted_ret_mean").alias("portfolio_ret"))
-            .with_columns(pl.col("portfolio_ret").log1p().alias("portfolio_logret"))
-            .with_columns(
-                ((pl.col("portfolio_ret") + 1).cum_prod() - 1).alias("cumprod"),
-                pl.col("portfolio_logret").cum_sum().alias("cumsum"),
+@trace("backtest.stream_pnl")
+def stream_pnl(
+    source: pl.LazyFrame,
+    portfolios: Iterable[pl.DataFrame],
+    cost_models: list | None = None,
+) -> pl.DataFrame:
+    """
+    Online compute_pnl over a stream of per-date portfolios in date order. Returns
+    of source (ticker, date, ret) are read one calendar month at a time and only
+    the previous portfolio is kept for trading costs, so memory doesn't grow with
+    the number of portfolios beyond the P&L rows themselves. Also reports each
+    date's turnover, since the weights are not kept.
+    """
+    cost_models = cost_models or []
+    rows = []
+    previous = None
+    block, block_end = None, None
+    growth, log_growth = 1.0, 0.0
+
+    for portfolio in portfolios:
+        if portfolio.is_empty():
+            continue
+        rebalance = portfolio["date"][0]
+
+        # Read the month of returns this rebalance date falls in
+        if block_end is None or rebalance > block_end:
+            block_start = rebalance.replace(day=1)
+            block_end = (block_start + timedelta(days=32)).replace(day=1) - timedelta(
+                days=1
             )
+            block = source.filter(
+                pl.col("date").is_between(block_start, block_end)
+            ).collect()
+
+        market = block.filter(pl.col("date") == rebalance)
+        market, portfolio = align_keys(market, portfolio)
+        weights = portfolio if previous is None else pl.concat([previous, portfolio])
+        previous = portfolio
+
+        held, trades, costs = pl.collect_all(
+            [
+                market.lazy().join(portfolio.lazy(), on=["date", "ticker"]),
+                weight_changes(weights.lazy()).filter(pl.col("date") == rebalance),
+                trading_costs(weights.lazy(), market.lazy(), cost_models).filter(
+                    pl.col("date") == rebalance
+                ),
+            ]
         )
+        if held.is_empty():
+            continue
+
+        gross_ret = (held["weight"] * held["ret"]).sum()
+        cost = costs["cost"].sum()
+        portfolio_ret = gross_ret - cost
+        growth *= 1 + portfolio_ret
+        log_growth += math.log1p(portfolio_ret)
+
+        rows.append(
+            {
+                "date": rebalance,
+                "gross_ret": gross_ret,
+                "cost": cost,
+                "turnover": trades["trade"].abs().sum(),
+                "portfolio_ret": portfolio_ret,
+                "portfolio_logret": math.log1p(portfolio_ret),
+                "cumprod": growth - 1,
+                "cumsum": log_growth,
+            }
+        )
+
+    return pl.DataFrame(rows, schema=STREAM_PNL_SCHEMA)
 
-        print(pnl)
 
-        # Cumulative product plot
-        sns.lineplot(data=pnl, x="date", y="cumprod")
-        plt.ylabel("Cummulative returns (product)")
-        plt.xlabel("Date")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+STREAM_PNL_SCHEMA = {
+    "date": pl.Date,
+    "gross_ret": pl.Float64,
+    "cost": pl.Float64,
+    "turnover": pl.Float64,
+    "portfolio_ret": pl.Float64,
+    "portfolio_logret": pl.Float64,
+    "cumprod": pl.Float64,
+    "cumsum": pl.Float64,
+}
@@ -0,0 +1,88 @@
+from src.backtester.analytics import weight_changes
+from qcomponents import align_keys
+import polars as pl
+
+
+class CommissionModel:
+    """Flat commission in basis points of the traded weight."""
+
+    columns: list[str] = []
+
+    def __init__(self, bps: float = 1.0):
+        self.bps = bps
+
+    def expr(self) -> pl.Expr:
+        return pl.col("trade").abs() * self.bps / 10_000
+
+
+class SpreadModel:
+    """Pays half the quoted bid/ask spread (in basis points) on every trade."""
+
+    columns: list[str] = []
+
+    def __init__(self, spread_bps: float = 5.0):
+        self.spread_bps = spread_bps
+
+    def expr(self) -> pl.Expr:
+        return pl.col("trade").abs() * self.spread_bps / 2 / 10_000
+
+
+class ImpactModel:
+    """
+    Square root market impact. The dollar amount traded, the traded weight times
+    capital, is compared to the day's dollar volume (volume * vwap) and costs
+    coefficient * sqrt(participation) per unit traded. Participation is capped at
+    max_participation, and a trade without liquidity to compare to (a null, zero
+    or negative dollar volume) is charged the capped participation, not nothing.
+    """
+
+    columns: list[str] = ["volume", "vwap"]
+
+    def __init__(
+        self,
+        capital: float = 1_000_000,
+        coefficient: float = 0.1,
+        max_participation: float = 1.0,
+    ):
+        self.capital = capital
+        self.coefficient = coefficient
+        self.max_participation = max_participation
+
+    def expr(self) -> pl.Expr:
+        traded = pl.col("trade").abs()
+        dollar_volume = pl.col("volume") * pl.col("vwap")
+        participation = (
+            pl.when(dollar_volume > 0)
+            .then(traded * self.capital / dollar_volume)
+            .otherwise(self.max_participation)
+            .clip(upper_bound=self.max_participation)
+        )
+        return traded * self.coefficient * participation.sqrt()
+
+
+def trading_costs(
+    weights: pl.LazyFrame, data: pl.LazyFrame, cost_models: list
+) -> pl.LazyFrame:
+    """
+    Cost per date (date, cost) of moving from each portfolio to the next, as a
+    fraction of capital. Weight deltas for the whole backtest come from one self join
+    and every cost model is evaluated as a column expression on top of them.
+    """
+    weights, data = align_keys(weights, data)
+    if not cost_models:
+        return weights.select("date").unique().with_columns(cost=pl.lit(0.0))
+
+    columns = sorted({column for model in cost_models for column in model.columns})
+    trades = weight_changes(weights)
+    if columns:
+        trades = trades.join(
+            data.select(["date", "ticker", *columns]), on=["date", "ticker"], how="left"
+        )
+
+    return (
+        trades.with_columns(
+            pl.sum_horizontal([m.expr() for m in cost_models]).alias("cost")
+        )
+        .group_by("date")
+        .agg(pl.col("cost").sum())
+    )
@@ -0,0 +1,196 @@
+from src.backtester.analytics import analyze
+from src.backtester.backtester import compute_pnl
+from src.datasets import AlpacaStock
+from src.optimizers import decile_portfolios
+from src.signals import momentum_signal, reversal_signal
+from src.strategies import momentum, reversal
+from src.strategies.deciles import long_short
+from qcomponents import PanelData, PortfolioSet
+from datetime import date
+from itertools import combinations
+from typing import Callable
+import polars as pl
+from qprofiler import span, trace
+
+
+class StrategySignal:
+    """
+    A signal with the momentum_signal signature (chunk, interval, window) and how it
+    is traded: the lookback windows it needs, including the rebalance date, and the
+    deciles held long and short.
+    """
+
+    def __init__(
+        self,
+        signal: Callable,
+        windows: dict[str, int],
+        long_bin: int = 9,
+        short_bin: int = 0,
+    ):
+        self.signal = signal
+        self.windows = windows
+        self.long_bin = long_bin
+        self.short_bin = short_bin
+
+
+# Signals MultiStrategy can evaluate, keyed by the column the signal adds
+SIGNALS: dict[str, StrategySignal] = {
+    "mom": StrategySignal(momentum_signal, momentum.WINDOWS),
+    "rev": StrategySignal(reversal_signal, reversal.WINDOWS, long_bin=0, short_bin=9),
+}
+
+
+def register_signal(
+    name: str,
+    signal: Callable,
+    windows: dict[str, int],
+    long_bin: int = 9,
+    short_bin: int = 0,
+) -> None:
+    """Make a signal that adds the column `name` available to MultiStrategy."""
+    SIGNALS[name] = StrategySignal(signal, windows, long_bin, short_bin)
+
+
+class MultiStrategy:
+    """
+    Backtests several decile long/short strategies and blends of them together. The
+    panel is loaded and sorted once with the longest lookback, every signal is
+    collected together over it, and each signal then only costs its cross-sectional
+    decile sort and P&L. Portfolios are the same as each strategy's panel mode.
+
+    blends maps a name to {signal: weight}; by default every combination of two or
+    more signals is blended with equal weights, e.g. "mom+rev".
+    """
+
+    def __init__(
+        self,
+        start_date: date,
+        end_date: date,
+        interval: str,
+        signals: list[str] | None = None,
+        blends: dict[str, dict[str, float]] | None = None,
+        cost_models: list | None = None,
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.interval = interval
+        self.signals = signals or list(SIGNALS)
+        self.cost_models = cost_models or []
+
+        if blends is None:
+            blends = {
+                "+".join(names): {name: 1 / len(names) for name in names}
+                for size in range(2, len(self.signals) + 1)
+                for names in combinations(self.signals, size)
+            }
+        self.blends = blends
+
+    @trace("multi_strategy.run")
+    def run(self, data: pl.DataFrame | None = None) -> pl.DataFrame:
+        """
+        One row per strategy and blend with its analytics stats and its P&L series
+        as a `pnl` list of (date, portfolio_ret) structs, like sweep. data (ticker,
+        date, ret and any cost model columns) replaces loading the Alpaca panel.
+        """
+        if data is None:
+            cost_columns = {c for model in self.cost_models for c in model.columns}
+            lookback = max(
+                SIGNALS[name].windows[self.interval] for name in self.signals
+            )
+            data = AlpacaStock(
+                start_date=self.start_date,
+                end_date=self.end_date,
+                interval=self.interval,
+                lookback=lookback - 1,
+            ).load(columns=["date", "ticker", "ret", *sorted(cost_columns)])
+
+        portfolios = self.portfolios(data)
+        for name, weights in self.blends.items():
+            portfolios[name] = blend({s: portfolios[s] for s in weights}, weights)
+
+        market = data.filter(pl.col("date").is_between(self.start_date, self.end_date))
+        results = []
+        for name, strategy_portfolios in portfolios.items():
+            with span("multi_strategy.backtest", strategy=name):
+                pnl = compute_pnl(market, strategy_portfolios, self.cost_models)
+                stats = analyze(pnl, strategy_portfolios.frame, self.interval).stats
+
+            results.append(
+                pl.concat(
+                    [
+                        pl.DataFrame([{"strategy": name} | stats]),
+                        pnl.select(
+                            pl.struct(["date", "portfolio_ret"]).implode().alias("pnl")
+                        ),
+                    ],
+                    how="horizontal",
+                )
+            )
+
+        return pl.concat(results, how="diagonal_relaxed")
+
+    def portfolios(self, data: pl.DataFrame) -> dict[str, PortfolioSet]:
+        """Long/short decile portfolios of every signal from start_date to end_date."""
+        # Sorted the way PanelData does it, so each ticker's dates ascend
+        base = data.select(["date", "ticker", "ret"]).sort(
+            by="date", maintain_order=True
+        )
+        frames = self.signal_frames(base)
+
+        portfolios = {}
+        for name in self.signals:
+            spec = SIGNALS[name]
+
+            with span("multi_strategy.deciles", strategy=name):
+                # The strategy's panel mode, with its signal already computed
+                panel = PanelData(base, spec.windows[self.interval], base.columns)
+                panel.apply_signal_transform(lambda _, frame=frames[name]: frame)
+                panel.remove_chunks()
+
+                deciles = decile_portfolios(panel.frame, signal=name).filter(
+                    pl.col("date").is_between(self.start_date, self.end_date)
+                )
+                portfolios[name] = PortfolioSet(
+                    long_short(deciles, spec.long_bin, spec.short_bin)
+                )
+
+        return portfolios
+
+    @trace("multi_strategy.signals")
+    def signal_frames(self, base: pl.DataFrame) -> dict[str, pl.DataFrame]:
+        """
+        Every signal over the same date-sorted (date, ticker, ret) panel, collected
+        together so their plans share the one input. Each signal keeps its own rows,
+        as a signal may drop or keep rows the others don't.
+        """
+        frames = pl.collect_all(
+            [
+                SIGNALS[name].signal(
+                    base.lazy(),
+                    interval=self.interval,
+                    window=SIGNALS[name].windows[self.interval] - 1,
+                )
+                for name in self.signals
+            ]
+        )
+        return dict(zip(self.signals, frames))
+
+
+def blend(
+    portfolios: dict[str, PortfolioSet], weights: dict[str, float]
+) -> PortfolioSet:
+    """Weighted sum of portfolios on the rebalance dates they all share."""
+    dates = set.intersection(*[set(p.dates) for p in portfolios.values()])
+    blended = (
+        pl.concat(
+            [
+                portfolios[name].frame.with_columns(pl.col("weight") * weight)
+                for name, weight in weights.items()
+            ]
+        )
+        .filter(pl.col("date").is_in(list(dates)))
+        .group_by(["date", "ticker"])
+        .agg(pl.col("weight").sum())
+        .filter(pl.col("weight") != 0)
+    )
+    return PortfolioSet(blended.sort(by=["date", "ticker"]))
@@ -0,0 +1,125 @@
+from src.backtester.analytics import analyze
+from src.backtester.backtester import compute_pnl
+from src.datasets import AlpacaStock
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+from itertools import product
+import multiprocessing
+import os
+import tempfile
+import polars as pl
+
+# Return panels memory-mapped by each worker, keyed by interval
+_panels: dict[str, pl.DataFrame] = {}
+
+
+def sweep(
+    strategy,
+    grid: dict[str, list],
+    start_date: date,
+    end_date: date,
+    max_workers: int | None = None,
+    panels: dict[str, pl.DataFrame] | None = None,
+    cost_models: list | None = None,
+) -> pl.DataFrame:
+    """
+    Backtest a strategy for every combination of the parameters in grid on a process
+    pool, e.g. grid={"interval": ["daily"], "window": [126, 231], "long_bin": [8, 9]}.
+    Each interval's (date, ticker, ret) panel is loaded once with the lookback of the
+    largest window in the grid, or taken from panels (which then need that lookback
+    before start_date), and written to an uncompressed Arrow IPC file that every
+    worker memory-maps, so workers share it read-only through the page cache instead
+    of each getting a pickled copy.
+
+    Every run is pinned to [start_date, end_date] like Backtester, so all grid points
+    are scored over the same rebalance dates whatever their window.
+
+    Returns one row per run with its parameters, analytics stats and its P&L series as
+    a `pnl` list of (date, portfolio_ret) structs; .explode("pnl").unnest("pnl") gives
+    the long series. With cost_models the stats and series are net of trading costs.
+    """
+    cost_models = cost_models or []
+    cost_columns = sorted({c for model in cost_models for c in model.columns})
+    grid = {"interval": ["daily"]} | grid
+    runs = [dict(zip(grid, values)) for values in product(*grid.values())]
+
+    with tempfile.TemporaryDirectory() as panel_dir:
+        panel_paths = {}
+        for interval in grid["interval"]:
+            if panels is not None and interval in panels:
+                panel = panels[interval]
+            else:
+                lookback = max(
+                    _window(strategy, run)
+                    for run in runs
+                    if run["interval"] == interval
+                )
+                panel = AlpacaStock(
+                    start_date=start_date,
+                    end_date=end_date,
+                    interval=interval,
+                    lookback=lookback - 1,
+                ).load(columns=["date", "ticker", "ret", *cost_columns])
+
+            panel_paths[interval] = os.path.join(panel_dir, f"{interval}.arrow")
+            # Enum tickers map as their ids, without re-encoding a string
+            panel.write_ipc(panel_paths[interval], compression="uncompressed")
+
+        # Split the cores between workers instead of each polars pool using all of them
+        workers = max_workers or os.cpu_count()
+        polars_threads = max(1, os.cpu_count() // workers)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(panel_paths, polars_threads),
+        ) as executor:
+            results = list(
+                executor.map(
+                    partial(
+                        _run,
+                        strategy,
+                        start_date=start_date,
+                        end_date=end_date,
+                        cost_models=cost_models,
+                    ),
+                    runs,
+                )
+            )
+
+    return pl.concat(results, how="diagonal_relaxed")
+
+
+def _window(strategy, params: dict) -> int:
+    """Lookback in periods of one run, including the rebalance date."""
+    keywords = getattr(strategy, "keywords", {})
+    window = params.get("window") or keywords.get("window")
+    return window or getattr(strategy, "func", strategy).windows[params["interval"]]
+
+
+def _init_worker(panel_paths: dict[str, str], polars_threads: int) -> None:
+    # Only this worker's environment, read when polars starts its thread pool
+    os.environ["POLARS_MAX_THREADS"] = str(polars_threads)
+
+    for interval, path in panel_paths.items():
+        _panels[interval] = pl.read_ipc(path, memory_map=True)
+
+
+def _run(
+    strategy, params: dict, start_date: date, end_date: date, cost_models: list
+) -> pl.DataFrame:
+    data = _panels[params["interval"]]
+
+    portfolios = strategy(data=data, start_date=start_date, end_date=end_date, **params)
+    pnl = compute_pnl(data, portfolios, cost_models).select(["date", "portfolio_ret"])
+    stats = analyze(pnl, portfolios.frame, params["interval"]).stats
+
+    return pl.concat(
+        [
+            pl.DataFrame([params | stats]),
+            pnl.select(pl.struct(pl.all()).implode().alias("pnl")),
+        ],
+        how="horizontal",
+    )
@@ -0,0 +1,73 @@
+from src.backtester.analytics import analyze
+import polars as pl
+import pytest
+from datetime import date
+
+dates = pl.date_range(date(2024, 1, 1), date(2024, 5, 1), "1mo", eager=True)
+
+# Equity 1.1, 0.99, 0.99, 1.188, 1.0692: peaks at the 1st and 4th date
+pnl = pl.DataFrame({"date": dates, "portfolio_ret": [0.1, -0.1, 0.0, 0.2, -0.1]})
+
+
+def test_stats():
+    weights = pl.DataFrame(
+        {
+            "date": [dates[0], dates[1], dates[1], dates[2], dates[2]],
+            "ticker": ["A", "A", "B", "A", "B"],
+            "weight": [1.0, 0.5, 0.5, 0.5, 0.5],
+        }
+    )
+    result = analyze(pnl, weights, "monthly")
+    stats = result.stats
+
+    # Mean 0.02, sample variance 0.068 / 4, downside mean square 0.02 / 5
+    assert stats["periods"] == 5
+    assert stats["mean_ret"] == pytest.approx(0.02 * 12)
+    assert stats["volatility"] == pytest.approx(0.017**0.5 * 12**0.5)
+    assert stats["sharpe"] == pytest.approx(0.02 / 0.017**0.5 * 12**0.5)
+    assert stats["sortino"] == pytest.approx(0.02 / 0.004**0.5 * 12**0.5)
+    assert stats["total_return"] == pytest.approx(0.0692)
+    assert stats["hit_rate"] == pytest.approx(0.4)
+
+    # 10% below the peak on the 2nd, 3rd and 5th date, the longest stretch is 2
+    assert result.pnl["drawdown"].to_list() == pytest.approx(
+        [0.0, -0.1, -0.1, 0.0, -0.1]
+    )
+    assert stats["max_drawdown"] == pytest.approx(-0.1)
+    assert stats["max_drawdown_duration"] == 2
+
+    # Trades of 1.0 into A, 0.5 from A into B, then none
+    assert stats["turnover"] == pytest.approx(2 / 3)
+
+
+def test_decile_spread():
+    data = pl.DataFrame(
+        {
+            "date": [dates[0]] * 5 + [dates[1]] * 3,
+            "ticker": ["A", "B", "C", "D", "E", "A", "B", "D"],
+            "ret": [0.01, 0.03, 0.05, 0.10, 0.20, -0.02, 0.0, 0.04],
+        }
+    )
+    # E has no return on the 2nd date, and B no bin
+    deciles = pl.DataFrame(
+        {
+            "date": [dates[0]] * 5 + [dates[1]] * 3,
+            "ticker": ["A", "B", "C", "D", "E", "A", "D", "E"],
+            "bin": [0, 0, 1, 2, 2, 0, 2, 2],
+        }
+    )
+    # Without weights, turnover comes from the P&L as stream_pnl reports it
+    streamed = pnl.with_columns(turnover=pl.lit(0.5))
+    result = analyze(streamed, None, "monthly", data=data, deciles=deciles)
+    assert result.stats["turnover"] == pytest.approx(0.5)
+
+    spreads = result.decile_returns
+    assert spreads.select(["date", "bin"]).rows() == [
+        (dates[0], 0),
+        (dates[0], 1),
+        (dates[0], 2),
+        (dates[1], 0),
+        (dates[1], 2),
+    ]
+    assert spreads["ret"].to_list() == pytest.approx([0.02, 0.05, 0.15, -0.02, 0.04])
+    assert spreads["spread"].to_list() == pytest.approx([0.13] * 3 + [0.06] * 2)
@@ -0,0 +1,98 @@
+from src.backtester import Backtester, CommissionModel, ImpactModel
+from src.backtester.analytics import analyze, weight_changes
+from src.backtester.backtester import compute_pnl, stream_pnl
+from src.strategies import momentum_strategy, momentum_stream
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+import pytest
+from datetime import date
+from functools import partial
+
+rng = np.random.default_rng(1)
+days = pl.date_range(date(2021, 1, 1), date(2022, 6, 30), eager=True)
+days = days.filter(days.dt.weekday() <= 5)
+
+# Daily rows, a few missing, read by stream_pnl a month of returns at a time
+data = pl.DataFrame(
+    [
+        {
+            "ticker": f"T{ticker:02d}",
+            "date": day,
+            "ret": rng.standard_t(4) * 0.01,
+            "volume": float(rng.integers(0, 5_000_000)),
+            "vwap": 100.0,
+        }
+        for ticker in range(30)
+        for day in days
+        if rng.random() > 0.005
+    ]
+)
+
+start_date, end_date = date(2021, 9, 1), date(2022, 6, 30)
+cost_models = [CommissionModel(bps=5), ImpactModel(capital=10_000_000)]
+strategy = dict(interval="daily", window=40, data=data)
+
+
+def test_stream_pnl_matches_compute_pnl():
+    portfolios = momentum_strategy(
+        mode="panel", start_date=start_date, end_date=end_date, **strategy
+    )
+    expected = compute_pnl(data, portfolios, cost_models)
+
+    streamed = stream_pnl(
+        data.lazy(),
+        momentum_stream(start_date=start_date, end_date=end_date, **strategy),
+        cost_models,
+    )
+    assert len(streamed) > 150
+    assert (streamed["cost"] > 0).mean() > 0.5
+    assert_frame_equal(
+        streamed.drop("turnover"), expected.select(streamed.drop("turnover").columns)
+    )
+
+    # Turnover is what the panel's weights trade on every date
+    turnover = (
+        weight_changes(portfolios.frame.lazy())
+        .group_by("date")
+        .agg(pl.col("trade").abs().sum().alias("turnover"))
+        .sort(by="date")
+        .collect()
+    )
+    assert_frame_equal(streamed.select(["date", "turnover"]), turnover)
+
+
+def test_backtests_agree():
+    results = [
+        Backtester(
+            start_date, end_date, "daily", partial(run, **strategy), cost_models
+        ).run(data=data)
+        for run in (momentum_strategy, momentum_stream)
+    ]
+    assert results[1].stats == pytest.approx(results[0].stats)
+
+
+def test_decile_returns():
+    portfolios = momentum_strategy(
+        mode="panel", start_date=start_date, end_date=end_date, **strategy
+    )
+    # Short and long legs as the bottom and top bin
+    deciles = portfolios.frame.select(
+        "date", "ticker", pl.col("weight").sign().alias("bin")
+    )
+    market = data.filter(pl.col("date").is_between(start_date, end_date))
+    expected = analyze(
+        compute_pnl(market, portfolios, cost_models),
+        portfolios.frame,
+        "daily",
+        data=market,
+        deciles=deciles,
+    ).decile_returns
+
+    for run in (momentum_strategy, momentum_stream):
+        backtester = Backtester(
+            start_date, end_date, "daily", partial(run, **strategy), cost_models
+        )
+        assert backtester.run(data=data).decile_returns is None
+        result = backtester.run(data=data, deciles=deciles)
+        assert_frame_equal(result.decile_returns, expected)
@@ -0,0 +1,60 @@
+from src.backtester.costs import (
+    CommissionModel,
+    ImpactModel,
+    SpreadModel,
+    trading_costs,
+)
+import polars as pl
+import pytest
+from datetime import date
+
+d1, d2 = date(2024, 1, 31), date(2024, 2, 29)
+
+# Trades: A +0.5, B -0.5 on d1 and A -0.25, B +0.5 (closed), C +0.25 on d2
+weights = pl.LazyFrame(
+    {
+        "date": [d1, d1, d2, d2],
+        "ticker": ["A", "B", "A", "C"],
+        "weight": [0.5, -0.5, 0.25, 0.25],
+    }
+)
+
+# B has no volume on d1 and no row on d2, A no volume on d2
+data = pl.LazyFrame(
+    {
+        "date": [d1, d1, d2, d2],
+        "ticker": ["A", "B", "A", "C"],
+        "volume": [20_000.0, 0.0, None, 1_000.0],
+        "vwap": [100.0, 100.0, 100.0, 100.0],
+    }
+)
+
+
+def costs(cost_models: list) -> list[float]:
+    return (
+        trading_costs(weights, data, cost_models).sort(by="date").collect()["cost"]
+    ).to_list()
+
+
+def test_commission_and_spread():
+    # Both dates trade a weight of 1.0 in total
+    assert costs([CommissionModel(bps=10)]) == pytest.approx([0.001, 0.001])
+    assert costs([SpreadModel(spread_bps=10)]) == pytest.approx([0.0005, 0.0005])
+    assert costs(
+        [CommissionModel(bps=10), SpreadModel(spread_bps=10)]
+    ) == pytest.approx([0.0015, 0.0015])
+    assert costs([]) == [0.0, 0.0]
+
+
+def test_impact():
+    impact = ImpactModel(capital=1_000_000, coefficient=0.1)
+
+    # d1: A trades $500k of $2M, 0.5 * 0.1 * sqrt(0.25), B has zero volume and pays
+    # full participation, 0.5 * 0.1. d2: A (null volume) and B (no row) pay full
+    # participation, C trades $250k of $100k and is capped at it.
+    assert costs([impact]) == pytest.approx([0.025 + 0.05, 0.025 + 0.05 + 0.025])
+
+
+def test_impact_participation_cap():
+    impact = ImpactModel(capital=1_000_000, coefficient=0.1, max_participation=0.25)
+    assert costs([impact]) == pytest.approx([0.025 + 0.025, 0.0125 + 0.025 + 0.0125])
@@ -0,0 +1,80 @@
+from src.backtester import Backtester, MultiStrategy, register_signal
+from src.backtester.multi_strategy import SIGNALS
+from src.strategies import momentum_strategy, reversal_strategy
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+from datetime import date
+from functools import partial
+
+rng = np.random.default_rng(0)
+months = pl.date_range(date(2019, 1, 1), date(2023, 12, 1), "1mo", eager=True)
+
+# Rows shuffled, with each ticker's first return missing as in the core table
+data = (
+    pl.DataFrame(
+        [
+            {
+                "ticker": f"T{ticker:02d}",
+                "date": month,
+                "ret": rng.standard_t(4) * 0.05,
+            }
+            for ticker in range(40)
+            for month in months
+            if rng.random() > 0.05
+        ]
+    )
+    .with_columns(
+        pl.when(pl.col("date") == pl.col("date").min().over("ticker"))
+        .then(None)
+        .otherwise(pl.col("ret"))
+        .alias("ret")
+    )
+    .sample(fraction=1.0, shuffle=True, seed=0)
+)
+
+start_date, end_date = date(2020, 6, 1), date(2023, 6, 1)
+
+
+def test_pnl_matches_backtester():
+    results = MultiStrategy(
+        start_date, end_date, "monthly", signals=["mom", "rev"], blends={}
+    ).run(data)
+
+    for name, strategy in [("mom", momentum_strategy), ("rev", reversal_strategy)]:
+        expected = Backtester(
+            start_date,
+            end_date,
+            "monthly",
+            partial(strategy, interval="monthly", data=data),
+        ).run(data=data)
+
+        pnl = results.filter(pl.col("strategy") == name)["pnl"].explode()
+        assert len(pnl) > 30
+        assert_frame_equal(
+            pnl.struct.unnest(),
+            expected.pnl.select(["date", "portfolio_ret"]),
+        )
+
+
+def test_signal_keeping_null_rows():
+    def volatility(chunk, interval, window):
+        return chunk.with_columns(
+            pl.col("ret").rolling_std(window).shift(1).over("ticker").alias("vol")
+        )
+
+    register_signal("vol", volatility, {"monthly": 4})
+    try:
+        strategy = MultiStrategy(
+            start_date, end_date, "monthly", signals=["mom", "vol"]
+        )
+        base = data.sort(by="date", maintain_order=True)
+        frames = strategy.signal_frames(base)
+    finally:
+        SIGNALS.pop("vol")
+
+    # Every signal value sits on the row it was computed for
+    alone = volatility(base, "monthly", 3)
+    assert_frame_equal(frames["vol"], alone)
+    assert frames["vol"]["vol"].null_count() > len(data["ticker"].unique())
+    assert len(frames["mom"]) < len(frames["vol"])
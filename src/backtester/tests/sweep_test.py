@@ -0,0 +1,44 @@
+from src.backtester import Backtester, sweep
+from src.strategies import momentum_strategy
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+from datetime import date
+from functools import partial
+
+rng = np.random.default_rng(1)
+months = pl.date_range(date(2018, 1, 1), date(2023, 12, 1), "1mo", eager=True)
+data = pl.DataFrame(
+    [
+        {"ticker": f"T{ticker:02d}", "date": month, "ret": rng.normal(0, 0.05)}
+        for ticker in range(30)
+        for month in months
+    ]
+)
+
+start_date, end_date = date(2020, 1, 1), date(2022, 12, 1)
+
+
+def test_runs_pinned_to_backtest_range():
+    results = sweep(
+        momentum_strategy,
+        {"interval": ["monthly"], "window": [3, 12]},
+        start_date,
+        end_date,
+        max_workers=1,
+        panels={"monthly": data},
+    )
+
+    for window in [3, 12]:
+        pnl = (
+            results.filter(pl.col("window") == window)["pnl"].explode().struct.unnest()
+        )
+        expected = Backtester(
+            start_date,
+            end_date,
+            "monthly",
+            partial(momentum_strategy, interval="monthly", window=window, data=data),
+        ).run(data=data)
+
+        assert pnl["date"].min() == start_date
+        assert_frame_equal(pnl, expected.pnl.select(["date", "portfolio_ret"]))
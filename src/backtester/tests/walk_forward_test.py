@@ -0,0 +1,56 @@
+from src.backtester import Backtester, CommissionModel, ImpactModel, WalkForward
+from src.strategies import momentum_strategy, reversal_strategy
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+import pytest
+from datetime import date
+from functools import partial
+
+rng = np.random.default_rng(0)
+months = pl.date_range(date(2018, 1, 1), date(2023, 12, 1), "1mo", eager=True)
+
+# Rows shuffled and some missing, with the liquidity the impact model prices
+data = pl.DataFrame(
+    [
+        {
+            "ticker": f"T{ticker:02d}",
+            "date": month,
+            "ret": rng.standard_t(4) * 0.05,
+            "volume": float(rng.integers(0, 5_000_000)),
+            "vwap": 100.0,
+        }
+        for ticker in range(40)
+        for month in months
+        if rng.random() > 0.05
+    ]
+).sample(fraction=1.0, shuffle=True, seed=0)
+
+start_date, end_date = date(2020, 3, 1), date(2023, 6, 1)
+cost_models = [CommissionModel(bps=5), ImpactModel(capital=10_000_000)]
+
+
+@pytest.mark.parametrize("strategy", [momentum_strategy, reversal_strategy])
+@pytest.mark.parametrize("fold_months", [5, 12])
+def test_matches_backtester(strategy, fold_months):
+    walk_forward = WalkForward(
+        start_date,
+        end_date,
+        "monthly",
+        partial(strategy, interval="monthly"),
+        cost_models,
+        fold_months=fold_months,
+    )
+    assert len(list(walk_forward.folds())) > 3
+    result = walk_forward.run(data=data)
+
+    expected = Backtester(
+        start_date,
+        end_date,
+        "monthly",
+        partial(strategy, interval="monthly", data=data),
+        cost_models,
+    ).run(data=data)
+
+    assert_frame_equal(result.pnl, expected.pnl, check_exact=False)
+    assert result.stats == pytest.approx(expected.stats)
@@ -0,0 +1,131 @@
+from src.backtester.analytics import BacktestResult, analyze
+from src.backtester.backtester import Backtester, compute_pnl
+from src.datasets import AlpacaStock
+from qcomponents import PortfolioSet, lookback_start
+from datetime import date, timedelta
+from typing import Iterator
+import polars as pl
+from qprofiler import span, trace
+
+
+class WalkForward(Backtester):
+    """
+    Backtester run as consecutive walk-forward folds of fold_months each. The
+    strategy is called once per fold with the fold's start_date and end_date and
+    only the data that fold needs: the first fold loads the lookback the strategy
+    declares (strategy.windows, or a window keyword) before start_date, and every
+    later fold loads just its own dates and reuses the tail of the previous one as
+    lookback. A one year backtest reads one year plus lookback, not the history.
+    """
+
+    def __init__(
+        self,
+        start_date: date,
+        end_date: date,
+        interval: str,
+        strategy,
+        cost_models: list | None = None,
+        fold_months: int = 12,
+    ):
+        super().__init__(start_date, end_date, interval, strategy, cost_models)
+        self.fold_months = fold_months
+
+    def folds(self) -> Iterator[tuple[date, date]]:
+        """(start_date, end_date) of every fold, calendar months long."""
+        fold_start = self.start_date
+        while fold_start <= self.end_date:
+            month = fold_start.month - 1 + self.fold_months
+            next_start = date(fold_start.year + month // 12, month % 12 + 1, 1)
+            yield fold_start, min(next_start - timedelta(days=1), self.end_date)
+            fold_start = next_start
+
+    def lookback(self) -> int:
+        """Dates the strategy needs before a rebalance date (its window - 1)."""
+        keywords = getattr(self.strategy, "keywords", {})
+        strategy = getattr(self.strategy, "func", self.strategy)
+        window = keywords.get("window") or strategy.windows[self.interval]
+        return window - 1
+
+    @trace("walk_forward.run")
+    def run(
+        self, plot: bool = False, data: pl.DataFrame | None = None
+    ) -> BacktestResult:
+        """
+        Backtest fold by fold, as Backtester.run does over the whole range. data
+        (ticker, date, ret and any cost model columns) replaces loading the Alpaca
+        panel, each fold taking its slice of it.
+        """
+        cost_columns = sorted({c for model in self.cost_models for c in model.columns})
+        columns = ["ticker", "date", "ret", *cost_columns]
+        lookback = self.lookback()
+
+        history = None
+        previous = None
+        pnls, weights = [], []
+        for fold_start, fold_end in self.folds():
+            with span("walk_forward.fold", start_date=fold_start, end_date=fold_end):
+                fold_data = self._load(
+                    data,
+                    columns,
+                    fold_start,
+                    fold_end,
+                    lookback=lookback if history is None else 0,
+                )
+                if history is not None:
+                    fold_data = pl.concat([history, fold_data])
+
+                portfolios = self.strategy(
+                    data=fold_data, start_date=fold_start, end_date=fold_end
+                )
+                if not isinstance(portfolios, PortfolioSet):
+                    portfolios = PortfolioSet.from_frames(list(portfolios))
+
+                # The last portfolio of the previous fold prices the first trade
+                held = portfolios.frame
+                if previous is not None:
+                    held = pl.concat([previous, held])
+                pnl = compute_pnl(fold_data, PortfolioSet(held), self.cost_models)
+                pnls.append(pnl.filter(pl.col("date") >= fold_start))
+                weights.append(portfolios.frame)
+
+                if len(portfolios):
+                    previous = portfolios[-1]
+
+                # Only the lookback of the next fold is carried over
+                next_start = fold_end + timedelta(days=1)
+                history = fold_data.filter(
+                    pl.col("date") >= lookback_start(fold_data, next_start, lookback)
+                )
+
+        # Cumulative returns run across folds
+        pnl = pl.concat(pnls).with_columns(
+            ((pl.col("portfolio_ret") + 1).cum_prod() - 1).alias("cumprod"),
+            pl.col("portfolio_logret").cum_sum().alias("cumsum"),
+        )
+        result = analyze(pnl, pl.concat(weights), self.interval)
+
+        if plot:
+            result.plot()
+
+        return result
+
+    def _load(
+        self,
+        data: pl.DataFrame | None,
+        columns: list[str],
+        fold_start: date,
+        fold_end: date,
+        lookback: int,
+    ) -> pl.DataFrame:
+        """A fold's dates plus `lookback` dates before them, from data or Alpaca."""
+        if data is None:
+            dataset = AlpacaStock(
+                start_date=fold_start,
+                end_date=fold_end,
+                interval=self.interval,
+                lookback=lookback,
+            )
+            return dataset.load(columns=columns)
+
+        first = lookback_start(data, fold_start, lookback) if lookback else fold_start
+        return data.filter(pl.col("date").is_between(first, fold_end)).select(columns)
@@ -1,5 +1,16 @@
 from .toy_dataset import ToyDataset
 from .alpaca_stock import AlpacaStock
 from .alpaca_assets import AlpacaAssets
+from .asset_universe import AssetUniverse, asset_universe
+from .resampler import Resampler, resampler, resample
 
-__all__ = ["ToyDataset", "AlpacaStock", "AlpacaAssets"]
+__all__ = [
+    "ToyDataset",
+    "AlpacaStock",
+    "AlpacaAssets",
+    "AssetUniverse",
+    "asset_universe",
+    "Resampler",
+    "resampler",
+    "resample",
+]
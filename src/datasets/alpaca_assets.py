@@ -13,8 +13,37 @@ from dotenv import load_dotenv
 import polars as pl
 from qdatabase import Database
 
+SNAPSHOT_TABLE = "ALPACA_ASSETS_SNAPSHOTS"
+
+ASSET_SCHEMA = {
+    "id": pl.Utf8,
+    "asset_class": pl.Utf8,
+    "exchange": pl.Utf8,
+    "ticker": pl.Utf8,
+    "name": pl.Utf8,
+    "status": pl.Utf8,
+    "tradable": pl.Boolean,
+    "marginable": pl.Boolean,
+    "shortable": pl.Boolean,
+    "easy_to_borrow": pl.Boolean,
+    "fractionable": pl.Boolean,
+    "min_order_size": pl.Float64,
+    "min_trade_increment": pl.Float64,
+    "price_increment": pl.Float64,
+    "maintenance_margin_requirement": pl.Float64,
+    "attributes": pl.Utf8,
+}
+
+SNAPSHOT_SCHEMA = {"snapshot_date": pl.Date} | ASSET_SCHEMA
+
 
 class AlpacaAssets:
+    """
+    Dated snapshots of the active US equities, one per download day, in the
+    ALPACA_ASSETS_SNAPSHOTS table partitioned by snapshot_date. Keeping every
+    snapshot instead of overwriting one table lets AssetUniverse answer which
+    tickers were listed, shortable, ... on a past date.
+    """
 
     def __init__(self, overwrite: bool = False) -> None:
         self.overwrite = overwrite
@@ -24,13 +53,29 @@ class AlpacaAssets:
         secret_key = os.getenv("ALPACA_API_SECRET_KEY")
 
         self._table_name = "ALPACA_ASSETS"
+        self._snapshot_table_name = SNAPSHOT_TABLE
         self._trading_client = TradingClient(api_key, secret_key)
         self.db = Database()
 
-    def _already_downloaded(self) -> bool:
-        return self.db.exists(self._table_name)
+        if not self.db.exists(self._snapshot_table_name):
+            self.db.create(
+                self._snapshot_table_name,
+                self._bootstrap(),
+                partition_on="snapshot_date",
+            )
+
+    def _already_downloaded(self, snapshot_date: date) -> bool:
+        snapshots = self.db.scan(
+            self._snapshot_table_name,
+            columns=["snapshot_date"],
+            start_date=snapshot_date,
+            end_date=snapshot_date,
+            date_column="snapshot_date",
+        )
+        return not snapshots.head(1).collect().is_empty()
 
     def download(self):
+        """Store today's snapshot of every active asset, replacing one taken earlier today."""
         # Alpaca get assets request
         search_params = GetAssetsRequest(
             status=AssetStatus.ACTIVE,
@@ -38,42 +83,84 @@ class AlpacaAssets:
         )
         assets: list[Asset] = self._trading_client.get_all_assets(search_params)
 
-        # Parse raw assets data
-        parsed_assets = [
-            {
-                "id": str(asset.id),
-                "asset_class": asset.asset_class.value,
-                "exchange": asset.exchange.value,
-                "ticker": asset.symbol,
-                "name": asset.name,
-                "status": asset.status.value,
-                "tradable": asset.tradable,
-                "marginable": asset.marginable,
-                "shortable": asset.shortable,
-                "easy_to_borrow": asset.easy_to_borrow,
-                "fractionable": asset.fractionable,
-                "min_order_size": asset.min_order_size,
-                "min_trade_increment": asset.min_trade_increment,
-                "price_increment": asset.price_increment,
-                "maintenance_margin_requirement": asset.maintenance_margin_requirement,
-                "attributes": ", ".join(asset.attributes) if asset.attributes else None,
-            }
-            for asset in assets
-        ]
-        data = pl.DataFrame(parsed_assets)
-
-        data = data.filter(
-            pl.col("status") == "active",
-            pl.col("tradable") == True,
-            pl.col("fractionable") == True,
-            pl.col("shortable") == True,
+        # Parse raw assets data column by column
+        columns = {
+            "id": [str(asset.id) for asset in assets],
+            "asset_class": [asset.asset_class.value for asset in assets],
+            "exchange": [asset.exchange.value for asset in assets],
+            "ticker": [asset.symbol for asset in assets],
+            "name": [asset.name for asset in assets],
+            "status": [asset.status.value for asset in assets],
+            "attributes": [
+                ", ".join(asset.attributes) if asset.attributes else None
+                for asset in assets
+            ],
+        }
+        for column in ASSET_SCHEMA:
+            if column not in columns:
+                columns[column] = [getattr(asset, column) for asset in assets]
+        data = pl.DataFrame(columns, schema=ASSET_SCHEMA)
+
+        snapshot = data.select(
+            pl.lit(date.today()).alias("snapshot_date"), pl.all()
+        ).unique(subset="ticker", keep="first")
+        self.db.upsert(
+            self._snapshot_table_name, snapshot, on=["snapshot_date", "ticker"]
         )
 
-        self.db.create(self._table_name, data, overwrite=self.overwrite)
+    def update(self) -> None:
+        """Download today's snapshot if there is none yet, or always with overwrite."""
+        if self.overwrite or not self._already_downloaded(date.today()):
+            self.download()
 
-    def load(self):
+    def load(self, snapshot_date: date | None = None) -> pl.DataFrame:
+        """
+        Tradable, fractionable and shortable active assets of the latest snapshot on
+        or before snapshot_date. Without a date, today's snapshot is downloaded first
+        if there is none yet, or always when overwrite is set.
+        """
+        if snapshot_date is None:
+            snapshot_date = date.today()
+            self.update()
 
-        if not self._already_downloaded():
-            self.download()
+        latest = (
+            self.snapshots(end_date=snapshot_date)
+            .select(pl.col("snapshot_date").max())
+            .collect()
+            .item()
+        )
+        return (
+            self.snapshots(start_date=latest, end_date=latest)
+            .filter(
+                pl.col("status") == "active",
+                pl.col("tradable") == True,
+                pl.col("fractionable") == True,
+                pl.col("shortable") == True,
+            )
+            .drop("snapshot_date")
+            .collect()
+        )
+
+    def snapshots(
+        self, start_date: date | None = None, end_date: date | None = None
+    ) -> pl.LazyFrame:
+        return self.db.scan(
+            self._snapshot_table_name,
+            start_date=start_date,
+            end_date=end_date,
+            date_column="snapshot_date",
+        )
 
-        return self.db.read(self._table_name)
+    def _bootstrap(self) -> pl.DataFrame:
+        """Snapshot of the old single ALPACA_ASSETS table, dated when it was written."""
+        if not self.db.exists(self._table_name):
+            return pl.DataFrame(schema=SNAPSHOT_SCHEMA)
+
+        written = date.fromtimestamp(
+            os.path.getmtime(self.db.get_table_path(self._table_name))
+        )
+        return (
+            self.db.read(self._table_name)
+            .select(pl.lit(written).alias("snapshot_date"), pl.all())
+            .cast(SNAPSHOT_SCHEMA)
+        )
@@ -0,0 +1,265 @@
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+from alpaca.data.enums import Adjustment, DataFeed
+from alpaca.data.models.bars import BarSet
+from alpaca.common.exceptions import APIError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import numpy as np
+import polars as pl
+import requests
+from qdatabase import Database
+from qprofiler import span
+
+BAR_SCHEMA = {
+    "ticker": pl.Utf8,
+    "date": pl.Date,
+    "open": pl.Float64,
+    "high": pl.Float64,
+    "low": pl.Float64,
+    "close": pl.Float64,
+    "volume": pl.Float64,
+    "trade_count": pl.Float64,
+    "vwap": pl.Float64,
+}
+
+# Most bars alpaca-py asks for in one request, it follows next_page_token for more
+PAGE_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second in bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> None:
+        """
+        Take tokens once the bucket holds them. Taking more than the capacity waits
+        for a full bucket and leaves it in debt, so the next takers wait it off.
+        """
+        needed = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return
+
+                wait = (needed - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class AlpacaBarFetcher:
+    """
+    Fetches bars in (ticker batch, date range) batches on a bounded thread pool.
+    alpaca-py pages through a batch with one HTTP request per PAGE_SIZE bars, so
+    every batch asks for at most its weekday count of bars per ticker and charges
+    the token bucket, sized to Alpaca's rate limit (200 requests per minute on the
+    free plan), one token per page. Rate limiting, server errors and dropped
+    connections are retried with exponential backoff, other errors fail the batch
+    right away. Every finished batch is checkpointed to a `<table_name>_STG_<batch>`
+    table, so a restarted download only fetches the batches that are still missing.
+
+    The client only needs a `get_stock_bars(request)` method, so a local fake can
+    stand in for StockHistoricalDataClient.
+    """
+
+    def __init__(
+        self,
+        client,
+        db: Database,
+        interval: str = "daily",
+        batch_size: int = 100,
+        batch_days: int = 365,
+        max_workers: int = 4,
+        requests_per_minute: int = 200,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ) -> None:
+        self.client = client
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_days = batch_days
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._limiter = TokenBucket(rate=requests_per_minute / 60, capacity=max_workers)
+        self.stats: dict = {}
+
+    def fetch(
+        self, table_name: str, tickers: list[str], start_date: date, end_date: date
+    ) -> pl.DataFrame:
+        """Fetch every batch that isn't checkpointed yet and return all bars in BAR_SCHEMA."""
+        batches = self._batches(table_name, tickers, start_date, end_date)
+        pending = [batch for batch in batches if not self.db.exists(batch[0])]
+
+        start_time = time.perf_counter()
+        failures = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_batch, *batch): batch for batch in pending
+            }
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    failures.append((futures[future][0], future.exception()))
+        seconds = time.perf_counter() - start_time
+
+        if failures:
+            raise RuntimeError(
+                f"{len(failures)} of {len(batches)} batches failed, rerun to resume: "
+                f"{failures[0][1]!r}"
+            )
+
+        frames = {batch[0]: self.db.read(batch[0]) for batch in batches}
+        data = pl.concat([pl.DataFrame(schema=BAR_SCHEMA), *frames.values()])
+
+        bars = sum(len(frames[batch[0]]) for batch in pending)
+        self.stats = {
+            "batches": len(pending),
+            "bars": bars,
+            "seconds": seconds,
+            "bars_per_second": bars / seconds if seconds > 0 else 0.0,
+        }
+        logger.info(
+            "Fetched %d bars in %d batches (%.0f bars/s)",
+            bars,
+            len(pending),
+            self.stats["bars_per_second"],
+        )
+
+        return data
+
+    def clear(
+        self, table_name: str, tickers: list[str], start_date: date, end_date: date
+    ) -> None:
+        """Delete the batch checkpoints of a finished download."""
+        for batch in self._batches(table_name, tickers, start_date, end_date):
+            if self.db.exists(batch[0]):
+                self.db.delete(batch[0])
+
+    def _fetch_batch(
+        self, batch_name: str, tickers: list[str], start_date: date, end_date: date
+    ) -> None:
+        timeframe_unit = (
+            TimeFrameUnit.Day if self.interval == "daily" else TimeFrameUnit.Month
+        )
+        # Without a limit Alpaca pages by 1000 bars, with one it pages by PAGE_SIZE
+        limit = self._max_bars(tickers, start_date, end_date)
+        pages = math.ceil(limit / PAGE_SIZE)
+        request = StockBarsRequest(
+            symbol_or_symbols=tickers,
+            timeframe=TimeFrame(1, timeframe_unit),
+            start=start_date,
+            end=end_date,
+            limit=limit,
+            adjustment=Adjustment.SPLIT,
+            feed=DataFeed.IEX,
+        )
+
+        with span(
+            "alpaca.fetch_batch", tickers=len(tickers), pages=pages
+        ) as batch_span:
+            for attempt in range(self.max_retries + 1):
+                self._limiter.acquire(pages)
+                try:
+                    bar_set: BarSet = self.client.get_stock_bars(request)
+                    break
+                except Exception as error:
+                    if attempt == self.max_retries or not _transient(error):
+                        raise
+                    time.sleep(
+                        self.backoff * 2**attempt + random.uniform(0, self.backoff)
+                    )
+            batch_span.set(attempts=attempt + 1)
+
+            # Checkpoint, an empty table still marks the batch as done
+            self.db.create(batch_name, parse_bars(bar_set), overwrite=True)
+
+    def _max_bars(self, tickers: list[str], start_date: date, end_date: date) -> int:
+        """Bars a batch can return at most: one per ticker and weekday (or month)."""
+        if self.interval == "daily":
+            periods = int(np.busday_count(start_date, end_date + timedelta(days=1)))
+        else:
+            periods = (end_date.year - start_date.year) * 12
+            periods += end_date.month - start_date.month + 1
+        return max(1, len(tickers) * periods)
+
+    def _batches(
+        self, table_name: str, tickers: list[str], start_date: date, end_date: date
+    ) -> list[tuple[str, list[str], date, date]]:
+        """(checkpoint name, tickers, start, end) for every ticker batch and date range."""
+        date_ranges = []
+        batch_start = start_date
+        while batch_start <= end_date:
+            batch_end = min(batch_start + timedelta(days=self.batch_days - 1), end_date)
+            date_ranges.append((batch_start, batch_end))
+            batch_start = batch_end + timedelta(days=1)
+
+        batches = []
+        for i in range(0, len(tickers), self.batch_size):
+            batch_tickers = tickers[i : i + self.batch_size]
+            key = hashlib.md5(",".join(batch_tickers).encode()).hexdigest()[:10]
+            for batch_start, batch_end in date_ranges:
+                name = f"{table_name}_STG_{batch_start:%Y%m%d}_{batch_end:%Y%m%d}_{key}"
+                batches.append((name, batch_tickers, batch_start, batch_end))
+
+        return batches
+
+
+def _transient(error: Exception) -> bool:
+    """Rate limiting, server errors and dropped connections are worth retrying."""
+    if isinstance(error, APIError):
+        return error.status_code is not None and (
+            error.status_code == 429 or error.status_code >= 500
+        )
+    return isinstance(
+        error,
+        (
+            ConnectionError,
+            TimeoutError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ),
+    )
+
+
+def parse_bars(bar_set: BarSet) -> pl.DataFrame:
+    """
+    Build the BAR_SCHEMA frame straight from the bar records in one pass, without
+    going through bar_set.df (pandas) and a second rename/cast step.
+    """
+    columns = {name: [] for name in BAR_SCHEMA}
+
+    for ticker, bars in bar_set.data.items():
+        for bar in bars:
+            columns["ticker"].append(ticker)
+            columns["date"].append(bar.timestamp.date())
+            columns["open"].append(bar.open)
+            columns["high"].append(bar.high)
+            columns["low"].append(bar.low)
+            columns["close"].append(bar.close)
+            columns["volume"].append(bar.volume)
+            columns["trade_count"].append(bar.trade_count)
+            columns["vwap"].append(bar.vwap)
+
+    return pl.DataFrame(columns, schema=BAR_SCHEMA)
@@ -7,151 +7,309 @@ from alpaca.trading import TradingClient
 from alpaca.trading import GetAssetsRequest
 from alpaca.trading.enums import AssetClass, AssetStatus
 from alpaca.trading.models import Asset
-from datetime import date
+from datetime import date, timedelta
+from functools import cached_property
+import logging
 import os
 from dotenv import load_dotenv
 import polars as pl
-from qdatabase import Database
-from src.datasets.alpaca_assets import AlpacaAssets
+from qdatabase import Database, CoverageIndex, dataset_cache
+from qcomponents import lookback_start
+from qprofiler import span, trace, tracer
+from src.datasets.asset_universe import asset_universe
+from src.datasets.alpaca_fetcher import AlpacaBarFetcher, BAR_SCHEMA
+from src.datasets.resampler import resampler
+
+CORE_SCHEMA = BAR_SCHEMA | {
+    "ticker_id": pl.UInt32,
+    "ret": pl.Float64,
+    "logret": pl.Float64,
+}
+DAILY_TABLE = "ALPACA_STOCK_DAILY"
+
+logger = logging.getLogger(__name__)
 
 
 class AlpacaStock:
 
+    # Core tables already created and migrated in this process
+    _prepared_tables: set[str] = set()
+
     def __init__(
         self,
         start_date: date,
         end_date: date | None = date.today(),
         interval: str = "daily",
+        lookback: int = 0,
+        universe: dict[str, bool] | None = None,
     ) -> None:
+        """
+        lookback moves start_date back by that many dates of the core table, for
+        strategies whose windows ending on start_date need the dates behind it.
+        universe, e.g. {"shortable": True}, keeps only the rows of tickers that were
+        in the asset universe with those flags on their date (AssetUniverse.filter),
+        so loads need the date and ticker columns.
+        """
         self.start_date = start_date
         self.end_date = end_date
         self.interval = interval
-
-        start = start_date.strftime("%Y-%m-%d")
-        end = end_date.strftime("%Y-%m-%d")
-        self.table_name = f"ALPACA_STOCK_{interval.upper()}_{start}_{end}"
-
-        if not end_date:
-            end_date = date.today()
-
-        load_dotenv()
-        api_key = os.getenv("ALPACA_API_KEY")
-        secret_key = os.getenv("ALPACA_API_SECRET_KEY")
-
-        self._stock_client = StockHistoricalDataClient(api_key, secret_key)
-        self._trading_client = TradingClient(api_key, secret_key)
+        self.universe = universe
         self.db = Database()
 
-        # Create the core table if it doesn't already exist
+        # Create the daily core table if it doesn't already exist. Longer intervals
+        # are resampled from it instead of downloaded, see Resampler
         self.core_table_name = f"ALPACA_STOCK_{self.interval.upper()}"
-        core_table_schema = {
-            "ticker": pl.Utf8,
-            "date": pl.Date,
-            "open": pl.Float64,
-            "high": pl.Float64,
-            "low": pl.Float64,
-            "close": pl.Float64,
-            "volume": pl.Float64,
-            "trade_count": pl.Float64,
-            "vwap": pl.Float64,
-        }
-        empty_core_table = pl.DataFrame(schema=core_table_schema)
-        self.db.create(
-            table_name=self.core_table_name, data=empty_core_table, overwrite=False
-        )
+        self._prepare_daily_table()
+        if self.interval != "daily":
+            resampler.update(self.interval)
 
-    def download(self):
-        self._download_and_stage()
-        self._transform()
-        self._merge()
+        self.coverage = CoverageIndex(self.db, DAILY_TABLE)
 
-    def load(self) -> pl.DataFrame:
-        core_table_name = f"ALPACA_STOCK_{self.interval.upper()}"
-        data = self.db.read(core_table_name)
+        if lookback:
+            dates = self.db.scan(self.core_table_name, columns=["date"])
+            self.start_date = lookback_start(dates, start_date, lookback)
 
-        data = data.sort(by=["ticker", "date"])
+    def _prepare_daily_table(self) -> None:
+        if DAILY_TABLE in AlpacaStock._prepared_tables:
+            return
 
-        data = data.filter(
-            pl.col("date") >= self.start_date, pl.col("date") <= self.end_date
+        empty_core_table = pl.DataFrame(schema=CORE_SCHEMA)
+        self.db.create(
+            table_name=DAILY_TABLE,
+            data=empty_core_table,
+            overwrite=False,
+            partition_on="date",
         )
 
-        data = data.with_columns(
-            [pl.col("close").pct_change().over("ticker").alias("ret")]
-        )
+        # Core tables from before returns and ticker ids were stored get them once
+        schema = self.db.scan(DAILY_TABLE).collect_schema()
+        if "ret" not in schema or "ticker_id" not in schema:
+            self.rebuild_returns()
 
-        return data
+        # Every strategy reads the core table, so keep a memory-mapped copy
+        self.db.make_hot(DAILY_TABLE)
+        AlpacaStock._prepared_tables.add(DAILY_TABLE)
 
-    def _download_and_stage(self):
-        if self.db.exists(f"{self.table_name}_STG"):
+    @cached_property
+    def _stock_client(self) -> StockHistoricalDataClient:
+        load_dotenv()
+        api_key = os.getenv("ALPACA_API_KEY")
+        secret_key = os.getenv("ALPACA_API_SECRET_KEY")
+        return StockHistoricalDataClient(api_key, secret_key)
+
+    def download(self, redownload: bool = False, stage: bool = False):
+        """
+        Download the bars missing from the core table. The coverage index knows which
+        date ranges every ticker already has, so only the gaps are requested, with one
+        request per distinct gap range. Set redownload to request the full range and
+        stage to archive a copy of every raw download. Longer intervals download the
+        daily bars of their range and resample them.
+        """
+        if self.interval != "daily":
+            AlpacaStock(self.start_date, self.end_date).download(redownload, stage)
+            resampler.update(self.interval)
             return
 
-        # Get tradable symbols
         tickers = self._get_tickers()
-
-        timeframe_unit = (
-            TimeFrameUnit.Day if self.interval == "daily" else TimeFrameUnit.Month
+        end_date = min(self.end_date, date.today())
+
+        if redownload:
+            gaps = pl.DataFrame(
+                {"ticker": tickers, "start_date": self.start_date, "end_date": end_date}
+            )
+        else:
+            gaps = self.coverage.gaps(tickers, self.start_date, end_date)
+
+        requests = (
+            gaps.group_by(["start_date", "end_date"])
+            .agg(pl.col("ticker"))
+            .sort(by=["start_date", "end_date"])
         )
 
-        # Get stock bars request
-        stock_bar_request = StockBarsRequest(
-            symbol_or_symbols=tickers,
-            timeframe=TimeFrame(1, timeframe_unit),
-            start=self.start_date,
-            end=self.end_date,
-            adjustment=Adjustment.SPLIT,
-            feed=DataFeed.IEX,
+        fetcher = AlpacaBarFetcher(self._stock_client, self.db)
+        for start_date, end_date, tickers in requests.iter_rows():
+            table_name = self._stage_table_name(start_date, end_date)
+
+            with span(
+                "alpaca.download",
+                tickers=len(tickers),
+                start_date=start_date,
+                end_date=end_date,
+            ):
+                logger.info(
+                    "Downloading Alpaca data for %d tickers from %s to %s",
+                    len(tickers),
+                    start_date,
+                    end_date,
+                )
+                bars = fetcher.fetch(table_name, tickers, start_date, end_date)
+
+                if stage:
+                    self.db.create(f"{table_name}_STG", bars, overwrite=True)
+                    self.db.archive(f"{table_name}_STG")
+
+                self._merge(bars, tickers, start_date, end_date)
+
+                # Batch checkpoints are only needed until the bars are merged
+                fetcher.clear(table_name, tickers, start_date, end_date)
+                for covered_end, covered in self._covered(
+                    bars, tickers, start_date, end_date
+                ).items():
+                    self.coverage.add(covered, start_date, covered_end)
+
+    @trace("alpaca.load")
+    def load(self, columns: list[str] | None = None) -> pl.DataFrame:
+        """
+        Load the requested date range from the core table, reading only the given
+        columns. Returns are stored in the table, so no sort or window is needed.
+        Reads go through the shared dataset cache, so repeated loads of the same or a
+        narrower slice in one process don't touch disk. Tickers come as the
+        universe's Enum, read from the stored ticker ids, see AssetUniverse.
+        """
+        data = dataset_cache.read(
+            self.db,
+            self.core_table_name,
+            columns=self._stored_columns(columns),
+            start_date=self.start_date,
+            end_date=self.end_date,
         )
-        print("Downloading Alpaca data")
-        bar_set: BarSet = self._stock_client.get_stock_bars(stock_bar_request)
-
-        # Parsing
-        data = bar_set.df.reset_index()
-        stage_table = pl.from_pandas(data)
-
-        # Create stage table
-        print("Staging")
-        self.db.create(f"{self.table_name}_STG", stage_table)
-
-    def _transform(self):
-        print("Transforming")
-        xf_table = self.db.read(f"{self.table_name}_STG")
-
-        # Rename columns
-        xf_table = xf_table.rename({"symbol": "ticker", "timestamp": "date"})
-
-        # Cast date type
-        xf_table = xf_table.with_columns(pl.col("date").dt.date())
-
-        xf_table = xf_table.sort(by=["ticker", "date"])
+        return self._filter(self._decode(data, columns))
+
+    def scan(self, columns: list[str] | None = None) -> pl.LazyFrame:
+        """Lazy scan of the requested date range, for reading it a slice at a time."""
+        scan = self.db.scan(
+            self.core_table_name,
+            columns=self._stored_columns(columns),
+            start_date=self.start_date,
+            end_date=self.end_date,
+        )
+        return self._filter(self._decode(scan, columns))
 
-        self.db.create(f"{self.table_name}_XF", xf_table)
+    def rebuild_returns(self):
+        """Recompute the ticker_id, ret and logret columns of the daily core table."""
+        data = self.db.read(DAILY_TABLE).select(list(BAR_SCHEMA))
+        self.db.create(
+            DAILY_TABLE,
+            asset_universe.encode(self._with_returns(data)).select(list(CORE_SCHEMA)),
+            overwrite=True,
+            partition_on="date",
+        )
 
-    def _merge(self):
-        xf_table = self.db.read(f"{self.table_name}_XF")
-        core_table = self.db.read(self.core_table_name)
+    @staticmethod
+    def _stored_columns(columns: list[str] | None) -> list[str]:
+        """The stored columns to read: tickers are read as their ids."""
+        columns = columns or [column for column in CORE_SCHEMA if column != "ticker_id"]
+        return ["ticker_id" if column == "ticker" else column for column in columns]
+
+    @staticmethod
+    def _decode(
+        data: pl.DataFrame | pl.LazyFrame, columns: list[str] | None
+    ) -> pl.DataFrame | pl.LazyFrame:
+        columns = columns or [column for column in CORE_SCHEMA if column != "ticker_id"]
+        if "ticker" not in columns:
+            return data
+        return asset_universe.decode(data).select(columns)
+
+    @trace("alpaca.merge")
+    def _merge(
+        self, bars: pl.DataFrame, tickers: list[str], start_date: date, end_date: date
+    ):
+        # Existing rows of the requested slice, plus every ticker's last row before it
+        # and first row after it however far away, so returns chain onto neighbours
+        before = self.db.scan(
+            DAILY_TABLE, end_date=start_date - timedelta(days=1), tickers=tickers
+        )
+        after = self.db.scan(
+            DAILY_TABLE, start_date=end_date + timedelta(days=1), tickers=tickers
+        )
+        existing = pl.concat(
+            [
+                _edge_rows(before, pl.col("date").max()),
+                self.db.scan(
+                    DAILY_TABLE,
+                    start_date=start_date,
+                    end_date=end_date,
+                    tickers=tickers,
+                ),
+                _edge_rows(after, pl.col("date").min()),
+            ]
+        ).collect()
 
         # Find unique rows
-        unique_rows = xf_table.join(core_table, on=["date", "ticker"], how="anti")
-
-        print(unique_rows)
+        unique_rows = bars.join(existing, on=["date", "ticker"], how="anti")
+
+        # Returns of the new rows and of any existing row right after one of them
+        rows = pl.concat(
+            [
+                existing.select(list(BAR_SCHEMA)).with_columns(_new=pl.lit(False)),
+                unique_rows.with_columns(_new=pl.lit(True)),
+            ]
+        )
+        rows = (
+            self._with_returns(rows)
+            .filter(pl.col("_new") | pl.col("_new").shift(1).over("ticker"))
+            .drop("_new")
+        )
+        rows = asset_universe.encode(rows).select(list(CORE_SCHEMA))
 
         # Insert unique rows into core table
-        print(f"Inserting {len(unique_rows)} unique rows")
-        self.db.insert(self.core_table_name, unique_rows)
-
-        # Archive stage table
-        self.db.archive(f"{self.table_name}_STG")
+        logger.info("Inserting %d unique rows", len(unique_rows))
+        tracer.current().add(rows=len(unique_rows))
+        self.db.upsert(DAILY_TABLE, rows, on=["ticker", "date"])
+
+    @staticmethod
+    @trace("alpaca.returns")
+    def _with_returns(data: pl.DataFrame) -> pl.DataFrame:
+        """Simple and log returns from close to close, sorted by ticker and date."""
+        return (
+            data.sort(by=["ticker", "date"])
+            .with_columns(pl.col("close").pct_change().over("ticker").alias("ret"))
+            .with_columns(pl.col("ret").log1p().alias("logret"))
+        )
 
-        # Delete xf table
-        self.db.delete(f"{self.table_name}_XF")
+    @staticmethod
+    def _covered(
+        bars: pl.DataFrame, tickers: list[str], start_date: date, end_date: date
+    ) -> dict[date, list[str]]:
+        """
+        Tickers by the date a download covers them until. Today's bars may not be
+        published yet, so a range reaching today only counts up to yesterday, or up
+        to a ticker's latest bar when one came back for today.
+        """
+        settled = min(end_date, date.today() - timedelta(days=1))
+        latest = dict(bars.group_by("ticker").agg(pl.col("date").max()).iter_rows())
+
+        covered: dict[date, list[str]] = {}
+        for ticker in tickers:
+            until = max(settled, latest.get(ticker, settled))
+            if until >= start_date:
+                covered.setdefault(until, []).append(ticker)
+        return covered
+
+    def _filter(self, data: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+        if self.universe is None:
+            return data
+        return asset_universe.filter(data, **self.universe)
+
+    def _stage_table_name(self, start_date: date, end_date: date) -> str:
+        start = start_date.strftime("%Y-%m-%d")
+        end = end_date.strftime("%Y-%m-%d")
+        return f"{DAILY_TABLE}_{start}_{end}"
 
     def _get_tickers(self):
-        print("Getting available assets")
-        assets = AlpacaAssets().load()
-        return assets["ticker"].to_list()
+        logger.info("Getting available assets")
+        asset_universe.update()
+        return asset_universe.tickers(tradable=True, fractionable=True, shortable=True)
+
+
+def _edge_rows(rows: pl.LazyFrame, edge: pl.Expr) -> pl.LazyFrame:
+    """Every ticker's row on its edge date, found from the ticker and date columns."""
+    edges = rows.select(["ticker", "date"]).group_by("ticker").agg(edge)
+    return rows.join(edges, on=["ticker", "date"], how="semi")
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     years = range(2024, 2025)  # Unsure why years 2016-2019 don't have data...
     # for year in years:
     #     for month in range(1,13):
@@ -161,5 +319,3 @@ if __name__ == "__main__":
     start = date(year, month, 1)
     end = date(year, month, 31)
     dataset = AlpacaStock(start_date=start, end_date=end, interval="daily").download()
-
-# TODO: Adapt the dataset to check which dates are already downloaded before running (make an option 'redownload')
@@ -0,0 +1,263 @@
+from bisect import bisect_right
+from datetime import date
+import numpy as np
+import polars as pl
+from qdatabase import Database
+from qprofiler import trace
+from src.datasets.alpaca_assets import AlpacaAssets, SNAPSHOT_TABLE
+
+TICKER_ID_TABLE = "TICKER_IDS"
+TICKER_ID_SCHEMA = {"ticker": pl.Utf8, "ticker_id": pl.UInt32}
+
+
+class AssetUniverse:
+    """
+    Point-in-time asset universe over the AlpacaAssets snapshots. A date is answered
+    from the latest snapshot on or before it, so a backtest only trades tickers that
+    were listed (and shortable, ...) back then; dates before the first snapshot use
+    the first one, the best that is known about them.
+
+    Tickers are dictionary encoded: every ticker ever seen gets a stable UInt32 id in
+    the TICKER_IDS table, and ticker_dtype is the matching pl.Enum whose physical
+    values are those ids, so tables and joins can key on integers instead of strings.
+
+    The snapshots are indexed in memory as numpy id arrays and flag masks per
+    snapshot, and every distinct query is memoised, so repeated universe lookups
+    take microseconds. refresh() rebuilds the index once the tables have changed.
+    """
+
+    FLAGS = ("tradable", "marginable", "shortable", "easy_to_borrow", "fractionable")
+
+    def __init__(
+        self,
+        db: Database | None = None,
+        snapshot_table: str = SNAPSHOT_TABLE,
+        ticker_id_table: str = TICKER_ID_TABLE,
+    ):
+        self._db = db
+        self.snapshot_table = snapshot_table
+        self.ticker_id_table = ticker_id_table
+        self._versions = None
+        self._ids_version = None
+        self._queries: dict[tuple, np.ndarray] = {}
+
+    @property
+    def db(self) -> Database:
+        if self._db is None:
+            self._db = Database()
+        return self._db
+
+    def update(self, overwrite: bool = False) -> None:
+        """Take today's snapshot of the Alpaca assets unless there is one already."""
+        AlpacaAssets(overwrite=overwrite).update()
+        self.refresh()
+
+    @trace("universe.refresh")
+    def refresh(self) -> None:
+        """Rebuild the index if the snapshots or the ticker ids changed."""
+        if not self.db.exists(self.snapshot_table):
+            AlpacaAssets()
+
+        versions = (self.db.version(self.snapshot_table), self._ids_table_version())
+        if versions == self._versions:
+            return
+
+        snapshots = self.db.read(
+            self.snapshot_table,
+            columns=["snapshot_date", "ticker", "exchange", *self.FLAGS],
+        ).sort(by=["snapshot_date", "ticker"])
+        self.register(snapshots["ticker"].unique())
+
+        snapshots = snapshots.with_columns(
+            pl.col("ticker").cast(self._dtype).to_physical().alias("ticker_id")
+        )
+        self._dates = []
+        self._snapshots = []
+        for (snapshot_date,), snapshot in snapshots.group_by(
+            "snapshot_date", maintain_order=True
+        ):
+            self._dates.append(snapshot_date)
+            self._snapshots.append(
+                {
+                    "ticker_id": snapshot["ticker_id"].to_numpy(),
+                    "exchange": snapshot["exchange"].to_numpy(),
+                    **{
+                        flag: snapshot[flag].fill_null(False).to_numpy()
+                        for flag in self.FLAGS
+                    },
+                }
+            )
+
+        # Registering new tickers above changed the ticker id table
+        self._queries = {}
+        self._versions = (versions[0], self._ids_table_version())
+
+    def register(self, tickers: pl.Series | list[str]) -> None:
+        """Give every ticker that has no id yet the next free one."""
+        self._ensure_ids()
+        new = pl.Series("ticker", tickers, dtype=pl.Utf8).unique().sort()
+        new = new.filter(~new.is_in(self._ids["ticker"]))
+        if new.is_empty():
+            return
+
+        new_ids = pl.DataFrame(
+            {
+                "ticker": new,
+                "ticker_id": pl.int_range(
+                    len(self._ids), len(self._ids) + len(new), eager=True
+                ),
+            },
+            schema=TICKER_ID_SCHEMA,
+        )
+        self.db.create(
+            self.ticker_id_table, pl.concat([self._ids, new_ids]), overwrite=True
+        )
+        self._ensure_ids()
+
+    @property
+    def ticker_dtype(self) -> pl.Enum:
+        """
+        Enum of every registered ticker, whose physical value is its ticker_id. Ids
+        are only ever appended, so an older ticker_dtype is a prefix of a newer one.
+        """
+        self._ensure_ids()
+        return self._dtype
+
+    def encode(self, data: pl.DataFrame, column: str = "ticker") -> pl.DataFrame:
+        """Add the UInt32 ticker_id of the ticker column, registering new tickers."""
+        self.register(data[column].unique())
+        return data.with_columns(
+            pl.col(column).cast(self._dtype).to_physical().alias("ticker_id")
+        )
+
+    def decode(
+        self, data: pl.DataFrame | pl.LazyFrame, column: str = "ticker_id"
+    ) -> pl.DataFrame | pl.LazyFrame:
+        """
+        Replace the ticker_id column by the ticker it encodes, as ticker_dtype. The
+        ids already are the Enum's physical values, so no string is touched.
+        """
+        return data.with_columns(
+            pl.col(column).cast(self.ticker_dtype).alias("ticker")
+        ).drop(column)
+
+    def ids(
+        self, as_of: date | None = None, exchange: str | None = None, **flags: bool
+    ) -> np.ndarray:
+        """
+        Sorted ticker ids in the universe as of a date (the latest snapshot by
+        default), optionally only on one exchange and with flags such as
+        shortable=True. The array is shared between calls and must not be modified.
+        """
+        self._ensure_index()
+        if not self._dates:
+            return np.empty(0, dtype=np.uint32)
+
+        return self._members(self._snapshot_position(as_of), exchange, flags)
+
+    def tickers(
+        self, as_of: date | None = None, exchange: str | None = None, **flags: bool
+    ) -> list[str]:
+        """ids() decoded to ticker symbols."""
+        ids = self.ids(as_of, exchange, **flags)
+        return self._ids["ticker"].gather(ids).to_list()
+
+    def contains(self, ticker: str, as_of: date | None = None, **flags: bool) -> bool:
+        ids = self.ids(as_of, **flags)
+        ticker_id = self._lookup.get(ticker)
+        if ticker_id is None:
+            return False
+        position = np.searchsorted(ids, ticker_id)
+        return bool(position < len(ids) and ids[position] == ticker_id)
+
+    def filter(
+        self,
+        data: pl.DataFrame | pl.LazyFrame,
+        exchange: str | None = None,
+        **flags: bool,
+    ) -> pl.DataFrame | pl.LazyFrame:
+        """
+        Rows of a (date, ticker, ...) panel whose ticker was in the universe as of
+        their date, e.g. filter(data, shortable=True) before forming portfolios.
+        Tickers are strings or ticker_dtype, and are matched on their ids.
+        """
+        self._ensure_index()
+        if not self._dates:
+            return data.clear()
+
+        ticker = pl.col("ticker")
+        if data.collect_schema()["ticker"] == pl.Utf8:
+            ticker = ticker.cast(self.ticker_dtype, strict=False)
+
+        # The snapshot every date is answered from, as in _snapshot_position
+        dates = pl.lit(pl.Series(self._dates, dtype=pl.Date))
+        snapshot = dates.search_sorted(pl.col("date"), side="right").cast(pl.Int64)
+        members = pl.concat(
+            [
+                pl.DataFrame(
+                    {
+                        "_snapshot": position,
+                        "_ticker_id": self._members(position, exchange, flags),
+                    },
+                    schema={"_snapshot": pl.Int64, "_ticker_id": pl.UInt32},
+                )
+                for position in range(len(self._dates))
+            ]
+        )
+        if isinstance(data, pl.LazyFrame):
+            members = members.lazy()
+
+        return (
+            data.with_columns(
+                (snapshot - 1).clip(0).alias("_snapshot"),
+                ticker.to_physical().alias("_ticker_id"),
+            )
+            .join(members, on=["_snapshot", "_ticker_id"], how="semi")
+            .drop(["_snapshot", "_ticker_id"])
+        )
+
+    def _snapshot_position(self, as_of: date | None) -> int:
+        """Latest snapshot on or before as_of, or the first one before any snapshot."""
+        if as_of is None:
+            return len(self._dates) - 1
+        return max(bisect_right(self._dates, as_of) - 1, 0)
+
+    def _members(self, position: int, exchange: str | None, flags: dict) -> np.ndarray:
+        key = (position, exchange, *sorted(flags.items()))
+        if key not in self._queries:
+            snapshot = self._snapshots[position]
+            mask = np.ones(len(snapshot["ticker_id"]), dtype=bool)
+            if exchange is not None:
+                mask &= snapshot["exchange"] == exchange
+            for flag, value in flags.items():
+                mask &= snapshot[flag] == value
+            self._queries[key] = np.sort(snapshot["ticker_id"][mask])
+
+        return self._queries[key]
+
+    def _ensure_index(self) -> None:
+        if self._versions is None:
+            self.refresh()
+
+    def _ensure_ids(self) -> None:
+        """Reload the ticker ids if another process registered tickers since."""
+        version = self._ids_table_version()
+        if version == self._ids_version:
+            return
+
+        if self.db.exists(self.ticker_id_table):
+            self._ids = self.db.read(self.ticker_id_table)
+        else:
+            self._ids = pl.DataFrame(schema=TICKER_ID_SCHEMA)
+        self._lookup = dict(self._ids.iter_rows())
+        self._dtype = pl.Enum(self._ids["ticker"])
+        self._ids_version = version
+
+    def _ids_table_version(self) -> int:
+        if not self.db.exists(self.ticker_id_table):
+            return 0
+        return self.db.version(self.ticker_id_table)
+
+
+# Shared by every dataset in the process
+asset_universe = AssetUniverse()
@@ -0,0 +1,176 @@
+from datetime import date, timedelta
+import logging
+import polars as pl
+from qdatabase import Database
+from qprofiler import span, trace, tracer
+
+# Bar intervals derived from daily bars, as group_by_dynamic periods
+INTERVALS = {"weekly": "1w", "monthly": "1mo", "quarterly": "1q"}
+
+logger = logging.getLogger(__name__)
+
+
+def resample(data: pl.DataFrame | pl.LazyFrame, interval: str) -> pl.DataFrame:
+    """
+    Weekly, monthly or quarterly bars of a (ticker, date, ...) daily panel, dated on
+    the first day of their period like Alpaca's own month bars. Whichever of open,
+    high, low, close, volume, trade_count, vwap (volume weighted), ret (compounded)
+    and logret (summed) the panel has are aggregated, other columns but ticker_id
+    are dropped. A period only depends on its own days, so periods can be rebuilt
+    one at a time.
+    """
+    columns = data.collect_schema().names()
+    keys = [key for key in ("ticker", "ticker_id") if key in columns]
+    volume = pl.col("volume").sum()
+    aggregations = {
+        "open": pl.col("open").first(),
+        "high": pl.col("high").max(),
+        "low": pl.col("low").min(),
+        "close": pl.col("close").last(),
+        "volume": volume,
+        "trade_count": pl.col("trade_count").sum(),
+        "vwap": pl.when(volume > 0).then(
+            (pl.col("vwap") * pl.col("volume")).sum() / volume
+        ),
+        # A ticker's first day has no return, so neither does a period of only that day
+        "ret": pl.when(pl.col("ret").count() > 0).then(
+            (1 + pl.col("ret")).product() - 1
+        ),
+        "logret": pl.when(pl.col("logret").count() > 0).then(pl.col("logret").sum()),
+    }
+
+    return (
+        data.lazy()
+        .sort(by=["ticker", "date"])
+        .group_by_dynamic("date", every=INTERVALS[interval], group_by=keys)
+        .agg(
+            [
+                expression.alias(column)
+                for column, expression in aggregations.items()
+                if column in columns
+            ]
+        )
+        .select([c for c in columns if c in (*keys, "date") or c in aggregations])
+        .collect()
+    )
+
+
+def period_bounds(first: date, last: date, interval: str) -> tuple[date, date]:
+    """First day of the period holding first and last day of the period holding last."""
+    every = INTERVALS[interval]
+    starts = pl.Series([first, last]).dt.truncate(every)
+    return starts[0], starts.dt.offset_by(every)[1] - timedelta(days=1)
+
+
+class Resampler:
+    """
+    Keeps the weekly, monthly and quarterly tables (ALPACA_STOCK_MONTHLY, ...) derived
+    from the daily core table instead of downloading them, so every interval is made
+    of the same daily bars.
+
+    The daily fragments a table was built from are recorded in `<table>_SOURCE`. As
+    every write to the daily table adds fragments under new paths, an update only
+    re-reads the periods overlapping new fragments and upserts their bars, and it
+    returns right away while the daily table's version is unchanged.
+    """
+
+    def __init__(self, prefix: str = "ALPACA_STOCK", db: Database | None = None):
+        self.prefix = prefix
+        self.source_table_name = f"{prefix}_DAILY"
+        self._db = db
+        self._versions: dict[str, int] = {}
+
+    @property
+    def db(self) -> Database:
+        if self._db is None:
+            self._db = Database()
+        return self._db
+
+    def table_name(self, interval: str) -> str:
+        return f"{self.prefix}_{interval.upper()}"
+
+    @trace("resampler.update")
+    def update(self, interval: str) -> None:
+        """Bring the interval's table up to date with the daily table."""
+        version = self.db.version(self.source_table_name)
+        if self._versions.get(interval) == version:
+            return
+
+        table_name = self.table_name(interval)
+        source_table_name = f"{table_name}_SOURCE"
+        fragments = self.db.fragments(self.source_table_name)
+        schema = self.db.scan(self.source_table_name).collect_schema()
+
+        if (
+            self.db.exists(table_name)
+            and self.db.exists(source_table_name)
+            and self.db.scan(table_name).collect_schema() == schema
+        ):
+            seen = set(self.db.read(source_table_name)["path"])
+            new = [fragment for fragment in fragments if fragment["path"] not in seen]
+        else:
+            # Built from scratch, replacing any bars that were downloaded directly or
+            # resampled before the daily table's columns changed
+            self.db.create(
+                table_name,
+                pl.DataFrame(schema=schema),
+                overwrite=True,
+                partition_on="date",
+            )
+            new = fragments
+
+        ranges = self._ranges(new, interval)
+        for start_date, end_date in ranges:
+            with span(
+                "resampler.resample",
+                interval=interval,
+                start_date=start_date,
+                end_date=end_date,
+            ):
+                daily = self.db.scan(
+                    self.source_table_name, start_date=start_date, end_date=end_date
+                )
+                bars = resample(daily, interval)
+                tracer.current().add(rows=len(bars))
+                self.db.upsert(table_name, bars, on=["ticker", "date"])
+
+        if ranges:
+            logger.info("Resampled %d new daily fragments to %s", len(new), table_name)
+
+        self.db.create(
+            source_table_name,
+            pl.DataFrame(
+                {"path": [fragment["path"] for fragment in fragments]},
+                schema={"path": pl.Utf8},
+            ),
+            overwrite=True,
+        )
+
+        # Strategies read the derived tables as often as the daily one
+        self.db.make_hot(table_name)
+        self._versions[interval] = version
+
+    @staticmethod
+    def _ranges(fragments: list[dict], interval: str) -> list[tuple[date, date]]:
+        """Merged date ranges of the whole periods the fragments overlap."""
+        bounds = sorted(
+            period_bounds(
+                date.fromisoformat(fragment["stats"]["date"][0]),
+                date.fromisoformat(fragment["stats"]["date"][1]),
+                interval,
+            )
+            for fragment in fragments
+            if fragment["rows"]
+        )
+
+        ranges: list[tuple[date, date]] = []
+        for start, end in bounds:
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+            else:
+                ranges.append((start, end))
+        return ranges
+
+
+# Shared by every dataset in the process
+resampler = Resampler()
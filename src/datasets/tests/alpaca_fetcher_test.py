@@ -0,0 +1,107 @@
+from benchmarks.fake_alpaca import FakeStockHistoricalDataClient
+from src.datasets.alpaca_fetcher import AlpacaBarFetcher, TokenBucket
+from alpaca.common.exceptions import APIError
+from qdatabase import Database
+from types import SimpleNamespace
+import pytest
+from datetime import date
+
+tickers = [f"T{i:02d}" for i in range(30)]
+start_date, end_date = date(2024, 1, 1), date(2024, 12, 31)
+db = Database()
+
+
+def api_error(status_code: int) -> APIError:
+    response = SimpleNamespace(status_code=status_code)
+    return APIError("{}", http_error=SimpleNamespace(response=response))
+
+
+class FlakyClient(FakeStockHistoricalDataClient):
+    """Raises the given errors, one per call, before answering like the fake."""
+
+    def __init__(self, errors: list[Exception], fail_tickers: set[str] = set()):
+        super().__init__(latency=0.0)
+        self.errors = errors
+        self.fail_tickers = fail_tickers
+
+    def get_stock_bars(self, request):
+        if self.fail_tickers & set(request.symbol_or_symbols):
+            self.calls += 1
+            raise ConnectionError("batch keeps failing")
+        if self.errors:
+            self.calls += 1
+            raise self.errors.pop(0)
+        return super().get_stock_bars(request)
+
+
+def fetcher(client, **kwargs) -> AlpacaBarFetcher:
+    # Three ticker batches of the whole year, without waiting on limits or backoff
+    defaults = {"batch_size": 10, "batch_days": 366, "max_workers": 1, "backoff": 0.0}
+    return AlpacaBarFetcher(
+        client, db, requests_per_minute=60_000, **(defaults | kwargs)
+    )
+
+
+@pytest.fixture
+def cleanup():
+    yield
+    # Checkpoint names depend on the batching, so every layout used is cleared
+    for kwargs, start in [
+        ({}, start_date),
+        ({"batch_size": 30}, start_date),
+        ({"batch_size": 30, "batch_days": 3653}, date(2015, 1, 1)),
+    ]:
+        fetcher(None, **kwargs).clear("test_fetch", tickers, start, end_date)
+
+
+def test_retries_transient_errors(cleanup):
+    client = FlakyClient([api_error(429), api_error(503), ConnectionError()])
+    bars = fetcher(client).fetch("test_fetch", tickers, start_date, end_date)
+
+    assert len(bars) == len(tickers) * 262
+    assert client.calls == 3 + 3
+
+
+@pytest.mark.parametrize("error", [api_error(403), api_error(422), ValueError()])
+def test_no_retry_on_other_errors(cleanup, error):
+    client = FlakyClient([error])
+    with pytest.raises(RuntimeError, match="1 of 3 batches failed"):
+        fetcher(client).fetch("test_fetch", tickers, start_date, end_date)
+    assert client.calls == 3
+
+
+def test_resume_from_checkpoints(cleanup):
+    client = FlakyClient([], fail_tickers={"T15"})
+    with pytest.raises(RuntimeError, match="1 of 3 batches failed"):
+        fetcher(client, max_retries=1).fetch(
+            "test_fetch", tickers, start_date, end_date
+        )
+    assert client.calls == 2 + 2
+
+    # Only the failed batch is fetched again
+    client = FakeStockHistoricalDataClient(latency=0.0)
+    bars = fetcher(client).fetch("test_fetch", tickers, start_date, end_date)
+    assert client.calls == 1
+    assert bars["ticker"].n_unique() == len(tickers)
+    assert not bars.select(["ticker", "date"]).is_duplicated().any()
+
+
+def test_charges_every_page(cleanup):
+    charged = []
+
+    class CountingBucket(TokenBucket):
+        def acquire(self, tokens: int = 1) -> None:
+            charged.append(tokens)
+
+    # 30 tickers of 262 weekdays are 7860 bars: one page of 10000, not 8 of 1000
+    client = FakeStockHistoricalDataClient(latency=0.0)
+    limited = fetcher(client, batch_size=30)
+    limited._limiter = CountingBucket(rate=1, capacity=1)
+    limited.fetch("test_fetch", tickers, start_date, end_date)
+    assert charged == [1] and client.pages == 1
+
+    # A batch spanning several pages is charged all of them
+    charged.clear()
+    limited.batch_days = 3653
+    limited.fetch("test_fetch", tickers, date(2015, 1, 1), end_date)
+    assert charged == [8] and client.pages == 1 + 8
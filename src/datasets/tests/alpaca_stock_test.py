@@ -0,0 +1,127 @@
+from src.datasets import AlpacaStock, alpaca_stock
+from src.datasets.alpaca_fetcher import BAR_SCHEMA
+from src.datasets.alpaca_stock import CORE_SCHEMA
+from src.datasets.asset_universe import AssetUniverse
+from qdatabase import Database
+from polars.testing import assert_frame_equal
+import polars as pl
+import pytest
+from datetime import date, timedelta
+
+today = date.today()
+yesterday = today - timedelta(days=1)
+
+
+def bars(rows: list[tuple[str, date]]) -> pl.DataFrame:
+    return pl.DataFrame(
+        rows, schema={"ticker": pl.Utf8, "date": pl.Date}, orient="row"
+    ).select(
+        [
+            pl.col(c) if c in ("ticker", "date") else pl.lit(1.0).alias(c)
+            for c in BAR_SCHEMA
+        ]
+    )
+
+
+def test_today_not_covered_without_bar():
+    covered = AlpacaStock._covered(
+        bars([("A", today), ("B", yesterday)]),
+        ["A", "B", "C"],
+        today - timedelta(days=10),
+        today,
+    )
+    assert covered == {today: ["A"], yesterday: ["B", "C"]}
+
+
+def test_past_range_fully_covered():
+    end_date = today - timedelta(days=30)
+    covered = AlpacaStock._covered(
+        bars([]), ["A"], end_date - timedelta(days=5), end_date
+    )
+    assert covered == {end_date: ["A"]}
+
+
+def test_range_of_only_today():
+    covered = AlpacaStock._covered(bars([("A", today)]), ["A", "B"], today, today)
+    assert covered == {today: ["A"]}
+
+
+def closes(rows: list[tuple[str, date, float]]) -> pl.DataFrame:
+    return pl.DataFrame(
+        rows,
+        schema={"ticker": pl.Utf8, "date": pl.Date, "close": pl.Float64},
+        orient="row",
+    ).select(
+        [
+            pl.col(c) if c in ("ticker", "date", "close") else pl.lit(1.0).alias(c)
+            for c in BAR_SCHEMA
+        ]
+    )
+
+
+@pytest.fixture
+def stock(monkeypatch):
+    """An AlpacaStock writing to test tables instead of the core table."""
+    db = Database()
+    tables = ["TEST_ALPACA_STOCK_DAILY", "test_merge_ticker_ids"]
+    monkeypatch.setattr(alpaca_stock, "DAILY_TABLE", tables[0])
+    monkeypatch.setattr(
+        alpaca_stock,
+        "asset_universe",
+        AssetUniverse(
+            db, snapshot_table="test_merge_snapshots", ticker_id_table=tables[1]
+        ),
+    )
+    db.create(
+        tables[0], pl.DataFrame(schema=CORE_SCHEMA), overwrite=True, partition_on="date"
+    )
+
+    stock = AlpacaStock.__new__(AlpacaStock)
+    stock.db = db
+    yield stock
+    for table in tables:
+        if db.exists(table):
+            db.delete(table)
+
+
+def test_merge_chains_returns_onto_distant_rows(stock):
+    stock._merge(
+        closes(
+            [
+                ("A", date(2024, 1, 2), 100.0),
+                ("A", date(2024, 5, 15), 120.0),
+                ("B", date(2024, 1, 2), 50.0),
+                ("B", date(2024, 1, 5), 55.0),
+            ]
+        ),
+        ["A", "B"],
+        date(2024, 1, 1),
+        date(2024, 5, 31),
+    )
+
+    # B's previous close is ten weeks back, and A's backfill changes the return of
+    # its next row two months later
+    stock._merge(
+        closes([("A", date(2024, 3, 1), 110.0), ("B", date(2024, 3, 15), 66.0)]),
+        ["A", "B"],
+        date(2024, 3, 1),
+        date(2024, 3, 15),
+    )
+
+    merged = stock.db.read("TEST_ALPACA_STOCK_DAILY").sort(by=["ticker", "date"])
+    assert merged.select(["ticker", "date"]).rows() == [
+        ("A", date(2024, 1, 2)),
+        ("A", date(2024, 3, 1)),
+        ("A", date(2024, 5, 15)),
+        ("B", date(2024, 1, 2)),
+        ("B", date(2024, 1, 5)),
+        ("B", date(2024, 3, 15)),
+    ]
+    assert merged["ret"].to_list() == pytest.approx(
+        [None, 0.1, 120 / 110 - 1, None, 0.1, 0.2]
+    )
+
+    # A full rebuild gives the same table
+    stock.rebuild_returns()
+    rebuilt = stock.db.read("TEST_ALPACA_STOCK_DAILY").sort(by=["ticker", "date"])
+    assert_frame_equal(rebuilt, merged)
@@ -0,0 +1,107 @@
+from src.datasets.alpaca_assets import SNAPSHOT_SCHEMA
+from src.datasets.asset_universe import AssetUniverse
+from qdatabase import Database
+import polars as pl
+import pytest
+from datetime import date
+
+db = Database()
+SNAPSHOTS = "test_asset_snapshots"
+IDS = "test_ticker_ids"
+
+
+def snapshots(rows: list[tuple[date, str, bool]]) -> pl.DataFrame:
+    """Snapshot rows that only differ in ticker and shortable."""
+    given = {"snapshot_date": pl.Date, "ticker": pl.Utf8, "shortable": pl.Boolean}
+    filler = {pl.Utf8: "NYSE", pl.Boolean: True, pl.Float64: 1.0}
+    return pl.DataFrame(rows, schema=given, orient="row").select(
+        [
+            pl.col(c) if c in given else pl.lit(filler[dtype], dtype).alias(c)
+            for c, dtype in SNAPSHOT_SCHEMA.items()
+        ]
+    )
+
+
+@pytest.fixture
+def universe():
+    db.create(
+        SNAPSHOTS,
+        snapshots(
+            [
+                (date(2024, 1, 2), "B", True),
+                (date(2024, 1, 2), "A", False),
+                (date(2024, 6, 3), "A", True),
+                (date(2024, 6, 3), "C", True),
+            ]
+        ),
+        overwrite=True,
+    )
+    yield AssetUniverse(db, snapshot_table=SNAPSHOTS, ticker_id_table=IDS)
+    for table in (SNAPSHOTS, IDS):
+        if db.exists(table):
+            db.delete(table)
+
+
+def test_point_in_time_membership(universe):
+    assert universe.tickers(as_of=date(2024, 3, 1)) == ["A", "B"]
+    assert universe.tickers(as_of=date(2024, 3, 1), shortable=True) == ["B"]
+    assert universe.tickers(as_of=date(2024, 6, 3)) == ["A", "C"]
+    assert universe.tickers() == ["A", "C"]
+
+    # Dates before the first snapshot use the first one
+    assert universe.tickers(as_of=date(2023, 1, 1)) == ["A", "B"]
+
+    assert universe.contains("B", as_of=date(2024, 3, 1))
+    assert not universe.contains("B", as_of=date(2024, 7, 1))
+    assert not universe.contains("A", as_of=date(2024, 3, 1), shortable=True)
+    assert not universe.contains("Z")
+
+
+def test_filter(universe):
+    panel = pl.DataFrame(
+        {
+            "date": [date(2024, 3, 1)] * 3 + [date(2024, 7, 1)] * 3,
+            "ticker": ["A", "B", "C"] * 2,
+            "ret": [0.1, 0.2, 0.3, 0.4, 0.5, 0.6],
+        }
+    )
+    expected = [
+        (date(2024, 3, 1), "B"),
+        (date(2024, 7, 1), "A"),
+        (date(2024, 7, 1), "C"),
+    ]
+
+    kept = universe.filter(panel, shortable=True)
+    assert kept.select(["date", "ticker"]).rows() == expected
+
+    # The same rows from Enum tickers, lazily
+    encoded = panel.with_columns(pl.col("ticker").cast(universe.ticker_dtype))
+    kept = universe.filter(encoded.lazy(), shortable=True).collect()
+    assert kept.schema["ticker"] == universe.ticker_dtype
+    assert (
+        kept.select(pl.col("date"), pl.col("ticker").cast(pl.Utf8)).rows() == expected
+    )
+
+
+def test_ids_are_stable(universe):
+    universe.refresh()
+    ids = dict(universe.encode(pl.DataFrame({"ticker": ["A", "B", "C"]})).rows())
+    dtype = universe.ticker_dtype
+
+    # New tickers are appended, the existing ones keep their ids
+    universe.register(["AA", "D", "B"])
+    assert (
+        dict(universe.encode(pl.DataFrame({"ticker": ["A", "B", "C"]})).rows()) == ids
+    )
+    assert universe.ticker_dtype.categories[: len(dtype.categories)].equals(
+        dtype.categories
+    )
+    assert len(universe.ticker_dtype.categories) == 5
+
+    # Another process reads the same ids
+    other = AssetUniverse(db, snapshot_table=SNAPSHOTS, ticker_id_table=IDS)
+    assert other.ticker_dtype == universe.ticker_dtype
+    decoded = other.decode(
+        pl.DataFrame({"ticker_id": list(ids.values())}, schema={"ticker_id": pl.UInt32})
+    )
+    assert decoded["ticker"].cast(pl.Utf8).to_list() == list(ids)
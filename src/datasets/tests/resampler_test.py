@@ -0,0 +1,96 @@
+from src.datasets.resampler import INTERVALS, Resampler, resample
+from qdatabase import Database
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+import pytest
+from datetime import date
+
+db = Database()
+PREFIX = "TEST_RESAMPLE"
+
+
+def daily(tickers: list[str], start_date: date, end_date: date, seed: int):
+    """Random daily bars of the tickers on every weekday between the dates."""
+    rng = np.random.default_rng(seed)
+    days = pl.date_range(start_date, end_date, eager=True)
+    days = days.filter(days.dt.weekday() <= 5)
+    n = len(tickers) * len(days)
+    close = rng.uniform(50, 150, n)
+    return pl.DataFrame(
+        {
+            "ticker": np.repeat(tickers, len(days)),
+            "date": pl.concat([days] * len(tickers)),
+            "open": close * rng.uniform(0.98, 1.02, n),
+            "high": close * 1.03,
+            "low": close * 0.97,
+            "close": close,
+            "volume": rng.integers(0, 1000, n).astype(np.float64),
+            "vwap": close,
+            "ret": rng.normal(0, 0.02, n),
+        }
+    )
+
+
+def full(resampler: Resampler, interval: str) -> pl.DataFrame:
+    return resample(db.read(resampler.source_table_name), interval)
+
+
+def table(resampler: Resampler, interval: str) -> pl.DataFrame:
+    return db.read(resampler.table_name(interval))
+
+
+@pytest.fixture
+def resampler():
+    resampler = Resampler(prefix=PREFIX, db=db)
+    yield resampler
+    for table_name in [
+        resampler.source_table_name,
+        *[resampler.table_name(interval) for interval in INTERVALS],
+        *[f"{resampler.table_name(interval)}_SOURCE" for interval in INTERVALS],
+    ]:
+        if db.exists(table_name):
+            db.delete(table_name)
+
+
+def test_incremental_updates_match_full_resample(resampler):
+    db.create(
+        resampler.source_table_name,
+        daily(["A", "B"], date(2024, 1, 1), date(2024, 5, 15), seed=0),
+        overwrite=True,
+        partition_on="date",
+    )
+    for interval in INTERVALS:
+        resampler.update(interval)
+
+    # New dates finishing the open week, month and quarter and starting new ones
+    db.insert(
+        resampler.source_table_name,
+        daily(["A", "B"], date(2024, 5, 16), date(2024, 7, 10), seed=1),
+    )
+    for interval in INTERVALS:
+        resampler.update(interval)
+        assert_frame_equal(
+            table(resampler, interval),
+            full(resampler, interval),
+            check_row_order=False,
+        )
+
+    # Corrected bars in the middle of closed periods, and a ticker joining late
+    db.upsert(
+        resampler.source_table_name,
+        pl.concat(
+            [
+                daily(["A"], date(2024, 3, 4), date(2024, 3, 8), seed=2),
+                daily(["C"], date(2024, 6, 24), date(2024, 7, 10), seed=3),
+            ]
+        ),
+        on=["ticker", "date"],
+    )
+    for interval in INTERVALS:
+        before = table(resampler, interval)
+        resampler.update(interval)
+        after = table(resampler, interval)
+
+        assert not after.equals(before)
+        assert_frame_equal(after, full(resampler, interval), check_row_order=False)
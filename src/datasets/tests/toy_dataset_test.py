@@ -0,0 +1,44 @@
+from src.datasets import ToyDataset
+import polars as pl
+import pytest
+from datetime import date, datetime
+
+
+@pytest.fixture
+def raw(tmp_path, monkeypatch):
+    """A raw download as yfinance stacks it, in a scratch .data/ directory."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".data").mkdir()
+    days = [date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1)]
+    days += [date(2024, 2, 29), date(2024, 3, 1)]
+    pl.DataFrame(
+        {
+            "Date": [datetime.combine(day, datetime.min.time()) for day in days],
+            "Ticker": ["KO"] * len(days),
+            "Close": [100.0, 110.0, 99.0, 121.0, 121.0],
+            "High": [101.0, 111.0, 100.0, 122.0, 122.0],
+            "Low": [99.0, 109.0, 98.0, 120.0, 120.0],
+            "Open": [100.0, 105.0, 104.0, 110.0, 121.0],
+            "Volume": [10.0, 20.0, 30.0, 40.0, 50.0],
+        }
+    ).write_parquet(tmp_path / ".data" / "raw_toy_dataset.parquet")
+
+
+def test_monthly(raw):
+    daily = ToyDataset().load()
+    assert len(daily) == 4
+
+    # Dated on the first of the month, with the month's daily returns compounded:
+    # January 110 / 100, February 0.9 * 121 / 99 and March flat
+    monthly = ToyDataset("monthly").load()
+    assert monthly["date"].dt.date().to_list() == [
+        date(2024, 1, 1),
+        date(2024, 2, 1),
+        date(2024, 3, 1),
+    ]
+    assert monthly["ret"].to_list() == pytest.approx([0.1, 0.1, 0.0])
+    assert monthly.select(["open", "high", "low", "close", "volume"]).rows() == [
+        (100.0, 111.0, 99.0, 110.0, 30.0),
+        (104.0, 122.0, 98.0, 121.0, 70.0),
+        (121.0, 122.0, 120.0, 121.0, 50.0),
+    ]
@@ -1,6 +1,7 @@
 import yfinance as yf
 import polars as pl
 import os
+from src.datasets.resampler import resample
 
 
 class ToyDataset:
@@ -9,7 +10,9 @@ class ToyDataset:
         self.interval = interval
         self.data_dir = ".data/"
         self.raw_file_path = self.data_dir + "raw_toy_dataset.parquet"
-        self.clean_file_path = self.data_dir + "clean_toy_dataset.parquet"
+        # Every interval is cleaned from the same raw daily download
+        suffix = "" if interval == "daily" else f"_{interval}"
+        self.clean_file_path = self.data_dir + f"clean_toy_dataset{suffix}.parquet"
 
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
@@ -38,17 +41,13 @@ class ToyDataset:
 
         df = df.sort(by=["ticker", "date"])
 
-        if self.interval == "monthly":
-            df = (
-                df.with_columns(pl.col("date").dt.strftime("%Y-%m").alias("mdt"))
-                .group_by(["mdt", "ticker"])
-                .agg(date=pl.col("date").last(), close=pl.col("close").last())
-                .sort(["ticker", "date"])
-            ).select(["date", "ticker", "close"])
-
-        df = df.with_columns(
-            [pl.col("close").pct_change().over("ticker").alias("ret")]
-        ).drop_nulls()
+        df = df.with_columns([pl.col("close").pct_change().over("ticker").alias("ret")])
+
+        # Longer intervals compound the daily returns of each period
+        if self.interval != "daily":
+            df = resample(df, self.interval)
+
+        df = df.drop_nulls()
 
         df.write_parquet(self.clean_file_path)
 
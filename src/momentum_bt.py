@@ -1,11 +1,12 @@
-from strategies import momentum_strategy
+from strategies import momentum_strategy, momentum_stream
 from backtester import Backtester
 from functools import partial
 from datetime import date
 
 print("\n" + "-" * 50 + " Last Period Portfolio " + "-" * 50)
 
-portfolios = momentum_strategy(interval="monthly")
+# Streaming from a recent date only reads the window behind it, not the history
+portfolios = list(momentum_stream(interval="monthly", start_date=date(2024, 12, 1)))
 print(portfolios[-1])
 
 print("\n" + "-" * 50 + " Backtest P&L " + "-" * 50)
@@ -16,4 +17,7 @@ bt = Backtester(
     interval="monthly",
     strategy=partial(momentum_strategy, interval="monthly"),
 )
-bt.run()
+result = bt.run()
+print(result.pnl)
+print(result)
+result.plot()
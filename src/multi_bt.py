@@ -0,0 +1,16 @@
+from backtester import MultiStrategy
+from datetime import date
+
+print("\n" + "-" * 50 + " Strategies and Blends " + "-" * 50)
+
+# Momentum, reversal and their blend from one load of the panel
+multi = MultiStrategy(
+    start_date=date(2020, 1, 1),
+    end_date=date(2024, 12, 31),
+    interval="monthly",
+)
+results = multi.run()
+print(results.drop("pnl"))
+
+print("\n" + "-" * 50 + " Backtest P&L " + "-" * 50)
+print(results.select("strategy", "pnl").explode("pnl").unnest("pnl"))
@@ -1,3 +1,25 @@
-from .decile_portfolio import decile_portfolio
+from .decile_portfolio import (
+    decile_portfolio,
+    decile_portfolios,
+    decile_breakpoints,
+    assign_bins,
+    bin_disagreement,
+)
+from .quantile_sketch import (
+    QuantileSketch,
+    sketch_by_date,
+    merge_sketches,
+    sketch_breakpoints,
+)
 
-__all__ = ["decile_portfolio"]
+__all__ = [
+    "decile_portfolio",
+    "decile_portfolios",
+    "decile_breakpoints",
+    "assign_bins",
+    "bin_disagreement",
+    "QuantileSketch",
+    "sketch_by_date",
+    "merge_sketches",
+    "sketch_breakpoints",
+]
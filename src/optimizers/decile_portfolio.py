@@ -1,13 +1,15 @@
 import numpy as np
 import polars as pl
+from qprofiler import trace
 
 
+@trace("portfolio.decile")
 def decile_portfolio(chunk: pl.DataFrame, signal: str, weighting: str = "equal"):
     chunk = chunk.drop_nulls()
 
-    # Calculate decile percentiles
+    # Calculate decile percentiles from a single sort
     percentiles = np.linspace(0.1, 1, 10)
-    values = [chunk[signal].quantile(percentile) for percentile in percentiles]
+    values = np.sort(chunk[signal].to_numpy())[nearest_ranks(len(chunk), percentiles)]
 
     # Dynamically build the conditions for decile bins
     bins_expr = pl.when(pl.col(signal) <= values[0]).then(0)
@@ -26,10 +28,123 @@ def decile_portfolio(chunk: pl.DataFrame, signal: str, weighting: str = "equal")
     ]
 
     # Weights
-    if weighting == "equal":
-        portfolios = [
-            portfolio.with_columns(pl.lit(1 / len(portfolio)).alias("weight"))
-            for portfolio in portfolios
-        ]
+    if weighting != "equal":
+        raise ValueError(f"unknown weighting {weighting!r}")
+    portfolios = [
+        portfolio.with_columns(pl.lit(1 / len(portfolio)).alias("weight"))
+        for portfolio in portfolios
+    ]
 
     return portfolios
+
+
+@trace("portfolio.deciles")
+def decile_portfolios(
+    data: pl.DataFrame,
+    signal: str,
+    weighting: str = "equal",
+    value: str = "value",
+    breakpoints: pl.DataFrame | None = None,
+) -> pl.DataFrame:
+    """
+    Batched version of decile_portfolio that bins every date of a panel in one query.
+    Returns a single long frame of (date, ticker, bin, weight) sorted by date and bin,
+    with the same bins and weights decile_portfolio gives each cross-section.
+    Value weighting scales by the `value` column within each decile.
+
+    breakpoints (date, _q0 .. _q8) replaces the exact ones, e.g. with
+    sketch_breakpoints from merged sketches of a universe too large for one frame.
+    """
+    data = data.drop_nulls()
+
+    # Decile breakpoints for every date
+    if breakpoints is None:
+        breakpoints = decile_breakpoints(data, signal)
+    binned = assign_bins(data, signal, breakpoints)
+
+    # Weights
+    match weighting:
+        case "equal":
+            weight = 1 / pl.len().over("date", "bin")
+        case "value":
+            weight = pl.col(value) / pl.col(value).sum().over("date", "bin")
+        case _:
+            raise ValueError(f"unknown weighting {weighting!r}")
+
+    return (
+        binned.with_columns(weight.alias("weight"))
+        .select(["date", "ticker", "bin", "weight"])
+        .sort(by=["date", "bin"], maintain_order=True)
+    )
+
+
+DECILE_PERCENTILES = np.linspace(0.1, 1, 10)[:-1]
+
+
+def nearest_ranks(n: int, percentiles) -> np.ndarray:
+    """Sorted positions Series.quantile picks with its default nearest interpolation."""
+    return np.floor((n - 1) * np.asarray(percentiles) + 0.5).astype(np.int64)
+
+
+def decile_breakpoints(data: pl.DataFrame, signal: str) -> pl.DataFrame:
+    """
+    Exact decile breakpoints (date, _q0 .. _q8) of every date. Each cross-section
+    is sorted once and all nine breakpoints are read off the sorted values, giving
+    the same values as nine Series.quantile calls.
+    """
+    values = pl.col("_sorted")
+    n = values.list.len()
+    return (
+        data.drop_nulls(subset=signal)
+        .group_by("date")
+        .agg(pl.col(signal).sort().alias("_sorted"))
+        .select(
+            "date",
+            *[
+                values.list.get(
+                    ((n - 1) * percentile + 0.5).floor().cast(pl.Int64)
+                ).alias(f"_q{i}")
+                for i, percentile in enumerate(DECILE_PERCENTILES)
+            ],
+        )
+    )
+
+
+def assign_bins(
+    data: pl.DataFrame, signal: str, breakpoints: pl.DataFrame
+) -> pl.DataFrame:
+    """Adds the bin of every row: the number of its date's breakpoints it lies above."""
+    breakpoint_cols = [col for col in breakpoints.columns if col != "date"]
+    return (
+        data.join(breakpoints, on="date", how="left")
+        .with_columns(
+            pl.sum_horizontal([pl.col(signal) > pl.col(col) for col in breakpoint_cols])
+            .cast(pl.Int32)
+            .alias("bin")
+        )
+        .drop(breakpoint_cols)
+    )
+
+
+def bin_disagreement(
+    data: pl.DataFrame,
+    signal: str,
+    breakpoints: pl.DataFrame,
+    exact: pl.DataFrame | None = None,
+) -> dict:
+    """
+    How far the bins from approximate breakpoints are from the exact bins: the share
+    of rows binned differently and the mean and max distance in bins.
+    """
+    data = data.drop_nulls(subset=signal)
+    if exact is None:
+        exact = decile_breakpoints(data, signal)
+
+    approximate = assign_bins(data, signal, breakpoints)["bin"]
+    distance = (approximate - assign_bins(data, signal, exact)["bin"]).abs()
+    return {
+        "rows": len(data),
+        "mismatch_rate": (distance > 0).mean(),
+        "mean_bin_distance": distance.mean(),
+        "max_bin_distance": distance.max(),
+    }
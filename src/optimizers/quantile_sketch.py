@@ -0,0 +1,138 @@
+from copy import deepcopy
+from datetime import date
+from typing import Self
+import numpy as np
+import polars as pl
+from .decile_portfolio import DECILE_PERCENTILES
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantile sketch (KLL). Values are kept in levels of
+    compactors: a level that outgrows its capacity is sorted and every other value
+    is promoted to the next level with twice the weight, so memory stays around
+    3 * k values however many are added. Sketches of separate partitions or workers
+    merge into the sketch of all their values. Rank error stays within about 2 / k.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self._levels: list[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values) -> Self:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> Self:
+        for level, items in enumerate(other._levels):
+            if level == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[level] = np.concatenate([self._levels[level], items])
+
+        self.n += other.n
+        self._compress()
+        return self
+
+    def copy(self) -> Self:
+        """An independent sketch of the same values, to merge into."""
+        return deepcopy(self)
+
+    def quantiles(self, percentiles) -> list[float]:
+        """Values at the given percentiles, with the nearest-rank rule Series.quantile uses."""
+        if self.n == 0:
+            return [None] * len(percentiles)
+
+        items = np.concatenate(self._levels)
+        weights = np.concatenate(
+            [
+                np.full(len(values), 2**level)
+                for level, values in enumerate(self._levels)
+            ]
+        )
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+
+        # Item covering the target rank, scaled to the weight the sketch holds
+        total = cumulative[-1]
+        ranks = np.floor((total - 1) * np.asarray(percentiles) + 0.5)
+        positions = np.searchsorted(cumulative, ranks, side="right")
+        return items[order][np.minimum(positions, len(items) - 1)].tolist()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self._levels)):
+                if len(self._levels[level]) <= self._capacity(level):
+                    continue
+
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+
+                # Keep one value back if odd, promote a random half of the rest
+                items = np.sort(self._levels[level])
+                odd = len(items) % 2
+                promoted = items[odd:][self._rng.integers(2) :: 2]
+                self._levels[level] = items[:odd]
+                self._levels[level + 1] = np.concatenate(
+                    [self._levels[level + 1], promoted]
+                )
+                compacted = True
+
+    def __len__(self) -> int:
+        return self.n
+
+
+def sketch_by_date(
+    data: pl.DataFrame, signal: str, k: int = 200
+) -> dict[date, QuantileSketch]:
+    """One sketch of the signal per date. Merge the dicts of separate partitions with merge_sketches."""
+    return {
+        cross_section["date"][0]: QuantileSketch(k).update(
+            cross_section[signal].drop_nulls().to_numpy()
+        )
+        for cross_section in data.partition_by("date")
+    }
+
+
+def merge_sketches(
+    *partitions: dict[date, QuantileSketch]
+) -> dict[date, QuantileSketch]:
+    """
+    Merge per-date sketches of separate partitions into copies, leaving the
+    partitions' sketches as they were.
+    """
+    merged = {}
+    for sketches in partitions:
+        for sketch_date, sketch in sketches.items():
+            if sketch_date in merged:
+                merged[sketch_date].merge(sketch)
+            else:
+                merged[sketch_date] = sketch.copy()
+    return merged
+
+
+def sketch_breakpoints(
+    sketches: dict[date, QuantileSketch], percentiles=DECILE_PERCENTILES
+) -> pl.DataFrame:
+    """Breakpoints (date, _q0, ...) at the given percentiles from the sketch of every date."""
+    return pl.DataFrame(
+        [
+            {"date": sketch_date}
+            | {f"_q{i}": value for i, value in enumerate(sketch.quantiles(percentiles))}
+            for sketch_date, sketch in sorted(sketches.items())
+        ],
+        schema={"date": pl.Date}
+        | {f"_q{i}": pl.Float64 for i in range(len(percentiles))},
+    )
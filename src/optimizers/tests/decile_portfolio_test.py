@@ -0,0 +1,37 @@
+from src.optimizers import decile_portfolio, decile_portfolios
+import polars as pl
+import pytest
+from datetime import date
+
+data = pl.DataFrame(
+    {
+        "date": [date(2024, 1, 2)] * 20,
+        "ticker": [f"T{i:02d}" for i in range(20)],
+        "mom": [float(i) for i in range(20)],
+        "value": [float(i + 1) for i in range(20)],
+    }
+)
+
+
+def test_weighting():
+    for weighting in ("equal", "value"):
+        portfolios = decile_portfolios(data, "mom", weighting=weighting)
+        sums = portfolios.group_by("bin").agg(pl.col("weight").sum())["weight"]
+        assert sums.to_list() == pytest.approx([1.0] * len(sums))
+
+    # Value weights are each row's share of its bin's value
+    value = decile_portfolios(data, "mom", weighting="value").join(
+        data, on=["date", "ticker"]
+    )
+    share = value["value"] / value.select(pl.col("value").sum().over("bin"))["value"]
+    assert value["weight"].to_list() == pytest.approx(share.to_list())
+
+    for portfolio in decile_portfolio(data, "mom"):
+        assert portfolio["weight"].to_list() == [1 / len(portfolio)] * len(portfolio)
+
+
+def test_unknown_weighting():
+    with pytest.raises(ValueError, match="unknown weighting 'cap'"):
+        decile_portfolios(data, "mom", weighting="cap")
+    with pytest.raises(ValueError, match="unknown weighting 'cap'"):
+        decile_portfolio(data, "mom", weighting="cap")
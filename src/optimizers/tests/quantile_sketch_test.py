@@ -0,0 +1,92 @@
+from src.optimizers import (
+    QuantileSketch,
+    bin_disagreement,
+    decile_breakpoints,
+    merge_sketches,
+    sketch_breakpoints,
+    sketch_by_date,
+)
+from src.optimizers.decile_portfolio import DECILE_PERCENTILES, nearest_ranks
+import numpy as np
+import polars as pl
+import pytest
+from datetime import date
+
+K = 200
+rng = np.random.default_rng(0)
+values = rng.standard_t(3, 50_000)
+
+
+def rank_error(sketch: QuantileSketch, values: np.ndarray) -> float:
+    """Largest distance between the ranks of the sketch's deciles and the exact ones."""
+    found = np.searchsorted(np.sort(values), sketch.quantiles(DECILE_PERCENTILES))
+    exact = nearest_ranks(len(values), DECILE_PERCENTILES)
+    return np.abs(found - exact).max() / len(values)
+
+
+def test_rank_error():
+    assert rank_error(QuantileSketch(K).update(values), values) <= 2 / K
+
+    partitions = [
+        QuantileSketch(K, seed=i).update(part)
+        for i, part in enumerate(np.array_split(values, 8))
+    ]
+    merged = partitions[0].copy()
+    for sketch in partitions[1:]:
+        merged.merge(sketch)
+    assert len(merged) == len(values)
+    assert rank_error(merged, values) <= 2 / K
+
+
+def test_merge_keeps_partitions():
+    day = date(2024, 1, 2)
+    first = {day: QuantileSketch(K).update(values[:1000])}
+    second = {day: QuantileSketch(K).update(values[1000:])}
+    before = first[day].quantiles(DECILE_PERCENTILES)
+
+    merged = merge_sketches(first, second)
+    assert len(merged[day]) == len(values)
+    assert len(first[day]) == 1000
+    assert first[day].quantiles(DECILE_PERCENTILES) == before
+
+    # Merging again gives the same sketch, not one counting the first merge twice
+    assert len(merge_sketches(first, second)[day]) == len(values)
+
+
+def test_bin_disagreement():
+    # Exact breakpoints of 1..10 are 2, 3, 4, 5, 6, 6, 7, 8, 9
+    data = pl.DataFrame(
+        {
+            "date": [date(2024, 1, 2)] * 10,
+            "ticker": [f"T{i}" for i in range(10)],
+            "signal": [float(i) for i in range(1, 11)],
+        }
+    )
+    exact = decile_breakpoints(data, "signal")
+    assert bin_disagreement(data, "signal", exact)["mismatch_rate"] == 0
+
+    # Every breakpoint one higher moves all but 1 and 2 a bin down, 7 by two
+    shifted = exact.with_columns(pl.exclude("date") + 1)
+    assert bin_disagreement(data, "signal", shifted) == {
+        "rows": 10,
+        "mismatch_rate": pytest.approx(0.8),
+        "mean_bin_distance": pytest.approx(0.9),
+        "max_bin_distance": 2,
+    }
+
+
+def test_sketch_breakpoints_bins():
+    data = pl.DataFrame(
+        {
+            "date": [date(2024, 1, 2)] * 5000 + [date(2024, 1, 3)] * 5000,
+            "signal": rng.standard_normal(10_000),
+        }
+    )
+    halves = [data.gather_every(2), data.gather_every(2, offset=1)]
+    sketches = merge_sketches(*[sketch_by_date(half, "signal", K) for half in halves])
+    disagreement = bin_disagreement(data, "signal", sketch_breakpoints(sketches))
+
+    # Each of the 9 breakpoints is off by at most 2 / k of the ranks, so only rows
+    # that close to a breakpoint move, and by one bin
+    assert disagreement["max_bin_distance"] <= 1
+    assert disagreement["mismatch_rate"] <= 9 * 2 / K
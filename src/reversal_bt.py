@@ -1,11 +1,12 @@
-from strategies import reversal_strategy
+from strategies import reversal_strategy, reversal_stream
 from backtester import Backtester
 from functools import partial
 from datetime import date
 
 print("\n" + "-" * 50 + " Last Period Portfolio " + "-" * 50)
 
-portfolios = reversal_strategy(interval="daily")
+# Streaming from a recent date only reads the window behind it, not the history
+portfolios = list(reversal_stream(interval="daily", start_date=date(2024, 12, 31)))
 print(portfolios[-1])
 
 
@@ -17,4 +18,7 @@ bt = Backtester(
     interval="daily",
     strategy=partial(reversal_strategy, interval="daily"),
 )
-bt.run()
+result = bt.run()
+print(result.pnl)
+print(result)
+result.plot()
@@ -1,4 +1,5 @@
 from .momentum import momentum_signal
 from .reversal import reversal_signal
+from .signal_state import RollingSignalState
 
 __all__ = ["momentum_signal"]
@@ -1,22 +1,35 @@
 import polars as pl
+from qprofiler import trace
 
 
-def reversal_signal(chunk: pl.DataFrame, interval: str = "daily"):
+@trace("signal.reversal")
+def reversal_signal(
+    chunk: pl.DataFrame, interval: str = "daily", window: int | None = None
+):
+    # Index dates before dropping nulls so gaps in a ticker's history stay visible
+    chunk = chunk.with_columns(pl.col("date").rank("dense").alias("date_idx"))
     chunk = chunk.drop_nulls()
 
     # Set window size
-    match interval:
-        case "daily":
-            window = 22
-        case "monthly":
-            window = 1
+    if window is None:
+        match interval:
+            case "daily":
+                window = 22
+            case "monthly":
+                window = 1
+
+    # Only sum over consecutive dates, so a whole panel gives the same values as chunks
+    contiguous = pl.col("date_idx") - pl.col("date_idx").shift(window) == window
 
     # Signal transformation
     signal = chunk.with_columns(pl.col("ret").log1p().alias("logret")).with_columns(
-        pl.col("logret")
-        .rolling_sum(window_size=window, min_periods=window, center=False)
-        .shift(1)  # Lag signal
-        .over("ticker")
+        pl.when(contiguous.over("ticker"))
+        .then(
+            pl.col("logret")
+            .rolling_sum(window_size=window, min_periods=window, center=False)
+            .shift(1)  # Lag signal
+            .over("ticker")
+        )
         .alias("rev")
     )
-    return signal
+    return signal.drop("date_idx")
@@ -0,0 +1,171 @@
+from datetime import date
+import numpy as np
+import polars as pl
+from qcomponents import decode_keys
+from qdatabase import Database
+from qprofiler import trace
+
+
+class RollingSignalState:
+    """
+    Per-ticker rolling state of the log-return sum signals, for live/paper trading.
+    Every ticker keeps a ring buffer of its latest log returns, a running sum for
+    every window in `windows` (e.g. {"mom": 230, "rev": 22}) and how many
+    consecutive dates it has traded. The buffer is a (tickers, lookback) array whose
+    slot for a date is its index modulo lookback, so rolling forward one date reads
+    and writes one slot per ticker: O(tickers), not a recompute of the history.
+
+    The state is persisted as the table `table_name`, and the signals of its latest
+    date as `<table_name>_SIGNALS`. It gives the same values as momentum_signal and
+    reversal_signal, i.e. the sum of the `window` log returns before the date, for
+    tickers that traded on all of those dates.
+    """
+
+    def __init__(self, db: Database, table_name: str, windows: dict[str, int]):
+        self.db = db
+        self.table_name = table_name
+        self.signals_table_name = f"{table_name}_SIGNALS"
+        self.windows = windows
+        self.lookback = max(windows.values())
+
+        state = pl.DataFrame(schema=self._schema())
+        if self.db.exists(self.table_name) and self.db.exists(self.signals_table_name):
+            persisted = self.db.read(self.table_name)
+            # A state of another layout is rebuilt by replaying the lookback
+            if persisted.schema == state.schema:
+                state = persisted
+        self._load(state)
+
+    @property
+    def as_of(self) -> date | None:
+        """Last date rolled into the state."""
+        return self._as_of
+
+    @trace("signal_state.advance")
+    def advance(self, data: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+        """
+        Roll the state through every date of data (date, ticker, ret) after as_of and
+        return the signals (date, ticker, *windows) of the newest one. A new state
+        only replays the last `lookback` dates before it. Without any date after
+        as_of, e.g. when the end of day job runs twice, the state is left as it is
+        and the signals of as_of are returned again.
+        """
+        # The persisted state keeps string tickers
+        data = decode_keys(data.lazy().select(["date", "ticker", "ret"]))
+        if self.as_of is not None:
+            data = data.filter(pl.col("date") > self.as_of)
+
+        dates = data.select(pl.col("date").unique()).collect()["date"].sort()
+        if dates.is_empty():
+            if self.as_of is None:
+                raise ValueError("No dates to start the signal state from")
+            return self.db.read(self.signals_table_name)
+        if self.as_of is None:
+            dates = dates.tail(self.lookback + 1)
+
+        bars = data.filter(pl.col("date") >= dates.min()).collect()
+        for bars_date in bars.sort(by="date").partition_by("date", maintain_order=True):
+            signals = self._step(bars_date)
+
+        self.db.create(self.table_name, self._frame(), overwrite=True)
+        self.db.create(self.signals_table_name, signals, overwrite=True)
+
+        return signals
+
+    def _step(self, bars: pl.DataFrame) -> pl.DataFrame:
+        step_date = bars["date"][0]
+        step_idx = self._as_of_idx + 1
+
+        today = bars.select("ticker", pl.col("ret").log1p().alias("logret"))
+        today = today.drop_nulls()
+        rows = self._rows(today["ticker"])
+        logret = today["logret"].to_numpy()
+
+        # A ticker continues its run if it also traded on the previous date
+        previous = self._last_idx[rows] == step_idx - 1
+        streak = np.where(previous, self._streak[rows], 0)
+
+        # Signals use the state before today's return is added
+        signals = pl.DataFrame(
+            {
+                "date": pl.Series([step_date] * len(rows), dtype=pl.Date),
+                "ticker": today["ticker"],
+                **{
+                    name: np.where(streak >= window, self._sums[name][rows], np.nan)
+                    for name, window in self.windows.items()
+                },
+            }
+        ).with_columns(pl.col(list(self.windows)).fill_nan(None))
+
+        # Running sums drop the return leaving the window as today's enters it
+        for name, window in self.windows.items():
+            leaving = np.where(
+                streak >= window,
+                self._logrets[rows, (step_idx - window) % self.lookback],
+                0.0,
+            )
+            self._sums[name][rows] = np.where(
+                previous, self._sums[name][rows] + logret - leaving, logret
+            )
+
+        self._logrets[rows, step_idx % self.lookback] = logret
+        self._streak[rows] = streak + 1
+        self._last_idx[rows] = step_idx
+        self._as_of, self._as_of_idx = step_date, step_idx
+
+        return signals
+
+    def _rows(self, tickers: pl.Series) -> np.ndarray:
+        """State rows of the tickers, adding empty rows for tickers not seen yet."""
+        new = [ticker for ticker in tickers if ticker not in self._index]
+        if new:
+            self._index.update(
+                {ticker: len(self._tickers) + i for i, ticker in enumerate(new)}
+            )
+            self._tickers += new
+            self._last_idx = np.append(self._last_idx, np.full(len(new), -1))
+            self._streak = np.append(self._streak, np.zeros(len(new), dtype=np.int64))
+            self._logrets = np.vstack(
+                [self._logrets, np.zeros((len(new), self.lookback))]
+            )
+            for name in self.windows:
+                self._sums[name] = np.append(self._sums[name], np.zeros(len(new)))
+
+        return np.array([self._index[ticker] for ticker in tickers], dtype=np.int64)
+
+    def _load(self, state: pl.DataFrame) -> None:
+        self._tickers = state["ticker"].to_list()
+        self._index = {ticker: row for row, ticker in enumerate(self._tickers)}
+        self._last_idx = state["last_idx"].to_numpy().copy()
+        self._streak = state["streak"].to_numpy().copy()
+        self._logrets = state["logrets"].to_numpy().reshape(-1, self.lookback).copy()
+        self._sums = {
+            name: state[f"sum_{name}"].to_numpy().copy() for name in self.windows
+        }
+        self._as_of = state["as_of"].max()
+        self._as_of_idx = state["as_of_idx"].max() or 0
+
+    def _frame(self) -> pl.DataFrame:
+        return pl.DataFrame(
+            {
+                "ticker": self._tickers,
+                "last_idx": self._last_idx,
+                "streak": self._streak,
+                "logrets": self._logrets,
+                **{f"sum_{name}": self._sums[name] for name in self.windows},
+                "as_of": [self._as_of] * len(self._tickers),
+                "as_of_idx": [self._as_of_idx] * len(self._tickers),
+            },
+            schema=self._schema(),
+        )
+
+    def _schema(self) -> dict:
+        return {
+            "ticker": pl.Utf8,
+            "last_idx": pl.Int64,
+            "streak": pl.Int64,
+            "logrets": pl.Array(pl.Float64, self.lookback),
+            **{f"sum_{name}": pl.Float64 for name in self.windows},
+            "as_of": pl.Date,
+            "as_of_idx": pl.Int64,
+        }
@@ -1,4 +1,9 @@
-from .momentum import momentum_strategy
-from .reversal import reversal_strategy
+from .momentum import momentum_strategy, momentum_stream
+from .reversal import reversal_strategy, reversal_stream
 
-__all__ = ["momentum_strategy"]
+__all__ = [
+    "momentum_strategy",
+    "momentum_stream",
+    "reversal_strategy",
+    "reversal_stream",
+]
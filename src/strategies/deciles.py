@@ -0,0 +1,158 @@
+from qcomponents import (
+    ChunkedData,
+    PanelData,
+    PortfolioSet,
+    StreamingData,
+    lookback_start,
+)
+from src.signals import RollingSignalState
+from src.datasets import AlpacaStock
+from qdatabase import Database
+from src.optimizers import decile_portfolio, decile_portfolios
+from functools import partial
+from datetime import date
+from typing import Callable, Iterator
+import polars as pl
+
+COLUMNS = ["date", "ticker", "ret"]
+MODES = ("panel", "chunked", "incremental")
+
+
+def decile_strategy(
+    signal: Callable[..., pl.DataFrame],
+    column: str,
+    name: str,
+    interval: str,
+    mode: str,
+    window: int,
+    long_bin: int,
+    short_bin: int,
+    data: pl.DataFrame | pl.LazyFrame | None,
+    start_date: date | None,
+    end_date: date | None,
+) -> PortfolioSet:
+    """
+    Long/short decile portfolios on the `column` computed by `signal(chunk,
+    interval, window)` over a window - 1 lookback. mode="panel" computes the signal
+    once over the whole panel, mode="chunked" recomputes it on every rolling window;
+    both give the same portfolios. mode="incremental" rolls the persisted state
+    `<NAME>_<INTERVAL>_<window>_STATE` forward through the dates of data it hasn't
+    seen and returns only the newest date's portfolio; without data or end_date it
+    loads the Alpaca panel up to today.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+
+    # Data passed in is rolled through as it is, the state skips dates it has seen.
+    # A live job loads up to today unless told otherwise
+    if mode == "incremental":
+        if data is None:
+            end_date = end_date or date.today()
+            data = _data(None, interval, window, start_date, end_date, lazy=True)
+        state = RollingSignalState(
+            Database(),
+            f"{name.upper()}_{interval.upper()}_{window}_STATE",
+            {column: window - 1},
+        )
+        portfolios = decile_portfolios(state.advance(data), signal=column)
+        return PortfolioSet(long_short(portfolios, long_bin, short_bin))
+
+    data = _data(data, interval, window, start_date, end_date, lazy=False)
+    chunked_data = (PanelData if mode == "panel" else ChunkedData)(
+        data, window, COLUMNS
+    )
+    chunked_data.apply_signal_transform(
+        partial(signal, interval=interval, window=window - 1)
+    )
+    chunked_data.remove_chunks()
+
+    if mode == "panel":
+        portfolios = decile_portfolios(chunked_data.frame, signal=column)
+    else:
+        portfolios = pl.concat(
+            [
+                pl.concat(deciles).select(["date", "ticker", "bin", "weight"])
+                for deciles in chunked_data.apply_portfolio_gen(
+                    partial(decile_portfolio, signal=column)
+                )
+            ]
+        )
+
+    if start_date is not None:
+        portfolios = portfolios.filter(pl.col("date") >= start_date)
+    if end_date is not None:
+        portfolios = portfolios.filter(pl.col("date") <= end_date)
+
+    return PortfolioSet(long_short(portfolios, long_bin, short_bin))
+
+
+def decile_stream(
+    signal: Callable[..., pl.DataFrame],
+    column: str,
+    interval: str,
+    window: int,
+    long_bin: int,
+    short_bin: int,
+    data: pl.DataFrame | pl.LazyFrame | None,
+    start_date: date | None,
+    end_date: date | None,
+) -> Iterator[pl.DataFrame]:
+    """
+    decile_strategy's chunked path read a window at a time: a generator of one
+    (date, ticker, weight) portfolio per rebalance date.
+    """
+    data = _data(data, interval, window, start_date, end_date, lazy=True)
+    chunked_data = StreamingData(data.lazy(), window, COLUMNS, start_date=start_date)
+    chunked_data.apply_signal_transform(
+        partial(signal, interval=interval, window=window - 1)
+    )
+    chunked_data.remove_chunks()
+
+    return (
+        long_short(pl.concat(deciles), long_bin, short_bin)
+        for deciles in chunked_data.stream_portfolio_gen(
+            partial(decile_portfolio, signal=column)
+        )
+    )
+
+
+def long_short(portfolios: pl.DataFrame, long_bin: int, short_bin: int) -> pl.DataFrame:
+    """Long the long_bin decile and short the short_bin one."""
+    portfolios = portfolios.filter(pl.col("bin").is_in([long_bin, short_bin]))
+    portfolios = portfolios.with_columns(
+        pl.when(pl.col("bin") == short_bin)
+        .then(pl.col("weight") * -1)
+        .otherwise(pl.col("weight"))
+    )
+    return portfolios.select(["date", "ticker", "weight"])
+
+
+def _data(
+    data: pl.DataFrame | pl.LazyFrame | None,
+    interval: str,
+    window: int,
+    start_date: date | None,
+    end_date: date | None,
+    lazy: bool,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    The (date, ticker, ret) panel from start_date on, with the window - 1 dates
+    behind it as lookback: the Alpaca panel, lazily if asked, or data passed in.
+    """
+    if data is None:
+        dataset = AlpacaStock(
+            start_date=start_date or date(2020, 1, 1),
+            end_date=end_date or date(2024, 12, 31),
+            interval=interval,
+            lookback=window - 1 if start_date is not None else 0,
+        )
+        return dataset.scan(columns=COLUMNS) if lazy else dataset.load(columns=COLUMNS)
+
+    # Point-in-time window of data passed in, so no signal is computed that isn't used
+    if start_date is not None:
+        data = data.filter(
+            pl.col("date") >= lookback_start(data, start_date, window - 1)
+        )
+    if end_date is not None:
+        data = data.filter(pl.col("date") <= end_date)
+    return data
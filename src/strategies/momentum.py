@@ -1,51 +1,84 @@
-from qcomponents import ChunkedData
 from src.signals import momentum_signal
-from src.datasets import AlpacaStock
-from src.optimizers import decile_portfolio
-from functools import partial
+from src.strategies.deciles import decile_strategy, decile_stream
+from qcomponents import PortfolioSet
 from datetime import date
+from typing import Iterator
 import polars as pl
 
+# Lookback in periods, including the rebalance date
+WINDOWS = {"daily": 231, "monthly": 12}
 
-def momentum_strategy(interval: str = "daily") -> list[pl.DataFrame]:
+
+def momentum_strategy(
+    interval: str = "daily",
+    mode: str = "panel",
+    window: int | None = None,
+    long_bin: int = 9,
+    short_bin: int = 0,
+    data: pl.DataFrame | pl.LazyFrame | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> PortfolioSet:
     """
     This is the script for the classic momentum trading strategy.
     It should be able to be passed to both a backtester and a live/paper trader.
-    """
 
-    match interval:
-        case "daily":
-            window = 231
-        case "monthly":
-            window = 12
-
-    # Pull raw data
-    raw_data = AlpacaStock(
-        start_date=date(2020, 1, 1), 
-        end_date=date(2024, 12, 31), 
-        interval=interval
-    ).load()
-
-    # Create chunks
-    chunked_data = ChunkedData(
-        data=raw_data, window=window, columns=["date", "ticker", "ret"]
+    mode="panel" computes the signal once over the whole panel, mode="chunked"
+    recomputes it on every rolling window. Both produce the same portfolios.
+    mode="incremental" is for live/paper trading: a per-ticker signal state kept in
+    qdatabase is rolled forward through the dates of data it hasn't seen, and only
+    the newest date's portfolio is returned. Any other mode raises a ValueError;
+    momentum_stream yields the portfolios one rebalance date at a time.
+
+    window overrides the lookback in periods (including the rebalance date),
+    long_bin and short_bin pick the deciles to hold, and data (date, ticker, ret)
+    can be passed in place of loading the Alpaca panel. start_date and end_date
+    pin the strategy to the rebalance dates between them: only the window - 1
+    dates before start_date are read as lookback, and no signal is computed for
+    dates outside of that. WINDOWS (also strategy.windows) declares the lookback.
+    """
+    # Long good momentum, short poor momentum
+    return decile_strategy(
+        momentum_signal,
+        "mom",
+        "momentum",
+        interval,
+        mode,
+        window or WINDOWS[interval],
+        long_bin,
+        short_bin,
+        data,
+        start_date,
+        end_date,
     )
 
-    # Apply signal transformations
-    chunked_data.apply_signal_transform(partial(momentum_signal, interval=interval))
-    chunked_data.remove_chunks()
 
-    # Generate portfolios
-    portfolios_list: list[list[pl.DataFrame]] = chunked_data.apply_portfolio_gen(
-        partial(decile_portfolio, signal="mom")
+def momentum_stream(
+    interval: str = "daily",
+    window: int | None = None,
+    long_bin: int = 9,
+    short_bin: int = 0,
+    data: pl.DataFrame | pl.LazyFrame | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> Iterator[pl.DataFrame]:
+    """
+    momentum_strategy's chunked mode read a window at a time from a lazy scan, as a
+    generator of one (date, ticker, weight) portfolio per rebalance date, so memory
+    depends on the window and not on history.
+    """
+    return decile_stream(
+        momentum_signal,
+        "mom",
+        interval,
+        window or WINDOWS[interval],
+        long_bin,
+        short_bin,
+        data,
+        start_date,
+        end_date,
     )
 
-    # Long good momentum, short poor momentum
-    portfolios_list = [
-        pl.concat(
-            [portfolios[0].with_columns(pl.col("weight") * -1), portfolios[9]]
-        ).drop(["bin", "mom"])
-        for portfolios in portfolios_list
-    ]
-
-    return portfolios_list
+
+momentum_strategy.windows = WINDOWS
+momentum_stream.windows = WINDOWS
@@ -1,48 +1,84 @@
-from qcomponents import ChunkedData
 from src.signals import reversal_signal
-from src.datasets import AlpacaStock
-from src.optimizers import decile_portfolio
-from functools import partial
+from src.strategies.deciles import decile_strategy, decile_stream
+from qcomponents import PortfolioSet
 from datetime import date
+from typing import Iterator
 import polars as pl
 
+# Lookback in periods, including the rebalance date
+WINDOWS = {"daily": 23, "monthly": 2}
 
-def reversal_strategy(interval: str = "daily") -> list[pl.DataFrame]:
+
+def reversal_strategy(
+    interval: str = "daily",
+    mode: str = "panel",
+    window: int | None = None,
+    long_bin: int = 0,
+    short_bin: int = 9,
+    data: pl.DataFrame | pl.LazyFrame | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> PortfolioSet:
     """
     This is the script for the classic short term reversal trading strategy.
     It should be able to be passed to both a backtester and a live/paper trader.
+
+    mode="panel" computes the signal once over the whole panel, mode="chunked"
+    recomputes it on every rolling window. Both produce the same portfolios.
+    mode="incremental" is for live/paper trading: a per-ticker signal state kept in
+    qdatabase is rolled forward through the dates of data it hasn't seen, and only
+    the newest date's portfolio is returned. Any other mode raises a ValueError;
+    reversal_stream yields the portfolios one rebalance date at a time.
+
+    window overrides the lookback in periods (including the rebalance date),
+    long_bin and short_bin pick the deciles to hold, and data (date, ticker, ret)
+    can be passed in place of loading the Alpaca panel. start_date and end_date
+    pin the strategy to the rebalance dates between them: only the window - 1
+    dates before start_date are read as lookback, and no signal is computed for
+    dates outside of that. WINDOWS (also strategy.windows) declares the lookback.
     """
-    match interval:
-        case "daily":
-            window = 23
-        case "monthly":
-            window = 1
-
-    # Pull raw data
-    raw_data = AlpacaStock(
-        start_date=date(2020, 1, 1), 
-        end_date=date(2024, 12, 31), 
-        interval=interval
-    ).load()
-
-    # Create chunks
-    chunked_data = ChunkedData(raw_data, window, ["date", "ticker", "ret"])
-
-    # Apply signal transformations
-    chunked_data.apply_signal_transform(partial(reversal_signal, interval=interval))
-    chunked_data.remove_chunks()
-
-    # Generate portfolios
-    portfolios_list: list[list[pl.DataFrame]] = chunked_data.apply_portfolio_gen(
-        partial(decile_portfolio, signal="rev")
+    # Long poor reversal, short good reversal
+    return decile_strategy(
+        reversal_signal,
+        "rev",
+        "reversal",
+        interval,
+        mode,
+        window or WINDOWS[interval],
+        long_bin,
+        short_bin,
+        data,
+        start_date,
+        end_date,
     )
 
-    # Long poor reversal, short good reversal
-    portfolios_list = [
-        pl.concat(
-            [portfolios[0], portfolios[9].with_columns(pl.col("weight") * -1)]
-        ).drop(["bin", "rev"])
-        for portfolios in portfolios_list
-    ]
-
-    return portfolios_list
+
+def reversal_stream(
+    interval: str = "daily",
+    window: int | None = None,
+    long_bin: int = 0,
+    short_bin: int = 9,
+    data: pl.DataFrame | pl.LazyFrame | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> Iterator[pl.DataFrame]:
+    """
+    reversal_strategy's chunked mode read a window at a time from a lazy scan, as a
+    generator of one (date, ticker, weight) portfolio per rebalance date, so memory
+    depends on the window and not on history.
+    """
+    return decile_stream(
+        reversal_signal,
+        "rev",
+        interval,
+        window or WINDOWS[interval],
+        long_bin,
+        short_bin,
+        data,
+        start_date,
+        end_date,
+    )
+
+
+reversal_strategy.windows = WINDOWS
+reversal_stream.windows = WINDOWS
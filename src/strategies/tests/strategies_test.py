@@ -0,0 +1,72 @@
+from src.strategies import (
+    deciles,
+    momentum_strategy,
+    momentum_stream,
+    reversal_strategy,
+    reversal_stream,
+)
+from qcomponents import PortfolioSet
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+import pytest
+from datetime import date
+
+rng = np.random.default_rng(0)
+months = pl.date_range(date(2019, 1, 1), date(2023, 12, 1), "1mo", eager=True)
+data = pl.DataFrame(
+    [
+        {"ticker": f"T{ticker:02d}", "date": month, "ret": rng.normal(0, 0.05)}
+        for ticker in range(30)
+        for month in months
+    ]
+)
+start_date, end_date = date(2021, 1, 1), date(2023, 6, 1)
+
+
+@pytest.mark.parametrize(
+    "strategy, stream",
+    [(momentum_strategy, momentum_stream), (reversal_strategy, reversal_stream)],
+)
+def test_modes_agree(strategy, stream):
+    kwargs = dict(
+        interval="monthly", data=data, start_date=start_date, end_date=end_date
+    )
+    panel = strategy(mode="panel", **kwargs)
+    chunked = strategy(mode="chunked", **kwargs)
+    streamed = PortfolioSet.from_frames(list(stream(**kwargs)))
+
+    assert panel.dates[0] == start_date
+    for other in (chunked, streamed):
+        assert other.dates == panel.dates
+        assert_frame_equal(
+            other.frame.sort(by=["date", "ticker"]),
+            panel.frame.sort(by=["date", "ticker"]),
+        )
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError, match="Unknown mode 'stream'"):
+        momentum_strategy(interval="monthly", mode="stream", data=data)
+
+
+def test_incremental_loads_until_today(monkeypatch):
+    loaded = {}
+
+    class Loaded(Exception):
+        pass
+
+    # Stops at the load, before any signal state is read or written
+    class FakeStock:
+        def __init__(self, start_date, end_date, interval, lookback):
+            loaded.update(start_date=start_date, end_date=end_date)
+            raise Loaded
+
+    monkeypatch.setattr(deciles, "AlpacaStock", FakeStock)
+    with pytest.raises(Loaded):
+        momentum_strategy(interval="daily", mode="incremental")
+    assert loaded["end_date"] == date.today()
+
+    with pytest.raises(Loaded):
+        momentum_strategy(mode="incremental", end_date=date(2025, 3, 31))
+    assert loaded["end_date"] == date(2025, 3, 31)